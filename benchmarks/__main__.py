@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+from benchmarks import compare, corpus, run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="nl, tail and wc benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    corpus_parser = commands.add_parser("corpus", help="generate the benchmark corpus")
+    run_parser = commands.add_parser("run", help="measure every target against the corpus")
+    for sub in (corpus_parser, run_parser):
+        sub.add_argument("--kinds", nargs="+", choices=corpus.KINDS, default=list(corpus.KINDS))
+        sub.add_argument("--sizes", nargs="+", default=list(corpus.DEFAULT_SIZES), help="e.g. 1KB 1MB 1GB 10GB")
+        sub.add_argument("--corpus-dir", default=corpus.DEFAULT_DIR)
+    run_parser.add_argument("--targets", nargs="+", choices=run.TARGETS, default=list(run.TARGETS))
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("-o", "--output", default=run.DEFAULT_OUTPUT)
+
+    compare_parser = commands.add_parser("compare", help="fail when results regress against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", default=run.DEFAULT_OUTPUT)
+    compare_parser.add_argument("--threshold", type=float, default=compare.DEFAULT_THRESHOLD)
+    compare_parser.add_argument("--rss-threshold", type=float, default=None)
+
+    args = parser.parse_args()
+    if args.command == "corpus":
+        for size in args.sizes:
+            for kind in args.kinds:
+                print(corpus.ensure(kind, corpus.parse_size(size), args.corpus_dir))
+    elif args.command == "run":
+        report = run.run(
+            args.targets, args.kinds, args.sizes, repeat=args.repeat, corpus_dir=args.corpus_dir, log=print
+        )
+        run.save(report, args.output)
+        print(f"results written to {args.output}")
+    else:
+        lines, regressions = compare.compare(
+            compare.load(args.baseline), compare.load(args.current), args.threshold, args.rss_threshold
+        )
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s) past {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+
+from benchmarks.corpus import ensure, parse_size
+from src.api import count, number_file, tail_lines
+
+CALLS: dict[str, tuple[list[str], Callable[[str], object]]] = {
+    "wc": (["src.wc.wc_main"], count),
+    "tail": (["src.tail.tail_main"], lambda path: list(tail_lines(path))),
+    "nl": (["src.nl.nl_main"], lambda path: list(number_file(path))),
+}
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="per-call cost: CLI subprocess against the in-process API")
+    parser.add_argument("--size", type=parse_size, default="1KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = ensure("ascii", args.size, directory)
+        for tool, (module, call) in CALLS.items():
+            command = [sys.executable, "-m", *module, path]
+            cli = measure(partial(subprocess.run, command, capture_output=True, check=True), args.repeat)
+            api = measure(partial(call, path), args.repeat)
+            print(f"{tool:<5} cli {cli * 1e3:8.2f} ms  api {api * 1e3:8.3f} ms  x{cli / api:.0f}")
+
+
+if __name__ == "__main__":
+    main()
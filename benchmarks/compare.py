@@ -0,0 +1,39 @@
+import json
+from typing import Any
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def load(path: str) -> dict[tuple[str, str], dict[str, Any]]:
+    with open(path, encoding="utf-8") as file:
+        report = json.load(file)
+    return {(result["target"], result["corpus"]): result for result in report["results"]}
+
+
+def compare(
+    baseline: dict[tuple[str, str], dict[str, Any]],
+    current: dict[tuple[str, str], dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+    rss_threshold: float | None = None,
+) -> tuple[list[str], list[str]]:
+    lines = []
+    regressions = []
+    for key in sorted(baseline.keys() | current.keys()):
+        target, corpus = key
+        if key not in current or key not in baseline:
+            lines.append(f"{target:<18} {corpus:<36} {'only in ' + ('baseline' if key in baseline else 'current')}")
+            continue
+        old, new = baseline[key], current[key]
+        time_ratio = new["wall_time"] / old["wall_time"] if old["wall_time"] else 1.0
+        rss_ratio = new["peak_rss_kb"] / old["peak_rss_kb"] if old["peak_rss_kb"] else 1.0
+        problems = []
+        if time_ratio > 1 + threshold:
+            problems.append(f"wall time +{(time_ratio - 1) * 100:.1f}%")
+        if rss_threshold is not None and rss_ratio > 1 + rss_threshold:
+            problems.append(f"peak RSS +{(rss_ratio - 1) * 100:.1f}%")
+        line = f"{target:<18} {corpus:<36} time x{time_ratio:.2f}  rss x{rss_ratio:.2f}"
+        if problems:
+            line += "  REGRESSION: " + ", ".join(problems)
+            regressions.append(f"{target} {corpus}: " + ", ".join(problems))
+        lines.append(line)
+    return lines, regressions
@@ -0,0 +1,59 @@
+import argparse
+import gzip
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import KINDS, bgzf, ensure, parse_size
+
+
+def measure(command: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compress(path: str, directory: str) -> tuple[str, str]:
+    name = os.path.join(directory, os.path.basename(path))
+    with open(path, "rb") as source, gzip.open(f"{name}.gz", "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    with open(path, "rb") as source, open(f"{name}.bgz", "wb") as target:
+        target.writelines(bgzf(iter(lambda: source.read(1024 * 1024), b"")))
+    return f"{name}.gz", f"{name}.bgz"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="compressed input: wc and tail against zcat piped into coreutils")
+    parser.add_argument("--size", type=parse_size, default="64MB")
+    parser.add_argument("--kind", choices=KINDS, default="ascii")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    python = shlex.quote(sys.executable)
+    with tempfile.TemporaryDirectory() as directory:
+        gz, bgz = compress(ensure(args.kind, args.size, directory), directory)
+        print(f"{args.kind} {args.size / 1e6:.0f} MB: gzip {os.path.getsize(gz) / 1e6:.1f} MB", file=sys.stderr)
+        commands = {
+            "zcat | wc": f"zcat {gz} | wc",
+            "wc file.gz": f"{python} -m src.wc.wc_main {gz}",
+            "wc file.bgz": f"{python} -m src.wc.wc_main {bgz}",
+            f"wc -j {args.jobs} file.bgz": f"{python} -m src.wc.wc_main -j {args.jobs} {bgz}",
+            "zcat | tail": f"zcat {gz} | tail",
+            "tail file.gz": f"{python} -m src.tail.tail_main {gz}",
+            "tail file.bgz": f"{python} -m src.tail.tail_main {bgz}",
+        }
+        for name, command in commands.items():
+            elapsed = measure(command, args.repeat)
+            print(f"{name:<18} {elapsed * 1e3:9.1f} ms  {args.size / 1e6 / elapsed:7.0f} MB/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
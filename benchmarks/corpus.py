@@ -0,0 +1,116 @@
+import os
+import random
+import re
+import struct
+import zlib
+from collections.abc import Iterable, Iterator
+
+KINDS = ("ascii", "unicode", "long-lines", "no-trailing-newline")
+DEFAULT_SIZES = ("1KB", "1MB", "16MB")
+DEFAULT_DIR = os.path.join(".bench", "corpus")
+SEED = 20241017
+BLOCK_SIZE = 1024 * 1024
+
+# bgzip's payload per member: the member, header and trailer included, stays within 64 KiB.
+BGZF_BLOCK_SIZE = 0xFF00
+_BGZF_HEADER = struct.Struct("<4sIBBHBBHH")
+_BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+_SIZE_RE = re.compile(r"(\d+)\s*([KMG]?B)", re.IGNORECASE)
+
+_ASCII_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+# Cyrillic, Greek, CJK and emoji words, separated by ASCII and Unicode spaces alike.
+_UNICODE_LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяαβγδεζηθ漢字文本测试日本語😀🚀✓éüñ"
+_UNICODE_SPACES = (" ", " ", "\u00a0", "\u2003", "\u202f", "\u3000")
+
+
+def parse_size(text: str) -> int:
+    match = _SIZE_RE.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"invalid size: {text}")
+    return int(match.group(1)) * _UNITS[match.group(2).upper()]
+
+
+def _words(rng: random.Random, letters: str, count: int) -> list[str]:
+    return ["".join(rng.choices(letters, k=rng.randint(1, 12))) for _ in range(count)]
+
+
+def _block(kind: str, size: int) -> bytes:
+    # One block of text is generated from a fixed seed and repeated, so even 10 GB builds at disk speed.
+    rng = random.Random(f"{SEED}-{kind}")
+    lines: list[str] = []
+    length = 0
+    while length < size:
+        if kind == "unicode":
+            words = _words(rng, _UNICODE_LETTERS, rng.randint(3, 15))
+            line = "".join(word + rng.choice(_UNICODE_SPACES) for word in words).rstrip() + "\n"
+        elif kind == "long-lines":
+            line = " ".join(_words(rng, _ASCII_LETTERS, rng.randint(5_000, 15_000))) + "\n"
+        else:
+            line = " ".join(_words(rng, _ASCII_LETTERS, rng.randint(0, 15))) + "\n"
+        lines.append(line)
+        length += len(line.encode("utf-8"))
+    return "".join(lines).encode("utf-8")
+
+
+def _trim(data: bytes, size: int) -> bytes:
+    # Cut on a character boundary and pad with ASCII, so the corpus stays valid UTF-8 at any size.
+    data = data[:size]
+    cut = len(data)
+    while cut and data[cut - 1] & 0xC0 == 0x80:
+        cut -= 1
+    if cut and data[cut - 1] >= 0xC0:
+        cut -= 1
+    return data[:cut] + b"x" * (size - cut)
+
+
+def generate(kind: str, size: int) -> Iterator[bytes]:
+    if kind not in KINDS:
+        raise ValueError(f"unknown corpus kind: {kind}")
+    if size <= 0:
+        return
+    block = _block(kind, min(size, BLOCK_SIZE))
+    written = 0
+    while size - written > len(block):
+        yield block
+        written += len(block)
+    yield _trim(block, size - written - 1) + (b"x" if kind == "no-trailing-newline" else b"\n")
+
+
+def corpus_path(kind: str, size: int, directory: str = DEFAULT_DIR) -> str:
+    return os.path.join(directory, f"{kind}-{size}.txt")
+
+
+def ensure(kind: str, size: int, directory: str = DEFAULT_DIR) -> str:
+    path = corpus_path(kind, size, directory)
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        return path
+    os.makedirs(directory, exist_ok=True)
+    partial = f"{path}.partial"
+    with open(partial, "wb") as file:
+        file.writelines(generate(kind, size))
+    os.replace(partial, path)
+    return path
+
+
+def _bgzf_member(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    size = _BGZF_HEADER.size + len(deflated) + 8
+    header = _BGZF_HEADER.pack(b"\x1f\x8b\x08\x04", 0, 0, 0xFF, 6, ord("B"), ord("C"), 2, size - 1)
+    return header + deflated + struct.pack("<II", zlib.crc32(data), len(data))
+
+
+def bgzf(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # The same layout `bgzip` writes: independent gzip members carrying their size, then an empty EOF member.
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk
+        end = len(data) - len(data) % BGZF_BLOCK_SIZE
+        for start in range(0, end, BGZF_BLOCK_SIZE):
+            yield _bgzf_member(data[start : start + BGZF_BLOCK_SIZE])
+        pending = data[end:]
+    if pending:
+        yield _bgzf_member(pending)
+    yield _BGZF_EOF
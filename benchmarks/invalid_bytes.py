@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import SEED, ensure, generate, parse_size
+
+# The corpus kinds are valid UTF-8 by design; these inputs are built here, next to the valid one they are compared with.
+INPUTS = ("utf-8", "binary", "mixed")
+
+
+def _binary(size: int) -> bytes:
+    # Mostly random bytes with a newline now and then, as in a log with binary payloads.
+    rng = random.Random(f"{SEED}-binary")
+    data = bytearray(rng.randbytes(size))
+    for offset in range(0, size, 97):
+        data[offset] = 0x0A
+    return bytes(data)
+
+
+def _mixed(size: int) -> bytes:
+    # Lines of valid UTF-8 and lines of cp1251, as left by tools that disagree on the encoding.
+    lines = b"".join(generate("unicode", size)).splitlines(keepends=True)
+    legacy = [line.decode("utf-8").encode("cp1251", errors="replace") for line in lines[1::2]]
+    lines[1::2] = legacy
+    return b"".join(lines)[:size]
+
+
+def write_input(kind: str, size: int, directory: str) -> str:
+    if kind == "utf-8":
+        return ensure("unicode", size, directory)
+    path = os.path.join(directory, f"{kind}-{size}.txt")
+    block = (_binary if kind == "binary" else _mixed)(min(size, 1024 * 1024))
+    with open(path, "wb") as file:
+        file.writelines(block[: size - written] for written in range(0, size, len(block)))
+    return path
+
+
+def measure(command: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="throughput on valid UTF-8, binary and mixed-encoding input")
+    parser.add_argument("--size", type=parse_size, default="64MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    python = shlex.quote(sys.executable)
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in INPUTS:
+            path = write_input(kind, args.size, directory)
+            commands = {
+                "wc": f"{python} -m src.wc.wc_main {path}",
+                "wc -m": f"{python} -m src.wc.wc_main -m {path}",
+                "wc --encoding=cp1251": f"{python} -m src.wc.wc_main --encoding=cp1251 {path}",
+                "tail -n 100000": f"{python} -m src.tail.tail_main -n 100000 {path}",
+                "nl": f"{python} -m src.nl.nl_main {path}",
+            }
+            for name, command in commands.items():
+                elapsed = measure(command, args.repeat)
+                print(f"{kind:<7} {name:<22} {args.size / 1e6 / elapsed:7.0f} MB/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
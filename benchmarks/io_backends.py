@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+
+from src.io import reader
+from src.io.reader import open_source
+from src.tail.tail import tail_source
+from src.wc.wc import count_file
+
+SOURCE = os.path.join("artifacts", "wc", "inputBig.txt")
+
+
+def run_wc(path: str) -> None:
+    count_file(path)
+
+
+def run_tail(path: str) -> None:
+    with open_source(path) as source:
+        tail_source(source, 17)
+
+
+def run_nl(path: str) -> None:
+    with open_source(path) as source:
+        source.count_lines()
+        for line in source.lines():
+            line.decode("utf-8")
+
+
+def drop_page_cache(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def measure(func: Callable[[str], None], path: str, cold: bool, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if cold:
+            drop_page_cache(path)
+        else:
+            func(path)
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="mmap vs buffered reads, page cache hot and cold")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(SOURCE, "rb") as source:
+        data = source.read()
+    with tempfile.NamedTemporaryFile(suffix=".txt") as corpus:
+        for _ in range(max(1, args.size_mb * 1024 * 1024 // len(data))):
+            corpus.write(data)
+        corpus.flush()
+        megabytes = os.path.getsize(corpus.name) / 1e6
+        print(f"corpus: {megabytes:.0f} MB")
+        print(f"{'tool':<6}{'cache':<6}{'mmap':>12}{'buffered':>12}")
+        for name, func in (("wc", run_wc), ("tail", run_tail), ("nl", run_nl)):
+            for cold in (False, True):
+                timings = []
+                for use_mmap in (True, False):
+                    reader.USE_MMAP = use_mmap
+                    timings.append(measure(func, corpus.name, cold, args.repeat))
+                reader.USE_MMAP = True
+                print(f"{name:<6}{'cold' if cold else 'hot':<6}{timings[0] * 1e3:10.1f}ms{timings[1] * 1e3:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.corpus import ensure
+from src.io import line_index
+from src.io.line_index import index_for, skip_lines
+from src.io.reader import open_source
+
+
+def measure_scan(path: str, lines: list[int]) -> float:
+    timings = []
+    for line in lines:
+        start = time.perf_counter()
+        with open_source(path) as source:
+            skip_lines(source.blocks(), line)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_indexed(path: str, lines: list[int], directory: str) -> float:
+    timings = []
+    for line in lines:
+        start = time.perf_counter()
+        with open_source(path) as source:
+            index = index_for(source, build=False, directory=directory)
+            assert index is not None
+            index.line_offset(source, line)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="random line access: line index against a full scan")
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = ensure("ascii", args.size_mb * 1024 * 1024, directory)
+        line_index.INDEX_MIN_SIZE = 0
+
+        start = time.perf_counter()
+        with open_source(path) as source:
+            index = index_for(source, directory=directory)
+        assert index is not None
+        print(f"{'first pass (build)':<22} {time.perf_counter() - start:9.3f} s  {index.lines} lines")
+        print(f"{'index size':<22} {len(index.to_bytes()) / 1024:9.1f} KiB")
+
+        rng = random.Random(0)
+        lines = [rng.randrange(index.lines) for _ in range(args.lookups)]
+        scan = measure_scan(path, lines)
+        indexed = measure_indexed(path, lines, directory)
+        print(f"{'full scan':<22} {scan * 1e3:9.3f} ms per lookup")
+        print(f"{'indexed':<22} {indexed * 1e3:9.3f} ms per lookup  x{scan / indexed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+from collections.abc import Callable
+from itertools import batched
+
+from benchmarks.corpus import KINDS, generate, parse_size
+from src.nl.numbering import BATCH_LINES, DEFAULT_FORMAT, Formatter
+
+FORMATS = {
+    "default (-ba)": DEFAULT_FORMAT,
+    "-bt": DEFAULT_FORMAT._replace(body="t"),
+    "-bp'^[a-m]'": DEFAULT_FORMAT._replace(body="p^[a-m]"),
+    "-nrz -s' | ' -i2": DEFAULT_FORMAT._replace(number_format="rz", separator=b" | ", increment=2),
+    "-ba -l2": DEFAULT_FORMAT._replace(join_blank=2),
+}
+
+
+def per_line(lines: list[bytes], width: int) -> int:
+    # What nl did before formatters: an f-string, a decode and an rstrip for every line.
+    written = 0
+    for number, line in enumerate(lines, 1):
+        written += len(f"{str(number).rjust(width)}\t{line.decode('utf-8').rstrip()}\n".encode())
+    return written
+
+
+def batched_formatter(numbering: Formatter) -> Callable[[list[bytes], int], int]:
+    def run(lines: list[bytes], width: int) -> int:
+        return sum(len(numbering.format(batch, width)) for batch in batched(lines, BATCH_LINES, strict=False))
+
+    return run
+
+
+def measure(run: Callable[[list[bytes], int], int], lines: list[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(lines, 6)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="nl formatting throughput, in lines per second")
+    parser.add_argument("--size", type=parse_size, default="64MB")
+    parser.add_argument("--kind", choices=KINDS, default="ascii")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = b"".join(generate(args.kind, args.size)).splitlines(keepends=True)
+    print(f"{args.kind} {args.size / 1e6:.0f} MB, {len(lines)} lines", file=sys.stderr)
+    runs: dict[str, Callable[[list[bytes], int], int]] = {"per-line f-string": per_line}
+    runs.update({name: batched_formatter(Formatter(options)) for name, options in FORMATS.items()})
+    for name, run in runs.items():
+        elapsed = measure(run, lines, args.repeat)
+        print(f"{name:<20} {len(lines) / elapsed / 1e6:6.2f} M lines/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+
+from src.nl.nl import NL
+from src.tail.tail import Tail
+
+
+def write_syscalls() -> int:
+    with open("/proc/self/io") as io_stats:
+        for line in io_stats:
+            if line.startswith("syscw:"):
+                return int(line.split()[1])
+    return 0
+
+
+@contextlib.contextmanager
+def stdout_to(path: str) -> Iterator[None]:
+    original = sys.stdout
+    with open(path, "w", encoding="utf-8") as target:
+        sys.stdout = target
+        try:
+            yield
+        finally:
+            sys.stdout = original
+
+
+def nl_per_line_print(path: str) -> None:
+    # How nl wrote its output before the shared sink: one flushed print per line.
+    with open(path, encoding="utf-8") as file:
+        lines = file.readlines()
+    width = len(str(len(lines)))
+    for number, line in enumerate(lines, start=1):
+        print(f"{str(number).rjust(width)}\t{line.rstrip()}", flush=True)
+
+
+def tail_per_line_print(path: str) -> None:
+    with open(path, encoding="utf-8") as file:
+        lines = file.readlines()
+    for line in lines[-100_000:]:
+        print(line, end="", flush=True)
+
+
+def measure(func: Callable[[str], object], source: str, target: str) -> tuple[float, int]:
+    with stdout_to(target):
+        before = write_syscalls()
+        start = time.perf_counter()
+        func(source)
+        elapsed = time.perf_counter() - start
+        after = write_syscalls()
+    return elapsed, after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="per-line print(flush=True) vs the buffered output sink")
+    parser.add_argument("--lines", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "input.txt")
+        target = os.path.join(directory, "output.txt")
+        with open(source, "w", encoding="utf-8") as file:
+            for i in range(args.lines):
+                file.write(f"log line {i} with some payload text\n")
+        megabytes = os.path.getsize(source) / 1e6
+
+        cases: list[tuple[str, Callable[[str], object]]] = [
+            ("nl   print(flush=True)", nl_per_line_print),
+            ("nl   OutputSink", lambda path: NL().process_file(path)),
+            ("tail print(flush=True)", tail_per_line_print),
+            ("tail OutputSink", lambda path: Tail(100_000).process_file(path)),
+        ]
+        print(f"{args.lines} lines, {megabytes:.1f} MB, stdout redirected to a file")
+        for name, func in cases:
+            elapsed, syscalls = measure(func, source, target)
+            rate = args.lines / elapsed / 1e6
+            print(f"{name:<24} {elapsed:7.3f} s  {rate:6.2f} M input lines/s  {syscalls:8d} write syscalls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from src.nl import nl as nl_module
+from src.nl.nl import NL
+from src.tail import tail as tail_module
+from src.tail.tail import Tail
+from src.wc import wc as wc_module
+from src.wc.wc import WC
+
+
+def _delayed(function: Callable[..., Any], latency: float) -> Callable[..., Any]:
+    def delayed(*args: Any, **kwargs: Any) -> Any:
+        time.sleep(latency)
+        return function(*args, **kwargs)
+
+    return delayed
+
+
+@contextlib.contextmanager
+def slow(module: Any, names: tuple[str, ...], latency: float) -> Iterator[None]:
+    # Every open of an input pays a fixed delay, the way a read on network storage does.
+    originals = {name: getattr(module, name) for name in names}
+    for name, function in originals.items():
+        setattr(module, name, _delayed(function, latency))
+    try:
+        yield
+    finally:
+        for name, function in originals.items():
+            setattr(module, name, function)
+
+
+def run_wc(files: list[str], in_flight: int) -> None:
+    WC(in_flight=in_flight).process_data(files)
+
+
+def run_tail(files: list[str], in_flight: int) -> None:
+    tail = Tail(10)
+    if in_flight > 1:
+        tail.process_files(files, in_flight)
+        return
+    for index, filename in enumerate(files):
+        if index:
+            tail.print_separator()
+        tail.process_file(filename, True)
+
+
+def run_nl(files: list[str], in_flight: int) -> None:
+    nl = NL()
+    if in_flight > 1:
+        nl.process_files(files, in_flight)
+        return
+    for filename in files:
+        nl.process_file(filename)
+
+
+TOOLS: dict[str, tuple[Callable[[list[str], int], None], Any, tuple[str, ...]]] = {
+    "wc": (run_wc, wc_module, ("open_source",)),
+    "tail": (run_tail, tail_module, ("open_source",)),
+    "nl": (run_nl, nl_module, ("open_source", "_read_small_file")),
+}
+
+
+def measure(tool: str, files: list[str], in_flight: int, latency: float) -> float:
+    run, module, names = TOOLS[tool]
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    with slow(module, names, latency), contextlib.redirect_stdout(stdout):
+        start = time.perf_counter()
+        run(files, in_flight)
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="many small files: sequential reads against --in-flight")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=list(TOOLS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for index in range(args.files):
+            path = os.path.join(directory, f"{index}.log")
+            with open(path, "w", encoding="utf-8") as file:
+                file.writelines(f"{index} request {line} served\n" for line in range(20))
+            files.append(path)
+
+        for tool in args.tools:
+            baseline = None
+            for in_flight in args.in_flight:
+                elapsed = measure(tool, files, in_flight, args.latency_ms / 1000)
+                baseline = baseline or elapsed
+                print(
+                    f"{tool:<5} in-flight {in_flight:>4}  {elapsed:7.3f} s  x{baseline / elapsed:5.1f}", file=sys.stderr
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from benchmarks.corpus import DEFAULT_DIR, ensure, parse_size
+
+DEFAULT_OUTPUT = os.path.join(".bench", "results.json")
+
+
+def _wc_process_data(path: str) -> None:
+    from src.wc.wc import WC  # noqa: PLC0415
+
+    WC().process_data([path])
+
+
+def _tail_process_file(path: str) -> None:
+    from src.tail.tail import Tail  # noqa: PLC0415
+
+    Tail(num_lines=10).process_file(path)
+
+
+def _nl_process_stream(path: str) -> None:
+    from src.nl.nl import NL  # noqa: PLC0415
+
+    with open(path, encoding="utf-8") as stream:
+        NL().process_stream(stream)
+
+
+# Entry points run as a fresh interpreter, exactly as a user would call them.
+ENTRY_POINTS: dict[str, list[str]] = {
+    "wc_main": ["-m", "src.wc.wc_main"],
+    "tail_main": ["-m", "src.tail.tail_main"],
+    "nl_main": ["-m", "src.nl.nl_main"],
+}
+# Class methods run in a forked child, so each measurement starts from the same heap.
+METHODS: dict[str, Callable[[str], None]] = {
+    "WC.process_data": _wc_process_data,
+    "Tail.process_file": _tail_process_file,
+    "NL.process_stream": _nl_process_stream,
+}
+TARGETS = (*ENTRY_POINTS, *METHODS)
+
+
+def _run_entry_point(target: str, path: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, *ENTRY_POINTS[target], path], stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise RuntimeError(f"{target} {path} exited with {process.returncode}")
+    return elapsed, usage.ru_maxrss
+
+
+def _run_method(target: str, path: str) -> tuple[float, int]:
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                METHODS[target](path)
+                elapsed = time.perf_counter() - start
+            os.write(write_fd, repr(elapsed).encode())
+        finally:
+            # Never fall back into the parent's code; a child that failed simply reports nothing.
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        reported = pipe.read()
+    _, status, usage = os.wait4(pid, 0)
+    if os.waitstatus_to_exitcode(status) or not reported:
+        raise RuntimeError(f"{target} {path} failed")
+    return float(reported), usage.ru_maxrss
+
+
+def measure(target: str, path: str, repeat: int = 3) -> dict[str, Any]:
+    run = _run_entry_point if target in ENTRY_POINTS else _run_method
+    size = os.path.getsize(path)
+    timings = []
+    peak_rss_kb = 0
+    for _ in range(repeat):
+        elapsed, rss = run(target, path)
+        timings.append(elapsed)
+        peak_rss_kb = max(peak_rss_kb, rss)
+    # The fastest run is the least disturbed by the rest of the machine.
+    wall_time = min(timings)
+    return {
+        "target": target,
+        "corpus": os.path.basename(path),
+        "bytes": size,
+        "wall_time": wall_time,
+        "throughput_mb_s": size / 1e6 / wall_time if wall_time else 0.0,
+        "peak_rss_kb": peak_rss_kb,
+        "runs": timings,
+    }
+
+
+def run(
+    targets: list[str],
+    kinds: list[str],
+    sizes: list[str],
+    *,
+    repeat: int = 3,
+    corpus_dir: str = DEFAULT_DIR,
+    log: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    results = []
+    for size in sizes:
+        for kind in kinds:
+            path = ensure(kind, parse_size(size), corpus_dir)
+            for target in targets:
+                result = measure(target, path, repeat)
+                results.append(result)
+                if log is not None:
+                    log(
+                        f"{target:<18} {result['corpus']:<36} {result['wall_time']:8.3f} s "
+                        f"{result['throughput_mb_s']:9.1f} MB/s {result['peak_rss_kb'] / 1024:8.1f} MiB"
+                    )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def save(report: dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+        file.write("\n")
@@ -0,0 +1,63 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import ensure, parse_size
+from src.server.client import socket_path
+
+TOOLS = {"wc": "src.wc.wc_main", "tail": "src.tail.tail_main", "nl": "src.nl.nl_main"}
+MAIN = os.path.join("src", "main.py")
+
+
+def measure(command: list[str], repeat: int, env: dict[str, str] | None = None) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=True, env=env)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def start_server(path: str) -> subprocess.Popen[bytes]:
+    server = subprocess.Popen([sys.executable, MAIN, "serve", "--socket", path], stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        if server.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("the server did not start")
+        time.sleep(0.02)
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="startup time: per-tool modules, the multi-call entry, warm server")
+    parser.add_argument("--size", type=parse_size, default="1KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = measure([sys.executable, "-c", "pass"], args.repeat)
+    print(f"python -c pass           {baseline * 1e3:8.2f} ms", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as directory:
+        path = ensure("ascii", args.size, directory)
+        server_path = socket_path(os.path.join(directory, "lab.sock"))
+        server = start_server(server_path)
+        warm = {**os.environ, "LAB_SERVER": server_path}
+        try:
+            for tool, module in TOOLS.items():
+                runs = {
+                    "module": measure([sys.executable, "-m", module, path], args.repeat),
+                    "multi-call": measure([sys.executable, MAIN, tool, path], args.repeat),
+                    "server": measure([sys.executable, MAIN, tool, path], args.repeat, warm),
+                }
+                columns = "  ".join(f"{name} {seconds * 1e3:7.2f} ms" for name, seconds in runs.items())
+                print(f"{tool:<5} {columns}", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
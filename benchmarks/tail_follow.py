@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def read_line(fd: int, buffer: bytearray) -> bytes:
+    while (end := buffer.find(b"\n")) < 0:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise EOFError("tail exited")
+        buffer += chunk
+    line = bytes(buffer[: end + 1])
+    del buffer[: end + 1]
+    return line
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tail -f write-to-output latency and idle CPU")
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--idle", type=float, default=2.0)
+    parser.add_argument("--follow", choices=["descriptor", "name"], default="descriptor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"{i}.log") for i in range(args.files)]
+        for path in paths:
+            open(path, "wb").close()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "src.tail.tail_main", f"--follow={args.follow}", "-n", "0", *paths],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        assert process.stdout is not None
+        fd = process.stdout.fileno()
+        buffer = bytearray()
+        time.sleep(0.5)
+        try:
+            latencies = []
+            for i in range(args.writes):
+                path = paths[i % len(paths)]
+                with open(path, "ab", buffering=0) as file:
+                    start = time.perf_counter()
+                    file.write(f"event {i}\n".encode())
+                    while not read_line(fd, buffer).startswith(b"event"):
+                        pass
+                latencies.append(time.perf_counter() - start)
+
+            idle_start = cpu_seconds(process.pid)
+            time.sleep(args.idle)
+            idle_cpu = cpu_seconds(process.pid) - idle_start
+        finally:
+            process.terminate()
+            process.wait()
+
+    latencies.sort()
+    print(f"files: {args.files}, writes: {args.writes}, follow: {args.follow}")
+    print(f"latency median: {statistics.median(latencies) * 1e3:.3f} ms")
+    print(f"latency p99:    {latencies[int(len(latencies) * 0.99) - 1] * 1e3:.3f} ms")
+    print(f"idle CPU:       {idle_cpu / args.idle * 100:.2f}% over {args.idle:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import ensure, parse_size
+
+
+def measure(command: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tail -n +K and -c against cat, from a file and from a pipe")
+    parser.add_argument("--size", type=parse_size, default="256MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tail = f"{shlex.quote(sys.executable)} -m src.tail.tail_main"
+    with tempfile.TemporaryDirectory() as directory:
+        path = shlex.quote(ensure("ascii", args.size, directory))
+        commands = {
+            "cat": f"cat {path} | cat",
+            "tail -n +2": f"{tail} -n +2 {path} | cat",
+            "tail -n +1000000": f"{tail} -n +1000000 {path} | cat",
+            "tail -c +1000": f"{tail} -c +1000 {path} | cat",
+            f"tail -c {args.size // 2}": f"{tail} -c {args.size // 2} {path} | cat",
+            "cat | tail -n +1000000": f"cat {path} | {tail} -n +1000000 | cat",
+            "cat | tail -c +1000": f"cat {path} | {tail} -c +1000 | cat",
+        }
+        for name, command in commands.items():
+            elapsed = measure(command, args.repeat)
+            print(f"{name:<24} {elapsed * 1000:7.0f} ms  {args.size / 1e6 / elapsed:7.0f} MB/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
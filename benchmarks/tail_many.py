@@ -0,0 +1,49 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LINE = b"2024-01-01T00:00:00 INFO request served in 12 ms\n"
+
+
+def measure(files: list[str], num_lines: int, in_flight: int, repeat: int) -> float:
+    command = [sys.executable, "-m", "src.tail.tail_main", "-n", str(num_lines), "--in-flight", str(in_flight), *files]
+    timings = []
+    for _ in range(repeat):
+        with open(os.devnull, "wb") as devnull:
+            start = time.perf_counter()
+            subprocess.run(command, stdout=devnull, check=True)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tail -n over many files: one at a time against the batched mode")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--lines-per-file", type=int, default=20_000)
+    parser.add_argument("-n", "--lines", type=int, nargs="+", default=[10, 5000])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for index in range(args.files):
+            path = os.path.join(directory, f"{index}.log")
+            with open(path, "wb") as file:
+                file.write(LINE * args.lines_per_file)
+            files.append(path)
+
+        for num_lines in args.lines:
+            baseline = None
+            for in_flight in args.in_flight:
+                elapsed = measure(files, num_lines, in_flight, args.repeat)
+                baseline = baseline or elapsed
+                print(f"-n {num_lines:<6} in-flight {in_flight:>3}  {elapsed:7.3f} s  x{baseline / elapsed:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
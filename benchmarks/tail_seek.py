@@ -0,0 +1,49 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from src.tail.tail import find_tail_offset
+
+SIZES = {"1MB": 1 << 20, "1GB": 1 << 30, "10GB": 10 << 30}
+TAIL = b"".join(f"2024-01-01T00:00:{i:02d} INFO request served in {i} ms\n".encode() for i in range(60))
+
+
+def make_log(path: str, size: int) -> None:
+    # The prefix is a sparse hole, so even the 10 GB input costs no disk space.
+    with open(path, "wb") as file:
+        file.truncate(size - len(TAIL))
+        file.seek(0, os.SEEK_END)
+        file.write(TAIL)
+
+
+def measure(path: str, num_lines: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, "rb") as file:
+            file.seek(find_tail_offset(file, num_lines))
+            file.read()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tail -n latency against input size")
+    parser.add_argument("-n", "--lines", type=int, default=17)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.sizes:
+            path = os.path.join(directory, f"{name}.log")
+            make_log(path, SIZES[name])
+            median = measure(path, args.lines, args.repeat)
+            print(f"{name:>6}  tail -n {args.lines}: {median * 1e6:9.1f} us (median of {args.repeat})")
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
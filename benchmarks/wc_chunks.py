@@ -0,0 +1,53 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from src.wc.wc import WC
+
+SOURCE = os.path.join("artifacts", "wc", "inputBig.txt")
+
+
+def replicate(path: str, size: int) -> None:
+    with open(SOURCE, "rb") as source:
+        data = source.read()
+    with open(path, "wb") as target:
+        for _ in range(max(1, size // len(data))):
+            target.write(data)
+
+
+def run(path: str, jobs: int) -> tuple[float, str]:
+    stdout = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stdout):
+        WC(jobs).process_data([path])
+    return time.perf_counter() - start, stdout.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc on one large file: serial vs chunk-parallel")
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--corpus", help="reuse an existing corpus file instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.corpus or os.path.join(directory, "inputBig_replicated.txt")
+        if not args.corpus:
+            replicate(path, args.size_mb * 1024 * 1024)
+        megabytes = os.path.getsize(path) / 1e6
+
+        serial_time, serial_output = run(path, 1)
+        parallel_time, parallel_output = run(path, args.jobs)
+        if serial_output.split()[:3] != parallel_output.split()[:3]:
+            raise SystemExit(f"count mismatch:\n  serial:   {serial_output}  parallel: {parallel_output}")
+
+        print(f"corpus: {megabytes:.0f} MB, counts: {' '.join(serial_output.split()[:3])}")
+        print(f"serial     {serial_time:8.3f} s  {megabytes / serial_time:8.1f} MB/s")
+        print(f"-j {args.jobs:<7} {parallel_time:8.3f} s  {megabytes / parallel_time:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from src.wc.wc import WC
+
+SOURCE = os.path.join("artifacts", "wc", "inputBig.txt")
+
+
+def make_shards(directory: str, count: int) -> list[str]:
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"shard_{i:05d}.txt")
+        shutil.copyfile(SOURCE, path)
+        paths.append(path)
+    return paths
+
+
+def measure(paths: list[str], jobs: int) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        WC(jobs).process_data(paths)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc -j scaling over many medium-sized files")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--jobs", type=int, nargs="+")
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    jobs_list = args.jobs or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_shards(directory, args.files)
+        megabytes = sum(os.path.getsize(path) for path in paths) / 1e6
+        baseline = None
+        for jobs in jobs_list:
+            elapsed = measure(paths, jobs)
+            baseline = baseline or elapsed
+            print(
+                f"-j {jobs:<3} {elapsed:7.3f} s  {megabytes / elapsed:8.1f} MB/s  "
+                f"speedup x{baseline / elapsed:.2f} ({args.files} files, {megabytes:.0f} MB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import ensure, parse_size
+
+
+def run_split(wc: str, path: str, workers: int, directory: str) -> float:
+    # Each worker counts its own byte range into a partial file, as separate hosts would; one merge sums them.
+    size = os.path.getsize(path)
+    step = -(-size // workers)
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            f"{wc} --partial --range={offset}-{offset + step} {shlex.quote(path)} > {directory}/part{offset}.jsonl",
+            shell=True,
+        )
+        for offset in range(0, size, step)
+    ]
+    for process in processes:
+        process.wait()
+    subprocess.run(f"{wc} --merge {directory}/part*.jsonl", shell=True, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def run_many(command: str, paths: list[str]) -> float:
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen(f"{command} {shlex.quote(path)}", shell=True, stdout=subprocess.DEVNULL) for path in paths
+    ]
+    for process in processes:
+        process.wait()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc split into ranges and merged, and runs adding to a shared total")
+    parser.add_argument("--size", type=parse_size, default="256MB")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--runs", type=int, default=32)
+    args = parser.parse_args()
+
+    wc = f"{shlex.quote(sys.executable)} -m src.wc.wc_main"
+    with tempfile.TemporaryDirectory() as directory:
+        path = ensure("unicode", args.size, directory)
+        start = time.perf_counter()
+        subprocess.run(f"{wc} {shlex.quote(path)}", shell=True, check=True, stdout=subprocess.DEVNULL)
+        print(f"{'wc':<28} {time.perf_counter() - start:7.3f} s", file=sys.stderr)
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as parts:
+                elapsed = run_split(wc, path, workers, parts)
+            print(f"{f'{workers} x --partial + --merge':<28} {elapsed:7.3f} s", file=sys.stderr)
+
+        # Many short runs add into one live total, with no partial files to write or collect.
+        name = f"wc-bench-{os.getpid()}"
+        small = [ensure("ascii", 1024 * 1024, directory)] * args.runs
+        try:
+            for label, command in ((f"{args.runs} runs", wc), (f"{args.runs} runs --shared", f"{wc} --shared={name}")):
+                print(f"{label:<28} {run_many(command, small):7.3f} s", file=sys.stderr)
+        finally:
+            subprocess.run(f"{wc} --reset-shared={name}", shell=True, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import tempfile
+import time
+from collections.abc import Collection
+
+from benchmarks.corpus import KINDS, ensure, parse_size
+from src.wc.counter import DEFAULT_FIELDS
+from src.wc.wc import count_file
+
+MODES: dict[str, Collection[str]] = {
+    "default": DEFAULT_FIELDS,
+    "-l": ("lines",),
+    "-w": ("words",),
+    "-m": ("chars",),
+    "-c": ("bytes_count",),
+    "-lwmc": ("lines", "words", "chars", "bytes_count"),
+}
+
+
+def measure(path: str, fields: Collection[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count_file(path, fields=fields)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc cost per selected counter")
+    parser.add_argument("--size", type=parse_size, default="64MB")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=["ascii", "unicode"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.kinds:
+            path = ensure(kind, args.size, directory)
+            baseline = measure(path, DEFAULT_FIELDS, args.repeat)
+            for mode, fields in MODES.items():
+                elapsed = measure(path, fields, args.repeat)
+                print(
+                    f"{kind:<8} {mode:<8} {elapsed * 1e3:9.2f} ms  {args.size / 1e6 / elapsed:9.0f} MB/s"
+                    f"  x{baseline / elapsed:.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+
+from src.wc import counter
+from src.wc.wc import count_file
+
+SOURCE = os.path.join("artifacts", "wc", "inputBig.txt")
+
+
+def count_lines_text(filename: str) -> tuple[int, int, int]:
+    # The line-by-line text-mode loop wc used before the byte engine.
+    lines = words = bytes_count = 0
+    with open(filename, encoding="utf-8") as file:
+        for line in file:
+            lines += 1
+            words += len(line.split())
+            bytes_count += len(line.encode("utf-8"))
+    return lines, words, bytes_count
+
+
+def count_bytes(filename: str) -> tuple[int, int, int]:
+    lines, words, _, bytes_count = count_file(filename)
+    return lines, words, bytes_count
+
+
+def count_translate_only(filename: str) -> tuple[int, int, int]:
+    original = counter.NUMPY_MIN_SIZE
+    counter.NUMPY_MIN_SIZE = 1 << 62
+    try:
+        return count_bytes(filename)
+    finally:
+        counter.NUMPY_MIN_SIZE = original
+
+
+def measure(func: Callable[[str], tuple[int, int, int]], path: str, repeat: int) -> tuple[float, tuple[int, int, int]]:
+    best = float("inf")
+    result = (0, 0, 0)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc counting throughput: text lines vs byte engine")
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(SOURCE, "rb") as source:
+        data = source.read()
+    with tempfile.NamedTemporaryFile(suffix=".txt") as corpus:
+        for _ in range(max(1, args.size_mb * 1024 * 1024 // len(data))):
+            corpus.write(data)
+        corpus.flush()
+        megabytes = os.path.getsize(corpus.name) / 1e6
+
+        engines: list[tuple[str, Callable[[str], tuple[int, int, int]]]] = [
+            ("text lines (old)", count_lines_text),
+            ("bytes + translate", count_translate_only),
+        ]
+        if counter._numpy() is not None:
+            engines.append(("bytes + numpy", count_bytes))
+        baseline = None
+        expected = None
+        for name, func in engines:
+            elapsed, result = measure(func, corpus.name, args.repeat)
+            if expected is not None and result != expected:
+                raise SystemExit(f"{name} counted {result}, expected {expected}")
+            expected = expected or result
+            baseline = baseline or elapsed
+            print(f"{name:<18} {elapsed:7.3f} s  {megabytes / elapsed:8.1f} MB/s  x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate
+
+# Small files spread over a few levels of directories, as in a source tree.
+FILE_SIZE = 4096
+
+
+def make_tree(directory: str, files: int, fanout: int) -> None:
+    data = b"".join(generate("ascii", FILE_SIZE))[:FILE_SIZE]
+    for index in range(files):
+        path = os.path.join(directory, f"d{index % fanout}", f"d{index // fanout % fanout}", f"f{index}.txt")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+
+def measure(command: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="wc -r against find | xargs wc over a tree of small files")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--fanout", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    wc = f"{shlex.quote(sys.executable)} -m src.wc.wc_main"
+    with tempfile.TemporaryDirectory() as directory:
+        make_tree(directory, args.files, args.fanout)
+        root = shlex.quote(directory)
+        commands = {
+            "find | xargs wc": f"find {root} -type f -print0 | xargs -0 {wc}",
+            "find | wc --files0-from": f"find {root} -type f -print0 | {wc} --files0-from=-",
+            "wc -r": f"{wc} -r {root}",
+            "wc -r --in-flight 8": f"{wc} -r --in-flight 8 {root}",
+            "wc -r -j 4": f"{wc} -r -j 4 {root}",
+        }
+        for name, command in commands.items():
+            elapsed = measure(command, args.repeat)
+            print(f"{name:<24} {elapsed:7.3f} s  {args.files / elapsed:8.0f} files/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
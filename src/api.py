@@ -0,0 +1,23 @@
+from src.errors import ToolError
+from src.nl.nl import NumberedLine, format_lines, number_file, number_lines
+from src.tail.tail import read_tail, tail_lines
+from src.wc.partial import Partial, merge_partials, read_partials
+from src.wc.wc import WCResult, count, count_many, count_partial, count_stream
+
+__all__ = [
+    "NumberedLine",
+    "Partial",
+    "ToolError",
+    "WCResult",
+    "count",
+    "count_many",
+    "count_partial",
+    "count_stream",
+    "format_lines",
+    "merge_partials",
+    "number_file",
+    "number_lines",
+    "read_partials",
+    "read_tail",
+    "tail_lines",
+]
@@ -0,0 +1,6 @@
+class ToolError(Exception):
+    def __init__(self, filename: str, error: Exception | str) -> None:
+        self.filename: str = filename
+        self.error: Exception | str = error
+        reason = "No such file or directory" if isinstance(error, FileNotFoundError) else str(error)
+        super().__init__(f"{filename}: {reason}" if filename else reason)
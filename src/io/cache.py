@@ -0,0 +1,20 @@
+import os
+
+APP_NAME = "itmo_lab_1"
+# The bytes just before a cached end of file are hashed, so a rewrite of the prefix is not taken for an append.
+CHECK_SIZE = 4096
+
+
+def cache_dir() -> str:
+    override = os.environ.get("LAB_CACHE_DIR")
+    if override:
+        return override
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME)
+
+
+def tail_digest(fd: int, size: int) -> bytes:
+    import hashlib  # noqa: PLC0415
+
+    data = os.pread(fd, min(CHECK_SIZE, size), max(0, size - CHECK_SIZE))
+    return hashlib.blake2b(data, digest_size=16).digest()
@@ -0,0 +1,123 @@
+import importlib
+import io
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from typing import BinaryIO, cast
+
+# Enough of a header to tell the formats apart without mistaking text for one of them.
+MAGIC_SIZE = 10
+# A BGZF (bgzip) member is a gzip member whose extra field records its own compressed size.
+_BGZF_PREFIX = b"\x1f\x8b\x08\x04"
+_BGZF_HEADER_SIZE = 18
+_UINT16 = struct.Struct("<H")
+_SUBFIELD = struct.Struct("<2sH")
+
+
+def compression(header: bytes) -> str | None:
+    if header.startswith(b"\x1f\x8b\x08"):
+        return "gzip"
+    # "BZh", the block size digit, then the magic of a first block or of an empty stream's end.
+    if header[:3] == b"BZh" and header[3:4].isdigit() and header[4:10] in (b"1AY&SY", b"\x17rE8P\x90"):
+        return "bzip2"
+    if header.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    if header.startswith(b"\x28\xb5\x2f\xfd"):
+        return "zstd"
+    return None
+
+
+def peek_compression(file: io.BufferedReader) -> str | None:
+    if file.seekable():
+        # pread moves nothing and reads only the header, where peek would fill a whole buffer.
+        return compression(os.pread(file.fileno(), MAGIC_SIZE, file.tell()))
+    # On a pipe, peek leaves the bytes in the read buffer for whoever reads it next.
+    return compression(file.peek(MAGIC_SIZE)[:MAGIC_SIZE])
+
+
+class _Decompressed(io.BufferedIOBase):
+    # No fileno and no seek: to a Source this is a pipe, so nothing maps or seeks the compressed bytes.
+    def __init__(self, stream: BinaryIO) -> None:
+        super().__init__()
+        self.stream: BinaryIO = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> bytes:
+        return self.stream.read(-1 if size is None else size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def readline(self, size: int | None = -1) -> bytes:
+        return self.stream.readline(-1 if size is None else size)
+
+    def close(self) -> None:
+        self.stream.close()
+        super().close()
+
+
+def _zstd_stream(file: BinaryIO) -> BinaryIO:
+    try:
+        return cast(BinaryIO, importlib.import_module("compression.zstd").ZstdFile(file))
+    except ImportError:
+        pass
+    try:
+        zstandard = importlib.import_module("zstandard")
+    except ImportError:
+        raise ValueError("zstd input needs Python 3.14 or the zstandard package") from None
+    return cast(BinaryIO, io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(file, closefd=False)))
+
+
+def open_decompressed(file: BinaryIO, kind: str) -> BinaryIO:
+    # The decompressors are imported only when a compressed input turns up; none of them closes `file`.
+    stream: BinaryIO
+    if kind == "gzip":
+        import gzip  # noqa: PLC0415
+
+        stream = cast(BinaryIO, gzip.GzipFile(fileobj=file, mode="rb"))
+    elif kind == "bzip2":
+        import bz2  # noqa: PLC0415
+
+        stream = cast(BinaryIO, bz2.BZ2File(file))
+    elif kind == "xz":
+        import lzma  # noqa: PLC0415
+
+        stream = cast(BinaryIO, lzma.LZMAFile(file))  # noqa: SIM115
+    else:
+        stream = _zstd_stream(file)
+    return cast(BinaryIO, _Decompressed(stream))
+
+
+def bgzf_member_size(data: bytes | mmap.mmap, offset: int) -> int | None:
+    if data[offset : offset + 4] != _BGZF_PREFIX or offset + _BGZF_HEADER_SIZE > len(data):
+        return None
+    position = offset + 12
+    extra_end = position + _UINT16.unpack_from(data, offset + 10)[0]
+    while position + _SUBFIELD.size <= min(extra_end, len(data) - 2):
+        name, size = _SUBFIELD.unpack_from(data, position)
+        if name == b"BC" and size == 2:
+            return int(_UINT16.unpack_from(data, position + _SUBFIELD.size)[0]) + 1
+        position += _SUBFIELD.size + size
+    return None
+
+
+def bgzf_offsets(data: bytes | mmap.mmap, start: int = 0, end: int | None = None) -> array[int] | None:
+    # Member starts followed by the end offset; None unless [start, end) is entirely BGZF members.
+    # Only the 18-byte headers are read, so finding the members of a large file is cheap.
+    end = len(data) if end is None else end
+    offsets = array("q", [start])
+    while offsets[-1] < end:
+        size = bgzf_member_size(data, offsets[-1])
+        if size is None:
+            return None
+        offsets.append(offsets[-1] + size)
+    return offsets if offsets[-1] == end and len(offsets) > 1 else None
+
+
+def inflate_member(data: bytes | mmap.mmap, start: int, end: int) -> bytes:
+    # A BGZF member inflates to at most 64 KiB.
+    return zlib.decompress(data[start:end], wbits=31)
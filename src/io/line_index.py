@@ -0,0 +1,194 @@
+import contextlib
+import os
+import stat
+import struct
+import sys
+from array import array
+from collections.abc import Iterable
+
+from src.io.cache import cache_dir, tail_digest
+from src.io.reader import Source
+
+# Every STRIDE-th line start is recorded, so a lookup scans at most STRIDE lines past the nearest sample.
+STRIDE = 1024
+# Smaller files are scanned faster than a sidecar can be opened and checked.
+INDEX_MIN_SIZE = 16 * 1024 * 1024
+PIECE_SIZE = 4096
+# Sidecars kept at most; the least recently used ones are removed when a new one is saved.
+MAX_INDEXES = 1000
+
+_MAGIC = b"LNIDX\x00\x00\x01"
+_HEADER = struct.Struct("<8sQQqQ?16s")
+
+
+def _nth_newline(data: bytes, start: int, count: int) -> int:
+    # Whole pieces are skipped with a C-level count; only the last one is walked newline by newline.
+    position = start
+    while (found := data.count(b"\n", position, position + PIECE_SIZE)) < count:
+        count -= found
+        position += PIECE_SIZE
+    for _ in range(count):
+        position = data.find(b"\n", position) + 1
+    return position
+
+
+def skip_lines(blocks: Iterable[bytes | memoryview], count: int) -> int:
+    offset = 0
+    if count <= 0:
+        return offset
+    for block in blocks:
+        data = bytes(block)
+        found = data.count(b"\n")
+        if found >= count:
+            return offset + _nth_newline(data, 0, count)
+        count -= found
+        offset += len(data)
+    return offset
+
+
+class LineIndex:
+    def __init__(self, stride: int | None = None) -> None:
+        self.stride: int = stride or STRIDE
+        self.size: int = 0
+        self.mtime_ns: int = 0
+        self.newlines: int = 0
+        self.ends_with_newline: bool = False
+        self.digest: bytes = b""
+        self.offsets: array[int] = array("Q", [0])
+
+    @property
+    def lines(self) -> int:
+        return self.newlines + (1 if self.size and not self.ends_with_newline else 0)
+
+    def extend(self, source: Source, file_stat: os.stat_result) -> None:
+        target = len(self.offsets) * self.stride
+        offset = self.size
+        for block in source.blocks(start=self.size, end=file_stat.st_size):
+            data = bytes(block)
+            found = data.count(b"\n")
+            position = 0
+            while self.newlines + found >= target:
+                step = target - self.newlines
+                position = _nth_newline(data, position, step)
+                found -= step
+                self.newlines = target
+                self.offsets.append(offset + position)
+                target += self.stride
+            self.newlines += found
+            offset += len(data)
+            if data:
+                self.ends_with_newline = data[-1] == 0x0A
+        self.size = offset
+        self.mtime_ns = file_stat.st_mtime_ns
+        self.digest = tail_digest(source.file.fileno(), self.size)
+
+    def line_offset(self, source: Source, line: int) -> int:
+        if line >= self.lines:
+            return self.size
+        sample = min(line // self.stride, len(self.offsets) - 1)
+        start = self.offsets[sample]
+        return start + skip_lines(source.blocks(start=start, end=self.size), line - sample * self.stride)
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(
+            _MAGIC, self.stride, self.size, self.mtime_ns, self.newlines, self.ends_with_newline, self.digest
+        )
+        return header + self.offsets.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LineIndex | None":
+        if len(data) < _HEADER.size or (len(data) - _HEADER.size) % 8:
+            return None
+        magic, stride, size, mtime_ns, newlines, ends_with_newline, digest = _HEADER.unpack_from(data)
+        if magic != _MAGIC or sys.byteorder != "little":
+            return None
+        index = cls(stride)
+        index.size, index.mtime_ns, index.newlines = size, mtime_ns, newlines
+        index.ends_with_newline, index.digest = ends_with_newline, digest
+        index.offsets = array("Q")
+        index.offsets.frombytes(data[_HEADER.size :])
+        return index if index.offsets else None
+
+
+def index_path(file_stat: os.stat_result, directory: str | None = None) -> str:
+    return os.path.join(directory or os.path.join(cache_dir(), "line-index"), f"{file_stat.st_dev}-{file_stat.st_ino}")
+
+
+def _load(path: str) -> LineIndex | None:
+    try:
+        with open(path, "rb") as file:
+            return LineIndex.from_bytes(file.read())
+    except OSError:
+        return None
+
+
+def _touch(path: str) -> None:
+    # A hit marks the sidecar as recently used, so pruning removes the ones nobody reads.
+    with contextlib.suppress(OSError):
+        os.utime(path)
+
+
+def _prune(directory: str, keep: int) -> None:
+    with contextlib.suppress(OSError):
+        entries = [entry for entry in os.scandir(directory) if entry.is_file(follow_symlinks=False)]
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime_ns)[: max(len(entries) - keep, 0)]:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(entry.path)
+
+
+def _save(index: LineIndex, path: str) -> None:
+    # Written aside and renamed into place, so a concurrent reader never sees half an index.
+    import tempfile  # noqa: PLC0415
+
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(index.to_bytes())
+            os.replace(temporary, path)
+        except OSError:
+            os.unlink(temporary)
+            raise
+    _prune(os.path.dirname(path), MAX_INDEXES)
+
+
+def index_for(source: Source, build: bool = True, directory: str | None = None) -> LineIndex | None:
+    try:
+        file_stat = os.fstat(source.file.fileno())
+    except (OSError, ValueError):
+        return None
+    # Spooled pipes (already unlinked) and partly consumed descriptors are not worth a sidecar.
+    if not stat.S_ISREG(file_stat.st_mode) or not file_stat.st_nlink or source.origin:
+        return None
+    if file_stat.st_size < INDEX_MIN_SIZE:
+        return None
+
+    path = index_path(file_stat, directory)
+    index = _load(path)
+    if index is not None and index.size == file_stat.st_size and index.mtime_ns == file_stat.st_mtime_ns:
+        _touch(path)
+        return index
+    # A file that only grew keeps its samples; the index is extended from the old end of file.
+    grown = (
+        index is not None
+        and index.size < file_stat.st_size
+        and index.digest == tail_digest(source.file.fileno(), index.size)
+    )
+    if not grown:
+        if not build:
+            return None
+        index = LineIndex()
+    assert index is not None
+    index.extend(source, file_stat)
+    _save(index, path)
+    return index
+
+
+def seek_line(source: Source, line: int, build: bool = True, directory: str | None = None) -> int:
+    if line <= 0:
+        return 0
+    index = index_for(source, build, directory)
+    if index is not None:
+        return index.line_offset(source, line)
+    return skip_lines(source.blocks(), line)
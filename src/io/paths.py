@@ -0,0 +1,96 @@
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from src.errors import ToolError
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+WALK_THREADS = 8
+_GLOB_CHARS = frozenset("*?[")
+
+# A directory's entries, sorted by name: a file has no listing of its own, a subdirectory's is being read.
+type _Listing = list[tuple[str, "Future[_Listing] | None"]]
+
+
+def has_glob(name: str) -> bool:
+    return not _GLOB_CHARS.isdisjoint(name)
+
+
+def read_names0(filename: str) -> list[str]:
+    # File names separated by NUL bytes, as written by `find -print0`; "-" reads them from stdin.
+    try:
+        if filename == "-":
+            data = sys.stdin.buffer.read()
+        else:
+            with open(filename, "rb") as file:
+                data = file.read()
+    except OSError as e:
+        raise ToolError("", f"cannot open '{filename}' for reading: {e.strerror}") from e
+    names = data.split(b"\0")
+    if names[-1] == b"":
+        names.pop()
+    for number, name in enumerate(names, 1):
+        if not name:
+            raise ToolError(f"{filename}:{number}", "invalid zero-length file name")
+    return list(map(os.fsdecode, names))
+
+
+def _scan(executor: "ThreadPoolExecutor", path: str) -> _Listing:
+    try:
+        with os.scandir(path) as entries:
+            found = sorted((entry.name, entry) for entry in entries)
+    except OSError as e:
+        raise ToolError(path, e) from e
+    listing: _Listing = []
+    for _, entry in found:
+        # As with grep -r, symbolic links met on the way down are not followed, nor are devices and pipes counted.
+        if entry.is_dir(follow_symlinks=False):
+            listing.append((entry.path, executor.submit(_scan, executor, entry.path)))
+        elif entry.is_file(follow_symlinks=False):
+            listing.append((entry.path, None))
+    return listing
+
+
+def _files(listing: _Listing) -> Iterator[str]:
+    for path, child in listing:
+        if child is None:
+            yield path
+        else:
+            yield from _files(child.result())
+
+
+def walk_files(root: str, threads: int = WALK_THREADS) -> Iterator[str]:
+    # Every directory is listed by the thread pool as soon as its parent is, well ahead of the consumer;
+    # files still come out depth first and sorted by name, whichever listing finishes first.
+    from concurrent.futures import ThreadPoolExecutor  # noqa: PLC0415
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="walk")
+    try:
+        yield from _files(_scan(executor, root))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def expand_paths(names: Iterable[str], recursive: bool = False) -> Iterator[tuple[str, str | None]]:
+    # Each file to count with the directory it was found under, or None for a file named directly.
+    # A pattern is expanded only when no file has that very name, so quoted names with `*` still work.
+    for name in names:
+        if has_glob(name) and not os.path.lexists(name):
+            import glob  # noqa: PLC0415
+
+            matches = sorted(glob.glob(name, recursive=True))
+            if not matches:
+                raise ToolError(name, FileNotFoundError())
+            if not recursive:
+                # Only a walk looks inside a directory; a pattern like `tree/**/*` also matches the directories.
+                matches = [path for path in matches if not os.path.isdir(path)]
+        else:
+            matches = [name]
+        for path in matches:
+            if recursive and os.path.isdir(path):
+                yield from ((found, path) for found in walk_files(path))
+            else:
+                yield path, None
@@ -0,0 +1,54 @@
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from itertools import islice
+
+IN_FLIGHT = 32
+
+
+def parse_in_flight(tool: str, value: str) -> int:
+    # The value of --in-flight, shared by every tool; a bad one is an option error of that tool.
+    try:
+        in_flight = int(value)
+    except ValueError:
+        in_flight = 0
+    if in_flight <= 0:
+        print(f"{tool}: invalid number of reads in flight: {value}", file=sys.stderr)
+        sys.exit(1)
+    return in_flight
+
+
+def read_ordered[T](
+    names: Iterable[str], read: Callable[[str], T], limit: int = IN_FLIGHT
+) -> Iterator[tuple[str, T | None, Exception | None]]:
+    # At most `limit` reads are queued or running and finished results wait in argument order,
+    # so memory is bounded by the window however many names there are.
+    # asyncio and the executor are imported here: they cost more than a short run of the tools themselves.
+    import asyncio  # noqa: PLC0415
+    from concurrent.futures import ThreadPoolExecutor  # noqa: PLC0415
+
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="prefetch")
+    pending: deque[tuple[str, asyncio.Future[T]]] = deque()
+    remaining = iter(names)
+
+    def submit(count: int) -> None:
+        for name in islice(remaining, count):
+            pending.append((name, loop.run_in_executor(executor, read, name)))
+
+    try:
+        submit(limit)
+        while pending:
+            name, future = pending.popleft()
+            try:
+                result: T | None = loop.run_until_complete(future)
+                error: Exception | None = None
+            except Exception as e:
+                result, error = None, e
+            submit(1)
+            yield name, result, error
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+        loop.close()
@@ -0,0 +1,123 @@
+import contextlib
+import mmap
+import os
+import stat
+from collections.abc import Buffer, Iterable, Iterator
+from typing import BinaryIO
+
+from src.io.compressed import open_decompressed, peek_compression
+
+BLOCK_SIZE = 1024 * 1024
+USE_MMAP = True
+
+
+class Source:
+    def __init__(self, file: BinaryIO, use_mmap: bool | None = None) -> None:
+        self.file: BinaryIO = file
+        self.map: mmap.mmap | None = None
+        self.size: int | None = None
+        self.origin: int = file.tell() if file.seekable() else 0
+        try:
+            file_stat = os.fstat(file.fileno())
+        except (OSError, ValueError):
+            return
+        if stat.S_ISREG(file_stat.st_mode):
+            self.size = file_stat.st_size
+        # Pipes, devices and empty files cannot be mapped and keep using buffered reads,
+        # as does an inherited descriptor that has already been partly consumed.
+        if (USE_MMAP if use_mmap is None else use_mmap) and self.size and not self.origin:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self.map, "madvise"):
+                self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self) -> "Source":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.map is not None:
+            # A slice a caller still holds keeps the mapping alive until it is collected.
+            with contextlib.suppress(BufferError):
+                self.map.close()
+            self.map = None
+
+    def blocks(
+        self, block_size: int = BLOCK_SIZE, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes | memoryview]:
+        if self.map is not None:
+            end = len(self.map) if end is None else min(end, len(self.map))
+            with memoryview(self.map) as view:
+                for offset in range(start, end, block_size):
+                    self._prefetch(offset + block_size, block_size)
+                    yield view[offset : min(offset + block_size, end)]
+            return
+
+        self._rewind(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            block = self.file.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                return
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+    def _prefetch(self, offset: int, size: int) -> None:
+        # Ask the kernel to start reading the next block while the current one is processed.
+        if self.map is not None and offset < len(self.map) and hasattr(mmap, "MADV_WILLNEED"):
+            self.map.madvise(mmap.MADV_WILLNEED, offset - offset % mmap.PAGESIZE, size)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        if self.map is not None:
+            return self.map[offset : offset + size]
+        return os.pread(self.file.fileno(), size, self.origin + offset)
+
+    def lines(self, start: int = 0) -> Iterator[bytes]:
+        if self.map is None:
+            self._rewind(start)
+            yield from self.file
+            return
+        # mmap.readline walks the newline offsets in C, faster than a Python-level find loop.
+        self.map.seek(start)
+        yield from iter(self.map.readline, b"")
+
+    def _rewind(self, offset: int) -> None:
+        if self.file.seekable():
+            self.file.seek(self.origin + offset)
+
+    def count_lines(self) -> int:
+        newlines = 0
+        last = b""
+        for block in self.blocks():
+            data = bytes(block)
+            newlines += data.count(b"\n")
+            last = data[-1:]
+        return newlines + (last not in (b"", b"\n"))
+
+
+@contextlib.contextmanager
+def open_source(filename: str, use_mmap: bool | None = None, decompress: bool = True) -> Iterator[Source]:
+    with open(filename, "rb") as file:
+        # A compressed file is read through its decompressor, which a Source treats like a pipe.
+        kind = peek_compression(file) if decompress else None
+        if kind is None:
+            with Source(file, use_mmap) as source:
+                yield source
+            return
+        with open_decompressed(file, kind) as stream, Source(stream) as source:
+            yield source
+
+
+@contextlib.contextmanager
+def spool(chunks: Iterable[Buffer]) -> Iterator[BinaryIO]:
+    # A temporary file keeps RAM flat while a non-seekable input is made re-readable.
+    import tempfile  # noqa: PLC0415
+
+    with tempfile.TemporaryFile() as file:
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
+        file.seek(0)
+        yield file
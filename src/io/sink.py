@@ -0,0 +1,149 @@
+import os
+import signal
+import sys
+from typing import BinaryIO, NoReturn, TextIO
+
+FLUSH_SIZE = 64 * 1024
+COPY_SIZE = 1024 * 1024
+
+
+def _sendfile(in_fd: int, out_fd: int, offset: int, count: int) -> int:
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+
+def _copy_file_range(in_fd: int, out_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(in_fd, out_fd, count, offset)
+
+
+# sendfile covers pipes, ttys and (on Linux) regular files; copy_file_range can still
+# reflink or copy server-side when stdout is a file sendfile refuses.
+KERNEL_COPIES = [
+    copy for copy, name in ((_sendfile, "sendfile"), (_copy_file_range, "copy_file_range")) if hasattr(os, name)
+]
+
+
+def kernel_copy(in_fd: int, out_fd: int, offset: int, count: int) -> int:
+    copied = 0
+    for copy in KERNEL_COPIES:
+        try:
+            while copied < count:
+                sent = copy(in_fd, out_fd, offset + copied, count - copied)
+                if not sent:
+                    return copied
+                copied += sent
+            return copied
+        except BrokenPipeError:
+            raise
+        except OSError:
+            continue
+    return copied
+
+
+class OutputSink:
+    def __init__(
+        self, stream: TextIO | None = None, line_buffered: bool | None = None, flush_size: int = FLUSH_SIZE
+    ) -> None:
+        self._stream: TextIO | None = stream
+        self._line_buffered: bool | None = line_buffered
+        self.flush_size: int = flush_size
+        self.pending: bytearray = bytearray()
+        self._target: TextIO | None = None
+        self._raw: BinaryIO | None = None
+        self._flush_each_write: bool = False
+
+    def write(self, data: bytes) -> None:
+        self.pending += data
+        if len(self.pending) >= self.flush_size or self._resolve()[2]:
+            self.flush()
+
+    def write_text(self, text: str) -> None:
+        self.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        stream, raw, _ = self._resolve()
+        try:
+            if raw is None:
+                stream.write(self.pending.decode("utf-8", errors="replace"))
+            else:
+                # Anything already written through the text layer must come out first.
+                stream.flush()
+                raw.write(self.pending)
+                raw.flush()
+            stream.flush()
+        except BrokenPipeError:
+            self._exit_on_broken_pipe(stream)
+        self.pending.clear()
+
+    def copy_from(self, fd: int, offset: int, count: int) -> None:
+        # The range goes from descriptor to descriptor without being read into Python; whatever
+        # the kernel will not copy falls back to large preads through the buffer.
+        stream, out_fd = self._output_fd()
+        if out_fd is not None:
+            try:
+                copied = kernel_copy(fd, out_fd, offset, count)
+            except BrokenPipeError:
+                self._exit_on_broken_pipe(stream)
+            offset += copied
+            count -= copied
+        while count > 0 and (data := os.pread(fd, min(COPY_SIZE, count), offset)):
+            self.write(data)
+            offset += len(data)
+            count -= len(data)
+
+    def copy_stream(self, fd: int) -> int:
+        # Everything left in fd, spliced from pipe to descriptor by the kernel where one end is a pipe,
+        # and read in large pieces otherwise.
+        stream, out_fd = self._output_fd()
+        copied = 0
+        if out_fd is not None and hasattr(os, "splice"):
+            try:
+                while sent := os.splice(fd, out_fd, COPY_SIZE):
+                    copied += sent
+                return copied
+            except BrokenPipeError:
+                self._exit_on_broken_pipe(stream)
+            except OSError:
+                pass
+        while data := os.read(fd, COPY_SIZE):
+            self.write(data)
+            copied += len(data)
+        return copied
+
+    def _output_fd(self) -> tuple[TextIO, int | None]:
+        # Pending output goes first, so bytes copied past Python land after it.
+        self.flush()
+        stream, _, _ = self._resolve()
+        try:
+            stream.flush()
+            return stream, stream.fileno()
+        except BrokenPipeError:
+            self._exit_on_broken_pipe(stream)
+        except (AttributeError, OSError, ValueError):
+            return stream, None
+
+    def _resolve(self) -> tuple[TextIO, BinaryIO | None, bool]:
+        # sys.stdout is looked up on every use, so redirections made after construction are honoured.
+        stream = self._stream or sys.stdout
+        if stream is not self._target:
+            self._target = stream
+            self._raw = getattr(stream, "buffer", None)
+            if self._line_buffered is None:
+                isatty = getattr(stream, "isatty", None)
+                self._flush_each_write = bool(isatty and isatty())
+            else:
+                self._flush_each_write = self._line_buffered
+        return stream, self._raw, self._flush_each_write
+
+    def _exit_on_broken_pipe(self, stream: TextIO) -> NoReturn:
+        # The reader went away (as in `nl big.txt | head`): drop the output and leave quietly,
+        # pointing the descriptor at /dev/null so the interpreter's final flush cannot fail again.
+        self.pending.clear()
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, stream.fileno())
+            os.close(devnull)
+        except (OSError, ValueError):
+            pass
+        sys.exit(128 + signal.SIGPIPE)
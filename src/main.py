@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import importlib
+import os
+import sys
+
+# Only the chosen tool's module is imported, so one entry point costs no more startup than three.
+TOOLS = {"wc": "src.wc.wc_main", "tail": "src.tail.tail_main", "nl": "src.nl.nl_main"}
+USAGE = f"usage: main {{{','.join(TOOLS)}}} [ARGS...] | main serve [--socket PATH]"
+
+
+def run(tool: str, args: list[str]) -> None:
+    sys.argv = [tool, *args]
+    importlib.import_module(TOOLS[tool]).main()
+
+
+def main() -> None:
+    # Dispatch on the name the program was started as (a `wc` symlink to this file), else on a subcommand.
+    name = os.path.basename(sys.argv[0]).removesuffix(".py")
+    args = sys.argv[1:]
+    if name not in TOOLS:
+        if not args:
+            print(USAGE, file=sys.stderr)
+            sys.exit(1)
+        name, args = args[0], args[1:]
+
+    if name == "serve":
+        from src.server import server  # noqa: PLC0415
+
+        server.main(args)
+        return
+    if name not in TOOLS:
+        print(f"main: unknown tool: '{name}'", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+
+    # LAB_SERVER=1 (or a socket path) hands the run to a warm server; without one the tool runs here.
+    setting = os.environ.get("LAB_SERVER")
+    if setting:
+        from src.server import client  # noqa: PLC0415
+
+        code = client.run(name, args, client.socket_path(setting))
+        if code is not None:
+            sys.exit(code)
+    run(name, args)
+
+
+if __name__ == "__main__":
+    if not __package__:
+        # Started as a script (or through a tool-named symlink): make `src` importable from the repository root.
+        sys.path[0] = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    main()
@@ -1,36 +1,209 @@
+import os
+import stat
 import sys
-from typing import NoReturn, TextIO
+from collections.abc import Iterable, Iterator
+from functools import partial
+from itertools import batched, islice
+from typing import BinaryIO, NamedTuple, NoReturn, TextIO
+
+from src.errors import ToolError
+from src.io.compressed import MAGIC_SIZE, compression
+from src.io.line_index import index_for, seek_line, skip_lines
+from src.io.prefetch import read_ordered
+from src.io.reader import BLOCK_SIZE, Source, open_source, spool
+from src.io.sink import OutputSink
+from src.nl.numbering import BATCH_LINES, DEFAULT_FORMAT, Formatter, NumberFormat, strip_line
+from src.stats import stats
+
+# Files up to this size are read whole by the concurrent reader; larger ones are streamed in order.
+PREFETCH_MAX_SIZE = 1024 * 1024
+
+
+class NumberedLine(NamedTuple):
+    number: int
+    text: str
+
+    def format(self, width: int) -> str:
+        return f"{str(self.number).rjust(width)}\t{self.text}\n"
+
+
+def number_lines(lines: Iterable[bytes | str], start: int = 1) -> Iterator[NumberedLine]:
+    for number, line in enumerate(lines, start):
+        text = line.decode("utf-8", errors="replace") if isinstance(line, bytes) else line
+        yield NumberedLine(number, text.rstrip())
+
+
+def format_lines(lines: Iterable[bytes], start: int, width: int) -> Iterator[bytes]:
+    # The same output as NumberedLine.format, without building a tuple or decoding per line.
+    for number, line in enumerate(lines, start):
+        yield b"%*d\t%s\n" % (width, number, strip_line(line))
+
+
+def number_file(filename: str, start: int = 1, from_line: int = 1) -> Iterator[NumberedLine]:
+    try:
+        with open_source(filename) as source:
+            skip = max(from_line - 1, 0)
+            if source.file.seekable():
+                lines: Iterable[bytes] = source.lines(seek_line(source, skip))
+            else:
+                lines = islice(source.lines(), skip, None)
+            yield from number_lines(lines, start + skip)
+    except Exception as e:
+        raise ToolError(filename, e) from e
 
 
 class NL:
-    def __init__(self) -> None:
-        self.line_number: int = 1
+    def __init__(
+        self,
+        width: int | None = None,
+        line_buffered: bool | None = None,
+        from_line: int = 1,
+        numbering: NumberFormat = DEFAULT_FORMAT,
+    ) -> None:
+        # The formatter keeps the line number and section across files, as nl numbers its inputs as one text.
+        self.formatter: Formatter = Formatter(numbering)
+        self.width: int | None = width
+        # Lines before from_line are skipped but still counted, so numbering stays that of the whole file.
+        self.from_line: int = from_line
+        self.output: OutputSink = OutputSink(line_buffered=line_buffered)
 
     def process_file(self, filename: str) -> None:
+        stats.add("files")
+        stats.phase("open")
         try:
-            with open(filename, encoding="utf-8") as file:
-                lines: list[str] = file.readlines()
-                self._print_lines(lines)
-        except FileNotFoundError:
-            print(f"nl: {filename}: No such file or directory", file=sys.stderr)
-            self._exit_with_error()
+            with open_source(filename) as source:
+                self._number_source(source)
         except Exception as e:
-            print(f"nl: {filename}: {e}", file=sys.stderr)
-            self._exit_with_error()
+            self._report_error(ToolError(filename, e))
+        self.output.flush()
+
+    def process_files(self, filenames: list[str], in_flight: int) -> None:
+        stats.phase("open")
+        for filename, data, error in read_ordered(filenames, _read_small_file, in_flight):
+            stats.add("files")
+            if error is not None:
+                self._report_error(ToolError(filename, error))
+            if data is None:
+                self.process_file(filename)
+                continue
+            try:
+                self._number_data(data)
+            except Exception as e:
+                self._report_error(ToolError(filename, e))
+            stats.phase("open")
+        self.output.flush()
 
     def process_stream(self, stream: TextIO) -> None:
         try:
-            lines: list[str] = stream.readlines()
-            self._print_lines(lines)
+            buffer: BinaryIO | None = getattr(stream, "buffer", None)
+            if self.width is not None:
+                lines = iter(buffer if buffer is not None else (line.encode("utf-8") for line in stream))
+                self.formatter.skip(islice(lines, self.from_line - 1))
+                self._print_lines(lines, self.width)
+                self.output.flush()
+                return
+            if buffer is not None:
+                chunks: Iterable[bytes] = iter(partial(buffer.read, BLOCK_SIZE), b"")
+            else:
+                chunks = (chunk.encode("utf-8") for chunk in iter(partial(stream.read, BLOCK_SIZE), ""))
+            with spool(chunks) as file, Source(file) as source:
+                self._number_source(source)
+            self.output.flush()
         except Exception as e:
             print(f"nl: error reading from stream: {e}", file=sys.stderr)
             self._exit_with_error()
 
-    def _print_lines(self, lines: list[str]) -> None:
-        max_number_length: int = len(str(self.line_number + len(lines) - 1))
-        for line in lines:
-            print(f"{str(self.line_number).rjust(max_number_length)}\t{line.rstrip()}", flush=True)
-            self.line_number += 1
+    def _number_source(self, source: Source) -> None:
+        stats.phase("scan")
+        skip = max(self.from_line - 1, 0)
+        if source.size is None and (self.width is None or skip):
+            # The width depends on the line count, so a pipe is spooled to disk and numbered in a second pass.
+            with spool(source.blocks()) as file, Source(file) as spooled:
+                self._number_source(spooled)
+            return
+
+        index = index_for(source, build=skip > 0) if source.size is not None else None
+        total: int | None = index.lines if index is not None else None
+        if skip:
+            start = index.line_offset(source, skip) if index is not None else skip_lines(source.blocks(), skip)
+            if start >= (source.size or 0):
+                total = source.count_lines() if total is None else total
+                skip = min(skip, total)
+            self._skip_source(source, skip, start)
+        else:
+            start = 0
+        if self.width is not None:
+            width = self.width
+        else:
+            total = source.count_lines() if total is None else total
+            width = self.formatter.width(total - skip)
+        self._print_lines(source.lines(start), width)
+
+    def _skip_source(self, source: Source, skip: int, end: int) -> None:
+        # Numbers advance by arithmetic only when every skipped line takes one; otherwise the lines are read.
+        if self.formatter.counts_every_line() and not _contains(source, self.formatter.delimiter, end):
+            self.formatter.advance(skip)
+        else:
+            self.formatter.skip(islice(source.lines(), skip))
+
+    def _number_data(self, data: bytes) -> None:
+        lines = data.split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+        skip = min(max(self.from_line - 1, 0), len(lines))
+        self.formatter.skip(lines[:skip])
+        width = self.width or self.formatter.width(len(lines) - skip)
+        self._print_lines(lines[skip:], width)
+
+    def _print_lines(self, lines: Iterable[bytes], width: int) -> None:
+        if (active := stats.active()) is not None:
+            self._print_lines_measured(lines, width, active)
+            return
+        write = self.output.write
+        format_batch = self.formatter.format
+        for batch in batched(lines, BATCH_LINES, strict=False):
+            write(format_batch(batch, width))
+
+    def _print_lines_measured(self, lines: Iterable[bytes], width: int, active: stats.Stats) -> None:
+        # The same output as _print_lines, with every batch's time split between reading, formatting and printing.
+        printed = 0
+        active.switch("read")
+        for batch in batched(lines, BATCH_LINES, strict=False):
+            active.switch("format")
+            text = self.formatter.format(batch, width)
+            active.switch("print")
+            self.output.write(text)
+            printed += len(batch)
+            active.switch("read")
+        active.add("lines", printed)
+
+    def _report_error(self, error: ToolError) -> NoReturn:
+        print(f"nl: {error}", file=sys.stderr)
+        self._exit_with_error()
 
     def _exit_with_error(self) -> NoReturn:
+        self.output.flush()
         sys.exit(-1)
+
+
+def _contains(source: Source, needle: bytes, end: int) -> bool:
+    if not needle:
+        return False
+    # Each block keeps the previous one's last bytes, so a needle cut by a block boundary is still found.
+    carry = b""
+    for block in source.blocks(end=end):
+        data = carry + bytes(block)
+        if needle in data:
+            return True
+        carry = data[len(data) - len(needle) + 1 :]
+    return False
+
+
+def _read_small_file(filename: str) -> bytes | None:
+    with open(filename, "rb") as file:
+        file_stat = os.fstat(file.fileno())
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size > PREFETCH_MAX_SIZE:
+            return None
+        data = file.read()
+    # A compressed file goes through process_file, which decompresses it.
+    return None if compression(data[:MAGIC_SIZE]) else data
@@ -1,12 +1,125 @@
+import os
 import sys
 
+from src.io.prefetch import parse_in_flight
 from src.nl.nl import NL
+from src.nl.numbering import DEFAULT_FORMAT
+from src.stats import stats
+
+# Options that take a value, by every name they go by; the value is kept as text until parsing ends.
+VALUE_OPTIONS = {
+    "-b": "body",
+    "--body-numbering": "body",
+    "-h": "header",
+    "--header-numbering": "header",
+    "-f": "footer",
+    "--footer-numbering": "footer",
+    "-d": "delimiter",
+    "--section-delimiter": "delimiter",
+    "-i": "increment",
+    "--line-increment": "increment",
+    "-l": "join_blank",
+    "--join-blank-lines": "join_blank",
+    "-n": "number_format",
+    "--number-format": "number_format",
+    "-s": "separator",
+    "--number-separator": "separator",
+    "-v": "start",
+    "--starting-line-number": "start",
+    "-w": "width",
+    "--number-width": "width",
+    "--from-line": "from_line",
+    "--in-flight": "in_flight",
+}
+
+
+def _parse_number(value: str, message: str, minimum: int | None = 1) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or (minimum is not None and number < minimum):
+        print(f"nl: {message}: '{value}'", file=sys.stderr)
+        sys.exit(1)
+    return number
+
+
+def _parse_width(value: str) -> int:
+    return _parse_number(value, "invalid line number field width")
+
+
+def _parse_from_line(value: str) -> int:
+    return _parse_number(value, "invalid starting line")
+
+
+def _split_option(args: list[str], index: int) -> tuple[str, str] | None:
+    # The name and value of a value option at args[index], spelled `-b a`, `-ba`, `--body-numbering=a` or
+    # `--body-numbering a`; None if args[index] is not one.
+    arg = args[index]
+    if arg.startswith("--") and "=" in arg:
+        name, value = arg.split("=", 1)
+        return (name, value) if name in VALUE_OPTIONS else None
+    if arg in VALUE_OPTIONS:
+        if index + 1 >= len(args):
+            print(f"nl: option requires an argument: {arg}", file=sys.stderr)
+            sys.exit(1)
+        return arg, args[index + 1]
+    if not arg.startswith("--") and arg[:2] in VALUE_OPTIONS and len(arg) > 2:
+        return arg[:2], arg[2:]
+    return None
 
 
 def main() -> None:
-    nl_instance = NL()
-    if len(sys.argv) > 1:
-        for filename in sys.argv[1:]:
+    args = stats.configure("nl", sys.argv[1:])
+    values: dict[str, str] = {}
+    renumber = True
+    line_buffered: bool | None = None
+    files: list[str] = []
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--":
+            files.extend(args[index + 1 :])
+            break
+        if arg in ("-p", "--no-renumber"):
+            renumber = False
+        elif arg == "--line-buffered":
+            line_buffered = True
+        elif (option := _split_option(args, index)) is not None:
+            name, value = option
+            values[VALUE_OPTIONS[name]] = value
+            if name == arg:
+                index += 1
+        else:
+            files.append(arg)
+        index += 1
+
+    numbering = DEFAULT_FORMAT._replace(
+        body=values.get("body", DEFAULT_FORMAT.body),
+        header=values.get("header", DEFAULT_FORMAT.header),
+        footer=values.get("footer", DEFAULT_FORMAT.footer),
+        delimiter=os.fsencode(values["delimiter"]) if "delimiter" in values else DEFAULT_FORMAT.delimiter,
+        increment=_parse_number(values.get("increment", "1"), "invalid line number increment", None),
+        join_blank=_parse_number(values.get("join_blank", "1"), "invalid line number of blank lines"),
+        number_format=values.get("number_format", DEFAULT_FORMAT.number_format),
+        separator=os.fsencode(values["separator"]) if "separator" in values else DEFAULT_FORMAT.separator,
+        start=_parse_number(values.get("start", "1"), "invalid starting line number", None),
+        renumber=renumber,
+    )
+    width = _parse_width(values["width"]) if "width" in values else None
+    from_line = _parse_from_line(values.get("from_line", "1"))
+    in_flight = parse_in_flight("nl", values.get("in_flight", "1"))
+
+    try:
+        nl_instance = NL(width, line_buffered, from_line, numbering)
+    except ValueError as e:
+        print(f"nl: {e}", file=sys.stderr)
+        sys.exit(1)
+    if files and in_flight > 1:
+        nl_instance.process_files(files, in_flight)
+    elif files:
+        for filename in files:
             nl_instance.process_file(filename)
     else:
         nl_instance.process_stream(sys.stdin)
@@ -0,0 +1,203 @@
+import os
+import re
+from collections.abc import Callable, Iterable, Sequence
+from functools import cache
+from itertools import batched, chain, count, repeat
+from operator import itemgetter
+from typing import NamedTuple
+
+# Lines are formatted this many at a time into one output buffer.
+BATCH_LINES = 4096
+SECTIONS = ("header", "body", "footer")
+# The whitespace str.rstrip strips: ASCII bytes, and the UTF-8 encodings of the rest.
+_ASCII_SPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_UNICODE_SPACES = tuple(
+    chr(code).encode() for code in (0x85, 0xA0, 0x1680, *range(0x2000, 0x200B), 0x2028, 0x2029, 0x202F, 0x205F, 0x3000)
+)
+# Their last two bytes, enough to tell a line that may end in one from the great many that cannot.
+_SPACE_SUFFIXES = frozenset(space[-2:] for space in _UNICODE_SPACES)
+_last_two = itemgetter(slice(-2, None))
+# printf flags of the -n formats: left-justified, right-justified, right-justified with leading zeros.
+_NUMBER_FORMATS = {"ln": b"-", "rn": b"", "rz": b"0"}
+# In a BRE the escaped forms are the operators and the bare characters are literals, the reverse of Python's.
+_BRE_TOKEN = re.compile(rb"\\(.)|([(){}|+?])", re.DOTALL)
+_BRE_OPERATORS = b"(){}|+?"
+
+
+class NumberFormat(NamedTuple):
+    body: str = "a"
+    header: str = "n"
+    footer: str = "n"
+    delimiter: bytes = b"\\:"
+    increment: int = 1
+    join_blank: int = 1
+    number_format: str = "rn"
+    separator: bytes = b"\t"
+    start: int = 1
+    renumber: bool = True
+
+
+DEFAULT_FORMAT = NumberFormat()
+
+
+def strip_line(line: bytes) -> bytes:
+    # The bytes of str.rstrip on the decoded line; a line that is not valid UTF-8 keeps its bytes as they are.
+    line = line.rstrip(_ASCII_SPACE)
+    if line.endswith(_UNICODE_SPACES):
+        line = line.decode("utf-8", "surrogateescape").rstrip().encode("utf-8", "surrogateescape")
+    return line
+
+
+def _strip_lines(lines: Iterable[bytes]) -> list[bytes]:
+    # ASCII whitespace is stripped in C; only a batch with a line that may end in other whitespace goes line by line.
+    stripped = list(map(bytes.rstrip, lines, repeat(_ASCII_SPACE)))
+    if not _SPACE_SUFFIXES.isdisjoint(map(_last_two, stripped)):
+        stripped = list(map(strip_line, stripped))
+    return stripped
+
+
+def bre_pattern(pattern: bytes) -> bytes:
+    def convert(token: re.Match[bytes]) -> bytes:
+        escaped, operator = token.groups()
+        if operator is not None:
+            return b"\\" + operator
+        if escaped in _BRE_OPERATORS:
+            return escaped
+        # GNU's word boundaries \< and \> are both \b to Python.
+        return rb"\b" if escaped in b"<>" else b"\\" + escaped
+
+    return _BRE_TOKEN.sub(convert, pattern)
+
+
+def _always(_: bytes) -> bool:
+    return True
+
+
+def _never(_: bytes) -> bool:
+    return False
+
+
+def _has_text(line: bytes) -> bool:
+    return line not in (b"\n", b"")
+
+
+def _compile_style(section: str, style: str) -> Callable[[bytes], bool] | None:
+    # The test a line, newline included, passes to be numbered; None for "a", whose blank lines -l may join.
+    if style == "a":
+        return None
+    if style == "t":
+        return _has_text
+    if style == "n":
+        return _never
+    if style.startswith("p"):
+        try:
+            search = re.compile(bre_pattern(os.fsencode(style[1:]))).search
+        except re.error as e:
+            raise ValueError(f"invalid regular expression: '{style[1:]}': {e}") from None
+        return lambda line: search(line.removesuffix(b"\n")) is not None
+    raise ValueError(f"invalid {section} numbering style: '{style}'")
+
+
+def _delimiter_lines(delimiter: bytes) -> dict[bytes, str]:
+    # A line of the delimiter three times starts a header, twice a body and once a footer.
+    if not delimiter:
+        return {}
+    return {
+        delimiter * repeats + newline: section
+        for repeats, section in zip((3, 2, 1), SECTIONS, strict=True)
+        for newline in (b"\n", b"")
+    }
+
+
+@cache
+def _template(number_format: str, separator: bytes, width: int) -> bytes:
+    return b"%%%s%dd%s%%s\n" % (_NUMBER_FORMATS[number_format], width, separator.replace(b"%", b"%%"))
+
+
+class Formatter:
+    # Options are compiled once: each section gets its own line test, and a section numbering every line
+    # formats a whole batch with a single printf-style call instead of one per line.
+    def __init__(self, options: NumberFormat = DEFAULT_FORMAT) -> None:
+        if options.number_format not in _NUMBER_FORMATS:
+            raise ValueError(f"invalid line numbering format: '{options.number_format}'")
+        self.options: NumberFormat = options
+        self.number: int = options.start
+        self.section: str = "body"
+        self.blank_lines: int = 0
+        styles = {section: _compile_style(section, getattr(options, section)) for section in SECTIONS}
+        self.plain: dict[str, bool] = {
+            section: style is None and options.join_blank == 1 for section, style in styles.items()
+        }
+        self.tests: dict[str, Callable[[bytes], bool]] = {
+            section: style or (_always if options.join_blank == 1 else self._join_blank)
+            for section, style in styles.items()
+        }
+        # As in GNU nl, a one-character delimiter is completed with ':'; an empty one turns sections off.
+        self.delimiter: bytes = options.delimiter + b":" if len(options.delimiter) == 1 else options.delimiter
+        self.delimiters: dict[bytes, str] = _delimiter_lines(self.delimiter)
+
+    def counts_every_line(self) -> bool:
+        return self.plain[self.section]
+
+    def width(self, lines: int) -> int:
+        last = self.number + (lines - 1) * self.options.increment
+        return max(len(str(self.number)), len(str(last)))
+
+    def advance(self, lines: int) -> None:
+        self.number += lines * self.options.increment
+
+    def format(self, lines: Sequence[bytes], width: int) -> bytes:
+        if self._is_plain(lines):
+            return self._format_plain(lines, width)
+        return self._format_lines(lines, width)
+
+    def skip(self, lines: Iterable[bytes]) -> None:
+        # Skipped lines are numbered as usual and never printed.
+        for batch in batched(lines, BATCH_LINES, strict=False):
+            if self._is_plain(batch):
+                self.advance(len(batch))
+            else:
+                self._format_lines(batch, 1)
+
+    def _is_plain(self, lines: Sequence[bytes]) -> bool:
+        return self.plain[self.section] and (not self.delimiters or self.delimiters.keys().isdisjoint(lines))
+
+    def _format_plain(self, lines: Sequence[bytes], width: int) -> bytes:
+        options = self.options
+        template = _template(options.number_format, options.separator, width) * len(lines)
+        values = chain.from_iterable(zip(count(self.number, options.increment), _strip_lines(lines), strict=False))
+        self.advance(len(lines))
+        return template % tuple(values)
+
+    def _format_lines(self, lines: Sequence[bytes], width: int) -> bytes:
+        options = self.options
+        template = _template(options.number_format, options.separator, width)
+        unnumbered = b" " * (width + len(options.separator)) + b"%s\n"
+        numbered = self.tests[self.section]
+        output = []
+        for line, text in zip(lines, _strip_lines(lines), strict=True):
+            section = self.delimiters.get(line)
+            if section is not None:
+                # A delimiter line is printed empty, and each section numbers from -v again unless -p is given.
+                self.section = section
+                numbered = self.tests[section]
+                if options.renumber:
+                    self.number = options.start
+                output.append(b"\n")
+            elif numbered(line):
+                output.append(template % (self.number, text))
+                self.number += options.increment
+            else:
+                output.append(unnumbered % text)
+        return b"".join(output)
+
+    def _join_blank(self, line: bytes) -> bool:
+        # With -l N only every Nth of consecutive empty lines is numbered.
+        if _has_text(line):
+            self.blank_lines = 0
+            return True
+        self.blank_lines += 1
+        if self.blank_lines < self.options.join_blank:
+            return False
+        self.blank_lines = 0
+        return True
@@ -0,0 +1,104 @@
+# The client is on every warm run's critical path: the C _socket and _signal modules skip the enum
+# and selectors setup of socket and signal, which would cost more than the rest of the client.
+import _signal
+import _socket
+import os
+import stat
+import struct
+import sys
+
+from src.io.cache import APP_NAME
+
+HEADER = struct.Struct("!I")
+NUMBER = struct.Struct("!i")
+STDIO = struct.Struct("3i").pack(0, 1, 2)
+_UCRED = struct.Struct("3i")
+
+
+def fallback_directory() -> str:
+    return os.path.join("/tmp", f"{APP_NAME}-{os.getuid()}")
+
+
+def socket_path(setting: str | None = None) -> str:
+    if setting and setting != "1":
+        return setting
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, f"{APP_NAME}-{os.getuid()}.sock")
+    # /tmp is writable by everyone, so the socket goes in a directory only this user can enter.
+    return os.path.join(fallback_directory(), "server.sock")
+
+
+def private_directory(directory: str) -> bool:
+    try:
+        info = os.lstat(directory)
+    except OSError:
+        return False
+    return stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+
+def peer_uid(conn: _socket.socket) -> int | None:
+    if not hasattr(_socket, "SO_PEERCRED"):
+        return None
+    _, uid, _ = _UCRED.unpack(conn.getsockopt(_socket.SOL_SOCKET, _socket.SO_PEERCRED, _UCRED.size))
+    return int(uid)
+
+
+def encode_request(argv: list[str], cwd: str, env: dict[str, str]) -> bytes:
+    # NUL-separated fields: arguments and environment entries cannot contain NUL themselves.
+    fields = [cwd, str(len(argv)), *argv, *(f"{key}={value}" for key, value in env.items())]
+    payload = b"\0".join(os.fsencode(field) for field in fields)
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_request(payload: bytes) -> tuple[list[str], str, dict[str, str]]:
+    fields = [os.fsdecode(field) for field in payload.split(b"\0")]
+    cwd, count = fields[0], int(fields[1])
+    argv = fields[2 : 2 + count]
+    env = dict(entry.split("=", 1) for entry in fields[2 + count :] if "=" in entry)
+    return argv, cwd, env
+
+
+def receive_exactly(conn: _socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed by the other side")
+        data += chunk
+    return bytes(data)
+
+
+def run(tool: str, args: list[str], path: str) -> int | None:
+    # The server gets our environment and descriptors, so a socket another user could have placed is not used;
+    # returning None lets the caller run the tool in this process instead.
+    if os.path.dirname(path) == fallback_directory() and not private_directory(fallback_directory()):
+        return None
+    conn = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        # No server listening.
+        conn.close()
+        return None
+    try:
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            return None
+        request = encode_request([tool, *args], os.getcwd(), dict(os.environ))
+        # The server works directly on our stdin, stdout and stderr, so nothing is relayed through the socket.
+        conn.sendmsg([request], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, STDIO)])
+        try:
+            (pid,) = NUMBER.unpack(receive_exactly(conn, NUMBER.size))
+            while True:
+                try:
+                    (code,) = NUMBER.unpack(receive_exactly(conn, NUMBER.size))
+                    return int(code)
+                except KeyboardInterrupt:
+                    # Ctrl-C reaches only this process; pass it on to the worker running the tool.
+                    os.kill(pid, _signal.SIGINT)
+        except ConnectionError:
+            print(f"{tool}: lost connection to the server at {path}", file=sys.stderr)
+            return 1
+    finally:
+        conn.close()
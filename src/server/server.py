@@ -0,0 +1,209 @@
+import contextlib
+import importlib
+import os
+import signal
+import socket
+import sys
+import traceback
+from typing import Literal, TextIO
+
+from src.server.client import (
+    HEADER,
+    NUMBER,
+    decode_request,
+    fallback_directory,
+    peer_uid,
+    private_directory,
+    receive_exactly,
+    socket_path,
+)
+
+# Everything a run may need is imported once here, so forked workers start warm.
+PRELOAD = (
+    "src.wc.wc_main",
+    "src.wc.cache",
+    "src.tail.tail_main",
+    "src.tail.follow",
+    "src.nl.nl_main",
+    "src.io.prefetch",
+    "asyncio",
+    "concurrent.futures",
+    "tempfile",
+)
+BACKLOG = 64
+
+
+def preload() -> None:
+    for module in PRELOAD:
+        importlib.import_module(module)
+    from src.wc import counter  # noqa: PLC0415
+
+    counter._numpy()
+
+
+def _exit_code(error: SystemExit) -> int:
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    print(error.code, file=sys.stderr)
+    return 1
+
+
+def _receive_request(conn: socket.socket) -> tuple[list[str], str, dict[str, str], list[int]]:
+    data, fds, _, _ = socket.recv_fds(conn, 64 * 1024, 3)
+    if len(data) < HEADER.size:
+        data += receive_exactly(conn, HEADER.size - len(data))
+    (size,) = HEADER.unpack_from(data)
+    payload = data[HEADER.size :]
+    if len(payload) < size:
+        payload += receive_exactly(conn, size - len(payload))
+    argv, cwd, env = decode_request(payload)
+    return argv, cwd, env, fds
+
+
+def _reopen(fd: int, mode: Literal["r", "w"], stream: TextIO, line_buffered: bool) -> TextIO:
+    # buffering=1 is line buffering in text mode, the way Python sets up a terminal's stdout.
+    return open(fd, mode, 1 if line_buffered else -1, stream.encoding, stream.errors, closefd=False)  # noqa: SIM115
+
+
+def _reopen_streams() -> None:
+    # The server's text streams cached facts about its own descriptors (seekable, a tty); the client's may be pipes.
+    sys.stdin = _reopen(0, "r", sys.stdin, False)
+    sys.stdout = _reopen(1, "w", sys.stdout, os.isatty(1))
+    sys.stderr = _reopen(2, "w", sys.stderr, True)
+
+
+def _handle(conn: socket.socket) -> int:
+    from src.main import TOOLS, run  # noqa: PLC0415
+    from src.stats import stats  # noqa: PLC0415
+
+    argv, cwd, env, fds = _receive_request(conn)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    _reopen_streams()
+    conn.sendall(NUMBER.pack(os.getpid()))
+
+    code = 0
+    try:
+        if not argv or argv[0] not in TOOLS:
+            raise SystemExit(f"main: unknown tool: '{argv[0] if argv else ''}'")
+        run(argv[0], argv[1:])
+    except SystemExit as e:
+        code = _exit_code(e)
+    except KeyboardInterrupt:
+        code = 128 + signal.SIGINT
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    # The worker leaves through os._exit, so what atexit would do for a normal run happens here.
+    if (active := stats.active()) is not None:
+        active.finish()
+    for stream in (sys.stdout, sys.stderr):
+        with contextlib.suppress(OSError, ValueError):
+            stream.flush()
+    return code
+
+
+def _serve_one(conn: socket.socket, listener: socket.socket) -> None:
+    listener.close()
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    code = 1
+    try:
+        code = _handle(conn)
+    finally:
+        with contextlib.suppress(OSError):
+            conn.sendall(NUMBER.pack(code))
+        os._exit(0)
+
+
+def _reap() -> None:
+    with contextlib.suppress(ChildProcessError):
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+
+
+def _claim(path: str) -> None:
+    # A socket file left by a server that died is removed; a live server is never replaced.
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except FileNotFoundError:
+        return
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise SystemExit(f"serve: a server is already listening on {path}")
+
+
+def _make_directory(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory != fallback_directory():
+        return
+    with contextlib.suppress(FileExistsError):
+        os.mkdir(directory, 0o700)
+    # Clients refuse the socket in any other directory, since another user could have made it first.
+    if not private_directory(directory):
+        raise SystemExit(f"serve: {directory} must be a directory of this user that no one else can access")
+
+
+def serve(path: str) -> None:
+    preload()
+    _make_directory(path)
+    _claim(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only this user may connect: the socket is created private and every peer's uid is checked.
+    umask = os.umask(0o077)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    listener.listen(BACKLOG)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"serve: listening on {path}", file=sys.stderr)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            _reap()
+            uid = peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                conn.close()
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                _serve_one(conn, listener)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+
+
+def main(args: list[str]) -> None:
+    path = socket_path(os.environ.get("LAB_SERVER"))
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--socket":
+            if index + 1 >= len(args):
+                print(f"serve: option requires an argument: {arg}", file=sys.stderr)
+                sys.exit(1)
+            path = args[index + 1]
+            index += 1
+        elif arg.startswith("--socket="):
+            path = arg.removeprefix("--socket=")
+        else:
+            print(f"serve: unknown option: {arg}", file=sys.stderr)
+            sys.exit(1)
+        index += 1
+    serve(path)
@@ -0,0 +1,175 @@
+import atexit
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+from typing import Any
+
+PROFILERS = ("cprofile", "tracemalloc")
+PROFILE_TOP = 15
+
+
+def _proc_io() -> dict[str, int]:
+    # Linux only: read and write syscalls and the bytes they moved (mmap reads do not show up here).
+    try:
+        with open("/proc/self/io", encoding="ascii") as file:
+            return {key: int(value) for key, value in (line.split(": ") for line in file)}
+    except (OSError, ValueError):
+        return {}
+
+
+class Stats:
+    def __init__(self, tool: str, output: str | None = None, profiler: str | None = None) -> None:
+        self.tool: str = tool
+        # None writes a summary to stderr; a path gets the report as JSON.
+        self.output: str | None = output
+        self.profiler: str | None = profiler
+        self.phases: defaultdict[str, float] = defaultdict(float)
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.current: str = "startup"
+        self.start: float = time.perf_counter()
+        self.mark: float = self.start
+        self._io_start: dict[str, int] = _proc_io()
+        # The profilers are imported only when asked for; together they would add ~20 ms to every start.
+        self._profile: Any = None
+        if profiler == "cprofile":
+            import cProfile  # noqa: PLC0415
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif profiler == "tracemalloc":
+            import tracemalloc  # noqa: PLC0415
+
+            tracemalloc.start()
+
+    def switch(self, phase: str) -> None:
+        # Time is charged to one phase at a time, so nested work is never counted twice.
+        now = time.perf_counter()
+        self.phases[self.current] += now - self.mark
+        self.current, self.mark = phase, now
+
+    def add(self, counter: str, value: int = 1) -> None:
+        self.counters[counter] += value
+
+    def report(self) -> dict[str, Any]:
+        self.switch("exit")
+        snapshot = None
+        if self.profiler == "tracemalloc":
+            import tracemalloc  # noqa: PLC0415
+
+            # Taken first and without this module's frames, so the report does not measure itself.
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+        io_end = _proc_io()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        report: dict[str, Any] = {
+            "tool": self.tool,
+            "elapsed": self.mark - self.start,
+            "phases": {name: seconds for name, seconds in self.phases.items() if name != "exit"},
+            "counters": dict(self.counters),
+            "syscalls": {key: io_end[key] - self._io_start.get(key, 0) for key in ("syscr", "syscw") if key in io_end},
+            "io_bytes": {key: io_end[key] - self._io_start.get(key, 0) for key in ("rchar", "wchar") if key in io_end},
+            # ru_maxrss is in KiB on Linux and in bytes on macOS.
+            "peak_rss": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+            "page_faults": {"minor": usage.ru_minflt, "major": usage.ru_majflt},
+        }
+        if self._profile is not None:
+            import io  # noqa: PLC0415
+            import pstats  # noqa: PLC0415
+
+            self._profile.disable()
+            text = io.StringIO()
+            pstats.Stats(self._profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            report["profile"] = text.getvalue().strip().splitlines()
+        elif snapshot is not None:
+            report["traced_peak"] = tracemalloc.get_traced_memory()[1]
+            report["profile"] = [str(stat) for stat in snapshot.statistics("lineno")[:PROFILE_TOP]]
+            tracemalloc.stop()
+        return report
+
+    def finish(self) -> None:
+        report = self.report()
+        if self.output is not None:
+            import json  # noqa: PLC0415
+
+            with open(self.output, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+                file.write("\n")
+            return
+        sys.stderr.write(format_report(report))
+
+
+def format_report(report: dict[str, Any]) -> str:
+    tool = report["tool"]
+    lines = [f"{tool}: stats: {report['elapsed']:.6f} s, peak RSS {report['peak_rss'] / 2**20:.1f} MiB"]
+    lines.extend(f"{tool}: stats:   {name:<10} {seconds:10.6f} s" for name, seconds in report["phases"].items())
+    for group in ("counters", "syscalls", "io_bytes", "page_faults"):
+        if report[group]:
+            values = ", ".join(f"{name} {value}" for name, value in report[group].items())
+            lines.append(f"{tool}: stats: {group}: {values}")
+    if "traced_peak" in report:
+        lines.append(f"{tool}: stats: traced peak {report['traced_peak']} bytes")
+    lines.extend(f"{tool}: profile: {line}" for line in report.get("profile", []))
+    return "\n".join(lines) + "\n"
+
+
+# Empty unless stats are on, so a disabled hook costs one truth test.
+_active: list[Stats] = []
+
+
+def active() -> Stats | None:
+    return _active[0] if _active else None
+
+
+def phase(name: str) -> None:
+    if _active:
+        _active[0].switch(name)
+
+
+def add(counter: str, value: int = 1) -> None:
+    if _active:
+        _active[0].counters[counter] += value
+
+
+def enable(tool: str, output: str | None = None, profiler: str | None = None) -> Stats:
+    disable()
+    _active.append(Stats(tool, output, profiler))
+    # atexit also runs on sys.exit, so a run that ends in an error still reports.
+    atexit.register(_active[0].finish)
+    return _active[0]
+
+
+def disable() -> None:
+    for active_stats in _active:
+        atexit.unregister(active_stats.finish)
+    _active.clear()
+
+
+def _option_value(arg: str, name: str) -> str | None:
+    return arg.removeprefix(f"{name}=") if arg.startswith(f"{name}=") else None
+
+
+def configure(tool: str, args: list[str]) -> list[str]:
+    # LAB_STATS=1 reports to stderr and LAB_STATS=path to a JSON file; --stats and --stats=path override it.
+    setting = os.environ.get("LAB_STATS") or None
+    profiler = os.environ.get("LAB_PROFILE") or None
+    remaining: list[str] = []
+    for index, arg in enumerate(args):
+        if arg == "--":
+            remaining.extend(args[index:])
+            break
+        if arg == "--stats":
+            setting = "1"
+        elif (value := _option_value(arg, "--stats")) is not None:
+            setting = value
+        elif (value := _option_value(arg, "--profile")) is not None:
+            profiler = value
+        else:
+            remaining.append(arg)
+    if profiler is not None and profiler not in PROFILERS:
+        print(f"{tool}: invalid profiler: '{profiler}' (expected {' or '.join(PROFILERS)})", file=sys.stderr)
+        sys.exit(1)
+    if setting is None and profiler is None:
+        return remaining
+    enable(tool, None if setting in (None, "1", "-") else setting, profiler)
+    return remaining
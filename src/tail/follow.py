@@ -0,0 +1,257 @@
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+from src.io.sink import OutputSink
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+FILE_EVENTS = IN_MODIFY | IN_ATTRIB | IN_MOVE_SELF | IN_DELETE_SELF
+DIR_EVENTS = IN_CREATE | IN_MOVED_TO | IN_ATTRIB | IN_ONLYDIR
+
+READ_SIZE = 1024 * 1024
+POLL_MIN_INTERVAL = 0.01
+POLL_MAX_INTERVAL = 1.0
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    def __init__(self) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd: int = self._check(self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def _check(self, result: int) -> int:
+        if result < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return result
+
+    def add_watch(self, path: str, mask: int) -> int:
+        return self._check(self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask))
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FollowedFile:
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.fd: int | None = None
+        self.offset: int = 0
+        self.identity: tuple[int, int] | None = None
+        self.wd: int | None = None
+        self.reported_missing: bool = False
+
+    def open(self, offset: int) -> None:
+        fd = os.open(self.name, os.O_RDONLY | os.O_CLOEXEC)
+        stat = os.fstat(fd)
+        self.fd = fd
+        self.identity = (stat.st_dev, stat.st_ino)
+        self.offset = offset if offset <= stat.st_size else 0
+        self.reported_missing = False
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = None
+        self.identity = None
+
+
+class Follower:
+    def __init__(self, by_name: bool = False, show_headers: bool = False) -> None:
+        self.by_name: bool = by_name
+        self.show_headers: bool = show_headers
+        self.files: list[FollowedFile] = []
+        self.last_output: FollowedFile | None = None
+        self._inotify: Inotify | None = None
+        self._file_watches: dict[int, FollowedFile] = {}
+        self._dir_watches: dict[int, str] = {}
+        self.output: OutputSink = OutputSink(line_buffered=True)
+
+    def add(self, name: str, offset: int = 0) -> FollowedFile:
+        followed = FollowedFile(name)
+        # A file that cannot be opened yet is reported once the loop starts watching its name.
+        with contextlib.suppress(OSError):
+            followed.open(offset)
+        self.files.append(followed)
+        self.last_output = followed
+        return followed
+
+    async def run(self, stop: asyncio.Event | None = None) -> None:
+        stop = stop or asyncio.Event()
+        try:
+            self._inotify = Inotify()
+        except OSError:
+            self._inotify = None
+
+        loop = asyncio.get_running_loop()
+        if self._inotify is not None:
+            for followed in self.files:
+                self._watch(followed)
+            loop.add_reader(self._inotify.fd, self._on_inotify)
+        # Catch up on anything written before the watches were in place.
+        for followed in self.files:
+            self._read_appended(followed)
+            if self.by_name:
+                self._check_name(followed)
+        waiter: asyncio.Future[bool] = asyncio.ensure_future(stop.wait())
+        try:
+            if self._inotify is not None:
+                await waiter
+            else:
+                await self._poll(waiter)
+        finally:
+            waiter.cancel()
+            if self._inotify is not None:
+                loop.remove_reader(self._inotify.fd)
+                self._inotify.close()
+            for followed in self.files:
+                followed.close()
+
+    def _watch(self, followed: FollowedFile) -> None:
+        assert self._inotify is not None
+        if followed.fd is not None:
+            try:
+                followed.wd = self._inotify.add_watch(followed.name, FILE_EVENTS)
+                self._file_watches[followed.wd] = followed
+            except OSError:
+                followed.wd = None
+        if self.by_name:
+            directory = os.path.dirname(followed.name) or "."
+            try:
+                wd = self._inotify.add_watch(directory, DIR_EVENTS)
+            except OSError:
+                return
+            self._dir_watches[wd] = directory
+
+    def _on_inotify(self) -> None:
+        assert self._inotify is not None
+        for wd, mask, name in self._inotify.read_events():
+            if wd in self._dir_watches:
+                directory = self._dir_watches[wd]
+                for followed in self.files:
+                    if os.path.basename(followed.name) == name and (os.path.dirname(followed.name) or ".") == directory:
+                        self._check_name(followed)
+                continue
+            watched = self._file_watches.get(wd)
+            if watched is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._file_watches[wd]
+                if watched.wd == wd:
+                    watched.wd = None
+                continue
+            self._read_appended(watched)
+            if self.by_name and mask & (IN_MOVE_SELF | IN_DELETE_SELF | IN_ATTRIB):
+                self._check_name(watched)
+
+    async def _poll(self, stop: "asyncio.Future[bool]") -> None:
+        interval = POLL_MIN_INTERVAL
+        while not stop.done():
+            changed = False
+            for followed in self.files:
+                changed |= self._read_appended(followed)
+                if self.by_name:
+                    changed |= self._check_name(followed)
+            # Back off while the files are idle, snap back as soon as one changes.
+            interval = POLL_MIN_INTERVAL if changed else min(interval * 2, POLL_MAX_INTERVAL)
+            await asyncio.wait([stop], timeout=interval)
+
+    def _read_appended(self, followed: FollowedFile) -> bool:
+        if followed.fd is None:
+            return False
+        size = os.fstat(followed.fd).st_size
+        if size < followed.offset:
+            print(f"tail: {followed.name}: file truncated", file=sys.stderr)
+            followed.offset = 0
+        changed = False
+        while data := os.pread(followed.fd, READ_SIZE, followed.offset):
+            followed.offset += len(data)
+            self._emit(followed, data)
+            changed = True
+        return changed
+
+    def _check_name(self, followed: FollowedFile) -> bool:
+        try:
+            stat = os.stat(followed.name)
+        except OSError as e:
+            if followed.fd is not None:
+                self._read_appended(followed)
+                self._unwatch(followed)
+                followed.close()
+                print(f"tail: '{followed.name}' has become inaccessible: {e.strerror}", file=sys.stderr)
+                followed.reported_missing = True
+            self._report_missing(followed, e)
+            return False
+        if followed.identity == (stat.st_dev, stat.st_ino):
+            return False
+
+        if followed.fd is not None:
+            self._read_appended(followed)
+            self._unwatch(followed)
+            followed.close()
+            print(f"tail: '{followed.name}' has been replaced;  following new file", file=sys.stderr)
+        else:
+            print(f"tail: '{followed.name}' has appeared;  following new file", file=sys.stderr)
+        try:
+            followed.open(0)
+        except OSError as e:
+            self._report_missing(followed, e)
+            return False
+        if self._inotify is not None:
+            self._watch(followed)
+        self._read_appended(followed)
+        return True
+
+    def _unwatch(self, followed: FollowedFile) -> None:
+        if self._inotify is not None and followed.wd is not None:
+            self._file_watches.pop(followed.wd, None)
+            self._inotify.rm_watch(followed.wd)
+        followed.wd = None
+
+    def _report_missing(self, followed: FollowedFile, error: OSError) -> None:
+        if not followed.reported_missing:
+            print(f"tail: cannot open '{followed.name}' for reading: {error.strerror}", file=sys.stderr)
+            followed.reported_missing = True
+
+    def _emit(self, followed: FollowedFile, data: bytes) -> None:
+        if self.show_headers and followed is not self.last_output:
+            self.output.write_text(f"\n==> {followed.name} <==\n")
+        self.last_output = followed
+        self.output.write(data)
@@ -1,35 +1,401 @@
+import contextlib
+import io
+import mmap
+import os
 import sys
-from typing import NoReturn, TextIO
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from functools import partial
+from itertools import islice
+from typing import BinaryIO, NamedTuple, NoReturn, TextIO, cast
+
+from src.errors import ToolError
+from src.io.compressed import bgzf_offsets, inflate_member, open_decompressed, peek_compression
+from src.io.line_index import index_for, seek_line, skip_lines
+from src.io.prefetch import read_ordered
+from src.io.reader import Source, open_source
+from src.io.sink import OutputSink
+from src.stats import stats
+
+BLOCK_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+# From this many lines on, an existing line index beats scanning backwards through all of them.
+INDEXED_TAIL_LINES = 100_000
+
+
+def _rfind_newlines(block: bytes | mmap.mmap, end: int, count: int) -> tuple[int, int]:
+    found = 0
+    while (end := block.rfind(b"\n", 0, end)) >= 0:
+        found += 1
+        if found == count:
+            return end, found
+    return -1, found
+
+
+def buffer_tail_offset(data: bytes | mmap.mmap, num_lines: int) -> int:
+    end = len(data)
+    if num_lines <= 0:
+        return end
+    if data[end - 1 : end] == b"\n":
+        end -= 1
+    return _rfind_newlines(data, end, num_lines)[0] + 1
+
+
+def find_tail_offset(file: BinaryIO, num_lines: int, block_size: int = BLOCK_SIZE) -> int:
+    end = file.seek(0, os.SEEK_END)
+    if num_lines <= 0:
+        return end
+
+    position = end
+    remaining = num_lines
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        file.seek(position)
+        block = file.read(size)
+        index = len(block)
+        # The newline terminating the last line does not start a new one.
+        if position + size == end and block.endswith(b"\n"):
+            index -= 1
+        index, found = _rfind_newlines(block, index, remaining)
+        if index >= 0:
+            return position + index + 1
+        remaining -= found
+    return 0
+
+
+def _descriptor(file: BinaryIO) -> int | None:
+    # The descriptor under a buffered pipe; a decompressor has none, and its bytes must come through Python.
+    if not isinstance(file, io.BufferedReader):
+        return None
+    try:
+        return file.fileno()
+    except (OSError, ValueError):
+        return None
+
+
+class TailSpan(NamedTuple):
+    # A regular file stays open so its bytes can be copied by the kernel; a pipe's tail is already read.
+    file: BinaryIO | None
+    start: int
+    end: int
+    data: bytes = b""
+
+
+def tail_range(source: Source, num_lines: int, count_bytes: bool = False) -> tuple[int, int]:
+    if count_bytes:
+        end = len(source.map) if source.map is not None else source.file.seek(0, os.SEEK_END)
+        return max(0, end - max(num_lines, 0)), end
+    if num_lines >= INDEXED_TAIL_LINES and (index := index_for(source, build=False)) is not None:
+        return index.line_offset(source, max(0, index.lines - num_lines)), index.size
+    if source.map is not None:
+        return buffer_tail_offset(source.map, num_lines), len(source.map)
+    return find_tail_offset(source.file, num_lines), source.file.seek(0, os.SEEK_END)
+
+
+def tail_source(source: Source, num_lines: int, count_bytes: bool = False) -> tuple[bytes, int]:
+    if source.map is None and not source.file.seekable():
+        return (tail_bytes_stream if count_bytes else tail_stream)(source.file, num_lines), 0
+    start, end = tail_range(source, num_lines, count_bytes)
+    return source.read_at(start, end - start), end
+
+
+def tail_members(data: bytes | mmap.mmap, offsets: Sequence[int], num_lines: int, count_bytes: bool = False) -> bytes:
+    # BGZF members inflate independently, so only the last few are read, walking back from the end.
+    if num_lines <= 0:
+        return b""
+    chunks: deque[bytes] = deque()
+    found = 0
+    for start, end in zip(reversed(offsets[:-1]), reversed(offsets[1:]), strict=True):
+        chunk = inflate_member(data, start, end)
+        chunks.appendleft(chunk)
+        found += len(chunk) if count_bytes else chunk.count(b"\n")
+        # One newline more than the lines asked for marks where the first of them starts.
+        if found > num_lines:
+            break
+    tail = b"".join(chunks)
+    if count_bytes:
+        return tail[-num_lines:]
+    return tail[buffer_tail_offset(tail, num_lines) :]
+
+
+def tail_compressed(file: BinaryIO, kind: str, num_lines: int, count_bytes: bool = False) -> bytes:
+    if kind == "gzip":
+        with Source(file) as source:
+            if source.map is not None and (offsets := bgzf_offsets(source.map)) is not None:
+                return tail_members(source.map, offsets, num_lines, count_bytes)
+    # Any other compressed file is decompressed as a stream, keeping only the last lines.
+    with open_decompressed(file, kind) as stream:
+        return (tail_bytes_stream if count_bytes else tail_stream)(stream, num_lines)
+
+
+def locate_tail(filename: str, num_lines: int, count_bytes: bool = False) -> TailSpan:
+    try:
+        with contextlib.ExitStack() as stack:
+            file = stack.enter_context(open(filename, "rb"))
+            if (kind := peek_compression(file)) is not None:
+                data = tail_compressed(file, kind, num_lines, count_bytes)
+                return TailSpan(None, 0, len(data), data)
+            if not file.seekable():
+                data = (tail_bytes_stream if count_bytes else tail_stream)(file, num_lines)
+                return TailSpan(None, 0, len(data), data)
+            # Only the offsets are needed here, found by scanning blocks back from the end.
+            with Source(file, use_mmap=False) as source:
+                start, end = tail_range(source, num_lines, count_bytes)
+            # The file is handed over open; the caller copies from it and closes it.
+            stack.pop_all()
+            return TailSpan(file, start, end)
+    except Exception as e:
+        raise ToolError(filename, e) from e
+
+
+def blocks_after_lines(blocks: Iterable[bytes | memoryview], count: int) -> Iterator[bytes | memoryview]:
+    for block in blocks:
+        if not count:
+            yield block
+            continue
+        data = bytes(block)
+        found = data.count(b"\n")
+        if found < count:
+            count -= found
+            continue
+        yield data[skip_lines([data], count) :]
+        count = 0
+
+
+def blocks_after_bytes(blocks: Iterable[bytes | memoryview], count: int) -> Iterator[bytes | memoryview]:
+    for block in blocks:
+        if count < len(block):
+            yield block[count:] if count else block
+            count = 0
+        else:
+            count -= len(block)
+
+
+def tail_bytes_stream(stream: BinaryIO, num_bytes: int, chunk_size: int = CHUNK_SIZE) -> bytes:
+    # Whole chunks are dropped once the ones after them hold num_bytes, so memory stays near num_bytes + chunk_size.
+    if num_bytes <= 0:
+        return b""
+    chunks: deque[bytes] = deque()
+    kept = 0
+    while chunk := stream.read(chunk_size):
+        chunks.append(chunk)
+        kept += len(chunk)
+        while kept - len(chunks[0]) >= num_bytes:
+            kept -= len(chunks.popleft())
+    return b"".join(chunks)[max(0, kept - num_bytes) :]
+
+
+def tail_stream(stream: BinaryIO, num_lines: int, chunk_size: int = CHUNK_SIZE) -> bytes:
+    if num_lines <= 0:
+        return b""
+
+    ring: deque[bytes] = deque(maxlen=num_lines)
+    pending: list[bytes] = []
+    while chunk := stream.read(chunk_size):
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(chunk)
+            chunk = b"".join(pending)
+            end = chunk.rfind(b"\n")
+            pending.clear()
+        # Only the last num_lines complete lines of the chunk can survive in the ring.
+        start = _rfind_newlines(chunk, end, num_lines)[0] + 1
+        ring.extend(chunk[start:end].split(b"\n"))
+        if end + 1 < len(chunk):
+            pending.append(chunk[end + 1 :])
+
+    if pending:
+        ring.append(b"".join(pending))
+    if not ring:
+        return b""
+    return b"\n".join(ring) + (b"" if pending else b"\n")
+
+
+def read_tail(filename: str, num_lines: int, count_bytes: bool = False) -> tuple[bytes, int]:
+    try:
+        with open(filename, "rb") as file:
+            if (kind := peek_compression(file)) is not None:
+                # Following resumes after the compressed bytes already there, not inside them.
+                return tail_compressed(file, kind, num_lines, count_bytes), os.fstat(file.fileno()).st_size
+            with Source(file) as source:
+                return tail_source(source, num_lines, count_bytes)
+    except Exception as e:
+        raise ToolError(filename, e) from e
+
+
+def tail_lines(filename: str, num_lines: int = 10, from_start: bool = False) -> Iterator[bytes]:
+    if not from_start:
+        yield from io.BytesIO(read_tail(filename, num_lines)[0])
+        return
+    try:
+        with open_source(filename) as source:
+            skip = max(num_lines - 1, 0)
+            if source.file.seekable():
+                yield from source.lines(seek_line(source, skip))
+            else:
+                yield from islice(source.lines(), skip, None)
+    except Exception as e:
+        raise ToolError(filename, e) from e
 
 
 class Tail:
-    def __init__(self, num_lines: int = 17) -> None:
+    def __init__(
+        self,
+        num_lines: int = 17,
+        line_buffered: bool | None = None,
+        from_start: bool = False,
+        *,
+        count_bytes: bool = False,
+    ) -> None:
         self.num_lines: int = num_lines
+        # With from_start, num_lines is the 1-based line output starts at, as in `tail -n +K`.
+        self.from_start: bool = from_start
+        # With count_bytes, num_lines counts bytes instead, as in `tail -c N` and `tail -c +N`.
+        self.count_bytes: bool = count_bytes
+        self.output: OutputSink = OutputSink(line_buffered=line_buffered)
 
-    def process_file(self, filename: str, multiple_files: bool = False) -> None:
+    def process_file(self, filename: str, multiple_files: bool = False) -> int:
+        stats.add("files")
         try:
-            with open(filename, encoding="utf-8") as file:
-                lines: list[str] = file.readlines()
+            if self.from_start:
+                stats.phase("open")
+                with open_source(filename) as source:
+                    if multiple_files:
+                        self._print_file_header(filename)
+                    return self._print_from_start(source)
+            if self.count_bytes:
+                stats.phase("locate")
+                span = locate_tail(filename, self.num_lines, count_bytes=True)
+                if multiple_files:
+                    self._print_file_header(filename)
+                self._print_span(filename, span)
+                self.output.flush()
+                return span.end
+            stats.phase("read")
+            data, end = read_tail(filename, self.num_lines)
+        except ToolError as e:
+            self._report_error(e)
+        except Exception as e:
+            self._report_error(ToolError(filename, e))
+        stats.add("bytes", len(data))
+        stats.add("lines", data.count(b"\n"))
+        stats.phase("print")
+        if multiple_files:
+            self._print_file_header(filename)
+        self._print_tail(data)
+        return end
+
+    def process_files(self, filenames: list[str], in_flight: int) -> None:
+        # Tail offsets are found concurrently; the bytes, headers and separators are written in argument order.
+        multiple_files = len(filenames) > 1
+        locate = partial(locate_tail, num_lines=self.num_lines, count_bytes=self.count_bytes)
+        spans = read_ordered(filenames, locate, in_flight)
+        stats.phase("locate")
+        for index, (filename, span, error) in enumerate(spans):
+            stats.phase("print")
+            stats.add("files")
+            if error is not None:
+                self._report_error(error if isinstance(error, ToolError) else ToolError(filename, error))
+            assert span is not None
+            if index:
+                self.print_separator()
             if multiple_files:
                 self._print_file_header(filename)
-            self._print_tail(lines)
-        except FileNotFoundError:
-            print(f"tail: {filename}: No such file or directory", file=sys.stderr)
-            self._exit_with_error()
+            self._print_span(filename, span)
+            stats.phase("locate")
+        self.output.flush()
+
+    def process_stream(self, stream: TextIO) -> None:
+        try:
+            buffer: BinaryIO | None = getattr(stream, "buffer", None)
+            if buffer is None:
+                self._print_tail(self._text_tail(stream))
+            elif self.from_start:
+                with Source(buffer) as source:
+                    self._print_from_start(source)
+            else:
+                self._print_tail((tail_bytes_stream if self.count_bytes else tail_stream)(buffer, self.num_lines))
         except Exception as e:
-            print(f"tail: {filename}: {e}", file=sys.stderr)
+            print(f"tail: error reading from stream: {e}", file=sys.stderr)
             self._exit_with_error()
 
-    def process_stream(self, stream: TextIO) -> None:
-        lines: list[str] = stream.readlines()
-        self._print_tail(lines)
+    def print_separator(self) -> None:
+        self.output.write(b"\n")
 
     def _print_file_header(self, filename: str) -> None:
-        print(f"==> {filename} <==", flush=True)
+        self.output.write_text(f"==> {filename} <==\n")
+
+    def _print_tail(self, data: bytes) -> None:
+        # Bytes go out as they were read, so input that is not valid UTF-8 passes through unchanged.
+        self.output.write(data)
+        self.output.flush()
+
+    def _text_tail(self, stream: TextIO) -> bytes:
+        # A stream with no binary buffer underneath, such as StringIO, is read as text.
+        if self.count_bytes:
+            data = "".join(stream).encode("utf-8")
+            if self.from_start:
+                return data[max(self.num_lines - 1, 0) :]
+            return data[-self.num_lines :] if self.num_lines > 0 else b""
+        if self.from_start:
+            return "".join(islice(stream, max(self.num_lines - 1, 0), None)).encode("utf-8")
+        return "".join(deque(stream, maxlen=max(self.num_lines, 0))).encode("utf-8")
+
+    def _print_span(self, filename: str, span: TailSpan) -> None:
+        stats.add("bytes", span.end - span.start)
+        if span.file is None:
+            self.output.write(span.data)
+            return
+        with span.file:
+            try:
+                self.output.copy_from(span.file.fileno(), span.start, span.end - span.start)
+            except OSError as e:
+                self._report_error(ToolError(filename, e))
+
+    def _print_from_start(self, source: Source) -> int:
+        skip = max(self.num_lines - 1, 0)
+        start = 0
+        stats.phase("seek")
+        if source.size is not None:
+            # A regular file is copied by the kernel from the first byte wanted to the end as it is now.
+            start = min(skip, source.size - source.origin) if self.count_bytes else seek_line(source, skip)
+            stats.phase("copy")
+            size = source.size - source.origin - start
+            self.output.copy_from(source.file.fileno(), source.origin + start, size)
+            stats.add("bytes", size)
+            self.output.flush()
+            return start + size
+        if self.count_bytes:
+            blocks = blocks_after_bytes(source.blocks(), skip)
+        elif source.file.seekable():
+            start = seek_line(source, skip)
+            blocks = source.blocks(start=start)
+        else:
+            blocks = blocks_after_lines(source.blocks(), skip)
+        stats.phase("copy")
+        for block in blocks:
+            self.output.write(bytes(block))
+            start += len(block)
+            stats.add("bytes", len(block))
+            if (fd := _descriptor(source.file)) is not None:
+                # The skip is done: what the read buffer still holds goes out, and the rest is left to the kernel.
+                rest = cast(io.BufferedReader, source.file).read1()
+                self.output.write(rest)
+                copied = self.output.copy_stream(fd)
+                start += len(rest) + copied
+                stats.add("bytes", len(rest) + copied)
+                break
+        self.output.flush()
+        return start
 
-    def _print_tail(self, lines: list[str]) -> None:
-        for line in lines[-self.num_lines :]:
-            print(line, end="", flush=True)
+    def _report_error(self, error: ToolError) -> NoReturn:
+        print(f"tail: {error}", file=sys.stderr)
+        self._exit_with_error()
 
     def _exit_with_error(self) -> NoReturn:
+        self.output.flush()
         sys.exit(-1)
@@ -1,37 +1,155 @@
+import contextlib
 import sys
+from typing import TYPE_CHECKING
 
+from src.io.prefetch import parse_in_flight
+from src.stats import stats
 from src.tail.tail import Tail
 
+if TYPE_CHECKING:
+    from src.tail.follow import Follower
 
-def main() -> None:
-    args = sys.argv[1:]
-    if args and args[0] == "-n":
-        if len(args) < 3:
-            print("tail: invalid number of lines", file=sys.stderr)
-            sys.exit(1)
 
-        try:
-            num_lines = int(args[1])
-        except ValueError:
-            print(f"tail: invalid number of lines: {args[1]}", file=sys.stderr)
+# GNU tail's multiplier suffixes, as in `-c 10K` or `-n 2M`.
+SUFFIXES = {
+    "b": 512,
+    "kB": 1000,
+    "K": 1024,
+    "KiB": 1024,
+    "MB": 1000**2,
+    "M": 1024**2,
+    "MiB": 1024**2,
+    "GB": 1000**3,
+    "G": 1024**3,
+    "GiB": 1024**3,
+    "TB": 1000**4,
+    "T": 1024**4,
+    "TiB": 1024**4,
+}
+
+
+def _parse_count(value: str, unit: str = "lines") -> tuple[int, bool]:
+    # As in GNU tail, `-n -K` is `-n K`: an explicit "-" counts from the end like no sign at all.
+    number = value.strip().removeprefix("-")
+    suffix = number.lstrip("+0123456789")
+    try:
+        if suffix and suffix not in SUFFIXES:
+            raise ValueError(suffix)
+        count = int(number.removesuffix(suffix)) * SUFFIXES.get(suffix, 1)
+        if count < 0:
+            raise ValueError(number)
+    except ValueError:
+        print(f"tail: invalid number of {unit}: {value}", file=sys.stderr)
+        sys.exit(1)
+    # A leading "+" counts from the start of the file instead of the end.
+    return count, value.lstrip().startswith("+")
+
+
+def _split_count(args: list[str], index: int) -> tuple[str, str] | None:
+    # -n and -c with their value, spelled `-n 5`, `-n5`, `--lines=5` or `--lines 5`.
+    arg = args[index]
+    if arg.startswith(("--lines=", "--bytes=")):
+        name, value = arg.split("=", 1)
+        return name, value
+    if arg in ("-n", "-c", "--lines", "--bytes"):
+        if index + 1 >= len(args):
+            unit = "bytes" if arg in ("-c", "--bytes") else "lines"
+            print(f"tail: invalid number of {unit}", file=sys.stderr)
             sys.exit(1)
+        return arg, args[index + 1]
+    if arg[:2] in ("-n", "-c") and len(arg) > 2:
+        return arg[:2], arg[2:]
+    return None
+
+
+def main() -> None:
+    args = stats.configure("tail", sys.argv[1:])
+    num_lines: int | None = None
+    from_start = False
+    count_bytes = False
+    follow: str | None = None
+    line_buffered: bool | None = None
+    in_flight = 1
+    files: list[str] = []
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--":
+            files.extend(args[index + 1 :])
+            break
+        if (option := _split_count(args, index)) is not None:
+            name, value = option
+            count_bytes = name in ("-c", "--bytes")
+            num_lines, from_start = _parse_count(value, "bytes" if count_bytes else "lines")
+            if name == arg:
+                index += 1
+        elif arg in ("-f", "--follow", "--follow=descriptor"):
+            follow = "descriptor"
+        elif arg in ("-F", "--follow=name"):
+            follow = "name"
+        elif arg == "--in-flight":
+            if index + 1 >= len(args):
+                print(f"tail: option requires an argument: {arg}", file=sys.stderr)
+                sys.exit(1)
+            in_flight = parse_in_flight("tail", args[index + 1])
+            index += 1
+        elif arg.startswith("--in-flight="):
+            in_flight = parse_in_flight("tail", arg.removeprefix("--in-flight="))
+        elif arg == "--line-buffered":
+            line_buffered = True
+        else:
+            files.append(arg)
+        index += 1
 
-        tail = Tail(num_lines)
-        files = args[2:]
+    if num_lines is None:
+        tail = Tail(line_buffered=line_buffered)
     else:
-        tail = Tail()
-        files = args
+        tail = Tail(num_lines, line_buffered, from_start, count_bytes=count_bytes)
 
+    # GNU tail outputs nothing at all for `-n 0` or `-c 0` without following: no headers, and no file is opened.
+    if num_lines == 0 and not from_start and not follow:
+        return
     if not files:
         tail.process_stream(sys.stdin)
         return
 
+    # Following, -n +K and -c +N stream each file as it goes, so only plain tails are batched. Batching is
+    # asked for with --in-flight N: for a few small files its thread pool costs more than it saves.
+    if in_flight > 1 and not follow and not tail.from_start:
+        tail.process_files(files, in_flight)
+        return
+
+    _tail_files(tail, files, follow)
+
+
+def _make_follower(follow: str, show_headers: bool) -> "Follower":
+    # Following needs asyncio, which a plain tail should not pay for at startup.
+    from src.tail import follow as following  # noqa: PLC0415
+
+    return following.Follower(by_name=follow == "name", show_headers=show_headers)
+
+
+def _tail_files(tail: Tail, files: list[str], follow: str | None) -> None:
     multiple_files = len(files) > 1
+    follower = _make_follower(follow, multiple_files) if follow else None
 
     for i, file in enumerate(files):
-        tail.process_file(file, multiple_files)
+        # Open the file for following first, so a rotation during the initial tail is not missed.
+        followed = follower.add(file) if follower is not None else None
+        if followed is not None and followed.fd is None and follow == "name":
+            continue
+        offset = tail.process_file(file, multiple_files)
+        if followed is not None:
+            followed.offset = offset
         if i < len(files) - 1:
-            print()
+            tail.print_separator()
+
+    if follower is not None:
+        import asyncio  # noqa: PLC0415
+
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(follower.run())
 
 
 if __name__ == "__main__":
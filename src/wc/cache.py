@@ -0,0 +1,205 @@
+import contextlib
+import os
+import sqlite3
+import stat
+import threading
+import time
+from collections.abc import Callable
+
+from src.io.cache import cache_dir, tail_digest
+from src.io.compressed import MAGIC_SIZE, compression
+from src.io.reader import open_source
+from src.wc.counter import Counts, complete_prefix, count_blocks, count_range
+
+MAX_ENTRIES = 10_000
+BUSY_TIMEOUT = 30.0
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    newlines INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    starts_in_word INTEGER NOT NULL,
+    ends_in_word INTEGER NOT NULL,
+    ends_with_newline INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    only_invalid INTEGER NOT NULL,
+    tail_hash BLOB NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (dev, ino)
+)
+"""
+
+RangeCounter = Callable[[str, int, int], Counts]
+
+
+def default_path() -> str:
+    return os.path.join(cache_dir(), "wc.sqlite3")
+
+
+def _tail_hash(filename: str, size: int) -> bytes:
+    with open(filename, "rb") as file:
+        return tail_digest(file.fileno(), size)
+
+
+def _complete_size(filename: str, size: int) -> int:
+    # The size without a UTF-8 sequence cut by the end of file, which an append may still complete.
+    with open(filename, "rb") as file:
+        tail = os.pread(file.fileno(), min(size, 4), size - min(size, 4))
+    return size - len(tail) + complete_prefix(tail)
+
+
+def _is_compressed(filename: str) -> bool:
+    with open(filename, "rb") as file:
+        return compression(os.pread(file.fileno(), MAGIC_SIZE, 0)) is not None
+
+
+class CountCache:
+    def __init__(self, path: str | None = None, max_entries: int = MAX_ENTRIES) -> None:
+        self.path: str = path or default_path()
+        self.max_entries: int = max_entries
+        self._connections: dict[tuple[int, int], sqlite3.Connection] = {}
+
+    def _connect(self) -> sqlite3.Connection | None:
+        # A connection must not cross fork() or threads, so each pool worker opens its own.
+        key = (os.getpid(), threading.get_ident())
+        if key in self._connections:
+            return self._connections[key]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            # WAL lets concurrent wc processes read while another one writes.
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Rows in an older layout are only a cache, so they are dropped rather than migrated.
+                db.executescript(
+                    f"BEGIN IMMEDIATE; DROP TABLE IF EXISTS counts; {_SCHEMA};"
+                    f" PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+                )
+        except (OSError, sqlite3.Error):
+            return None
+        self._connections[key] = db
+        return db
+
+    def close(self) -> None:
+        for (pid, _), db in self._connections.items():
+            if pid == os.getpid():
+                db.close()
+        self._connections.clear()
+
+    def count(self, filename: str, counter: RangeCounter = count_range) -> Counts:
+        file_stat = os.stat(filename)
+        # A row stores the file size as its byte count, and appended compressed bytes cannot be counted
+        # on their own, so compressed files are counted whole every time.
+        if not stat.S_ISREG(file_stat.st_mode) or _is_compressed(filename):
+            with open_source(filename) as source:
+                return count_blocks(source.blocks())
+        size = file_stat.st_size
+        cached = self._lookup(file_stat)
+        if cached is not None and cached[1] == size and cached[2] == file_stat.st_mtime_ns:
+            return cached[0]
+        # A row stops before a character cut by the end of file: counted now, its lead byte would be invalid,
+        # and the continuation bytes an append brings would be skipped as the middle of a character.
+        complete = _complete_size(filename, size)
+        if cached is not None and 0 < cached[1] <= complete and cached[3] == _tail_hash(filename, cached[1]):
+            # The file only grew: count the appended bytes and merge them onto the cached prefix.
+            counts = cached[0].merge(counter(filename, cached[1], complete))
+        else:
+            counts = counter(filename, 0, complete)
+        self._store(file_stat, counts, _tail_hash(filename, complete))
+        if complete < size:
+            counts = counts.merge(counter(filename, complete, size))
+        return counts
+
+    def _lookup(self, file_stat: os.stat_result) -> tuple[Counts, int, int, bytes] | None:
+        db = self._connect()
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                "SELECT size, mtime_ns, newlines, words, starts_in_word, ends_in_word, ends_with_newline, chars,"
+                " only_invalid, tail_hash FROM counts WHERE dev = ? AND ino = ?",
+                (file_stat.st_dev, file_stat.st_ino),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE counts SET used = ? WHERE dev = ? AND ino = ?",
+                    (time.time(), file_stat.st_dev, file_stat.st_ino),
+                )
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        (
+            size,
+            mtime_ns,
+            newlines,
+            words,
+            starts_in_word,
+            ends_in_word,
+            ends_with_newline,
+            chars,
+            only_invalid,
+            tail_hash,
+        ) = row
+        counts = Counts(
+            newlines,
+            words,
+            size,
+            bool(starts_in_word),
+            bool(ends_in_word),
+            bool(ends_with_newline),
+            chars,
+            bool(only_invalid),
+        )
+        return counts, size, mtime_ns, tail_hash
+
+    def _store(self, file_stat: os.stat_result, counts: Counts, tail_hash: bytes) -> None:
+        db = self._connect()
+        if db is None:
+            return
+        # A failed write only costs a recount next time, so the cache never breaks wc itself.
+        with contextlib.suppress(sqlite3.Error):
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO counts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        file_stat.st_dev,
+                        file_stat.st_ino,
+                        counts.bytes_count,
+                        file_stat.st_mtime_ns,
+                        counts.newlines,
+                        counts.words,
+                        counts.starts_in_word,
+                        counts.ends_in_word,
+                        counts.ends_with_newline,
+                        counts.chars,
+                        counts.only_invalid,
+                        tail_hash,
+                        time.time(),
+                    ),
+                )
+                db.execute(
+                    "DELETE FROM counts WHERE rowid IN (SELECT rowid FROM counts ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+
+_caches: dict[str, CountCache] = {}
+
+
+def open_cache(path: str) -> CountCache:
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = CountCache(path)
+    return cache
@@ -0,0 +1,297 @@
+import codecs
+import importlib
+import mmap
+import re
+from collections.abc import Buffer, Collection, Iterable, Iterator, Sequence
+from functools import cache
+from itertools import chain, pairwise
+from types import ModuleType
+from typing import Any, NamedTuple
+
+from src.io.compressed import bgzf_member_size, bgzf_offsets, inflate_member
+from src.io.reader import BLOCK_SIZE, Source, open_source
+
+# Below this size the NumPy call overhead outweighs the vectorised kernel.
+NUMPY_MIN_SIZE = 64 * 1024
+
+# Whitespace exactly as str.split() sees it, so byte-level counts match the text-mode path.
+_ASCII_SPACES = b"\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+_UNICODE_SPACES = "\x85\xa0\u1680" + "".join(map(chr, range(0x2000, 0x200B))) + "\u2028\u2029\u202f\u205f\u3000"
+_UNICODE_SPACE_RE = re.compile(b"|".join(re.escape(space.encode("utf-8")) for space in _UNICODE_SPACES))
+# Whitespace becomes b" " and everything else b"x", so every word start is a b" x" pair.
+_WORD_TABLE = bytes(0x20 if byte in _ASCII_SPACES else 0x78 for byte in range(256))
+_SPACE_TABLE = bytes(byte in _ASCII_SPACES for byte in range(256))
+# With surrogateescape every undecodable byte becomes one of these: neither a character nor part of a word.
+_ESCAPED_RE = re.compile("[\udc80-\udcff]")
+# The vectorised path looks up every non-ASCII space by its encoded bytes, read as one big-endian integer.
+_UNICODE_SPACE_KEYS = {
+    length: sorted(int.from_bytes(encoded) for space in _UNICODE_SPACES if len(encoded := space.encode()) == length)
+    for length in (2, 3)
+}
+_UNICODE_SPACE_LEADS = bytes(any(space.encode()[0] == byte for space in _UNICODE_SPACES) for byte in range(256))
+
+# Every counter wc can print, in GNU column order; the names match the WCResult fields.
+FIELDS = ("lines", "words", "chars", "bytes_count")
+DEFAULT_FIELDS = ("lines", "words", "bytes_count")
+
+
+class Counts(NamedTuple):
+    newlines: int = 0
+    words: int = 0
+    bytes_count: int = 0
+    starts_in_word: bool = False
+    ends_in_word: bool = False
+    ends_with_newline: bool = False
+    chars: int = 0
+    # Nothing but bytes outside valid UTF-8 sequences: as in GNU wc they neither start nor end a word,
+    # so such a piece leaves the word state of its neighbours as it was.
+    only_invalid: bool = False
+
+    @property
+    def lines(self) -> int:
+        # An unterminated last line still counts, as it does when iterating a text file.
+        return self.newlines + (1 if self.bytes_count and not self.ends_with_newline else 0)
+
+    def merge(self, other: "Counts") -> "Counts":
+        if not self.bytes_count:
+            return other
+        if not other.bytes_count:
+            return self
+        if self.only_invalid or other.only_invalid:
+            edges = other if self.only_invalid else self
+            return edges._replace(
+                newlines=self.newlines + other.newlines,
+                words=self.words + other.words,
+                bytes_count=self.bytes_count + other.bytes_count,
+                ends_with_newline=other.ends_with_newline,
+                chars=self.chars + other.chars,
+                only_invalid=self.only_invalid and other.only_invalid,
+            )
+        return Counts(
+            self.newlines + other.newlines,
+            self.words + other.words - (self.ends_in_word and other.starts_in_word),
+            self.bytes_count + other.bytes_count,
+            self.starts_in_word,
+            other.ends_in_word,
+            other.ends_with_newline,
+            self.chars + other.chars,
+        )
+
+
+@cache
+def _numpy() -> ModuleType | None:
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+def _count_words_translate(data: bytes) -> tuple[int, bool, bool]:
+    marks = data.translate(_WORD_TABLE)
+    starts_in_word = marks[0] == 0x78
+    return marks.count(b" x") + starts_in_word, starts_in_word, marks[-1] == 0x78
+
+
+def _count_words_in_mask(np: ModuleType, spaces: Any) -> tuple[int, bool, bool]:
+    starts_in_word = not spaces[0]
+    return int(np.count_nonzero(spaces[:-1] & ~spaces[1:])) + starts_in_word, starts_in_word, not spaces[-1]
+
+
+def _count_words_numpy(np: ModuleType, data: bytes) -> tuple[int, bool, bool]:
+    return _count_words_in_mask(np, np.frombuffer(data.translate(_SPACE_TABLE), dtype=np.bool_))
+
+
+def _count_words_unicode_numpy(np: ModuleType, data: bytes) -> tuple[int, bool, bool]:
+    # Every byte of a multi-byte space is marked as space; only bytes that can start one are inspected.
+    spaces = np.frombuffer(data.translate(_SPACE_TABLE), dtype=np.bool_).copy()
+    # Two zero bytes past the end let a lead byte at the very end be read as a (non-matching) 3-byte key.
+    raw = np.zeros(len(data) + 2, dtype=np.uint32)
+    raw[: len(data)] = np.frombuffer(data, dtype=np.uint8)
+    candidates = np.flatnonzero(np.frombuffer(data.translate(_UNICODE_SPACE_LEADS), dtype=np.bool_))
+    key = raw[candidates] << 8 | raw[candidates + 1]
+    for length in (2, 3):
+        if length == 3:
+            key = key << 8 | raw[candidates + 2]
+        starts = candidates[np.isin(key, _UNICODE_SPACE_KEYS[length])]
+        for offset in range(length):
+            spaces[starts + offset] = True
+    return _count_words_in_mask(np, spaces)
+
+
+def count_words(data: bytes) -> tuple[int, bool, bool]:
+    np = _numpy() if len(data) >= NUMPY_MIN_SIZE else None
+    if np is None:
+        return _count_words_translate(data)
+    return _count_words_numpy(np, data)
+
+
+def count_chars(data: Buffer) -> int:
+    # As in GNU wc, a byte that is not part of a valid sequence is counted as a byte but not as a character.
+    if isinstance(data, bytes) and data.isascii():
+        return len(data)
+    return len(str(data, "utf-8", errors="ignore"))
+
+
+def _valid_bytes(data: Buffer) -> Buffer:
+    # The text with every byte outside a valid sequence dropped, the way GNU wc steps over them.
+    try:
+        str(data, "utf-8")
+    except UnicodeDecodeError:
+        return str(data, "utf-8", errors="ignore").encode("utf-8")
+    return data
+
+
+def count_chunk(chunk: Buffer, fields: Collection[str] = FIELDS) -> Counts:
+    view = memoryview(chunk)
+    if not view:
+        return Counts()
+    # Importing NumPy takes about 0.1 s, which faster newline counting alone does not pay back: without words,
+    # lines and characters keep to bytes methods.
+    np = _numpy() if len(view) >= NUMPY_MIN_SIZE and "words" in fields else None
+    if np is None:
+        # Without NumPy every count is a bytes method: an mmap block is copied once, here (a bytes chunk is kept).
+        chunk = data = bytes(chunk)
+        newlines, is_ascii = data.count(b"\n"), data.isascii()
+    else:
+        # NumPy reads the block in place and finds newlines several times faster than bytes.count.
+        array = np.frombuffer(view, dtype=np.uint8)
+        newlines, is_ascii = int(np.count_nonzero(array == 0x0A)), int(array.max()) < 0x80
+    words, starts_in_word, ends_in_word, only_invalid = 0, False, False, False
+    if "words" in fields:
+        if is_ascii:
+            # Words are marked with bytes.translate, the one step that needs the block as bytes.
+            words, starts_in_word, ends_in_word = count_words(bytes(chunk))
+        elif text := _valid_bytes(chunk):
+            # Spaces are matched as UTF-8 byte sequences in what is left once invalid bytes are dropped.
+            if np is None:
+                words, starts_in_word, ends_in_word = count_words(_UNICODE_SPACE_RE.sub(b" ", text))
+            else:
+                words, starts_in_word, ends_in_word = _count_words_unicode_numpy(np, bytes(text))
+        else:
+            only_invalid = True
+    chars = 0
+    if "chars" in fields:
+        chars = len(view) if is_ascii else count_chars(chunk)
+    return Counts(newlines, words, len(view), starts_in_word, ends_in_word, view[-1] == 0x0A, chars, only_invalid)
+
+
+def complete_prefix(data: bytes | memoryview) -> int:
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            return len(data)
+        if byte >= 0xC0:
+            needed = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+
+def count_blocks(blocks: Iterable[bytes | memoryview], fields: Collection[str] = FIELDS) -> Counts:
+    counts = Counts()
+    carry = b""
+    for block in blocks:
+        data = block
+        if carry:
+            # Only the bytes that can finish the held-back sequence are joined to it, not the whole block.
+            head = _continuation_length(block)
+            carry += block[:head]
+            data = block[head:]
+            if not data and len(carry) < 4:
+                continue
+            counts = counts.merge(count_chunk(carry, fields))
+        # Hold back a UTF-8 sequence cut by the block boundary until the next block completes it.
+        cut = complete_prefix(data)
+        carry = bytes(data[cut:])
+        counts = counts.merge(count_chunk(data[:cut], fields))
+    return counts.merge(count_chunk(carry, fields))
+
+
+def _continuation_length(data: bytes | memoryview) -> int:
+    index = 0
+    while index < min(len(data), 3) and data[index] & 0xC0 == 0x80:
+        index += 1
+    return index
+
+
+def count_text(text: str, fields: Collection[str] = FIELDS) -> Counts:
+    if not text:
+        return Counts()
+    # Undecodable bytes, escaped as lone surrogates, are neither characters nor part of a word.
+    valid = _ESCAPED_RE.sub("", text)
+    words = len(valid.split()) if "words" in fields else 0
+    chars = len(valid) if "chars" in fields else 0
+    if not valid:
+        return Counts(0, 0, len(text), chars=0, only_invalid=True)
+    return Counts(
+        text.count("\n"), words, len(text), not valid[0].isspace(), not valid[-1].isspace(), text[-1] == "\n", chars
+    )
+
+
+def count_encoded_blocks(
+    blocks: Iterable[bytes | memoryview], encoding: str, fields: Collection[str] = FIELDS
+) -> Counts:
+    # Any other encoding is decoded; an incremental decoder keeps characters cut by a block boundary whole.
+    decoder = codecs.getincrementaldecoder(encoding)(errors="surrogateescape")
+    counts = Counts()
+    size = 0
+    for block in blocks:
+        size += len(block)
+        counts = counts.merge(count_text(decoder.decode(block), fields))
+    counts = counts.merge(count_text(decoder.decode(b"", final=True), fields))
+    # Merged above by characters; the byte column is the size of the input.
+    return counts._replace(bytes_count=size)
+
+
+def _align(source: Source, offset: int, size: int) -> int:
+    if offset <= 0 or offset >= size:
+        return min(max(offset, 0), size)
+    return offset + _continuation_length(source.read_at(offset, 3))
+
+
+def split_ranges(size: int, parts: int) -> list[tuple[int, int]]:
+    parts = max(1, min(parts, size))
+    step = -(-size // parts)
+    return [(start, min(start + step, size)) for start in range(0, size, step)] or [(0, 0)]
+
+
+def count_range(
+    filename: str, start: int, end: int, block_size: int = BLOCK_SIZE, fields: Collection[str] = FIELDS
+) -> Counts:
+    with open_source(filename, decompress=False) as source:
+        size = source.size or 0
+        # Both neighbours move a boundary forward past continuation bytes, so no character is split.
+        start = _align(source, start, size)
+        end = _align(source, end, size)
+        return count_blocks(source.blocks(block_size, start, end), fields)
+
+
+def _inflate(data: bytes | mmap.mmap, offsets: Sequence[int], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    # Members are joined into blocks of about block_size, so counting is not paid per 64 KiB member.
+    pending: list[bytes] = []
+    size = 0
+    for start, end in pairwise(offsets):
+        pending.append(inflate_member(data, start, end))
+        size += len(pending[-1])
+        if size >= block_size:
+            yield b"".join(pending)
+            pending.clear()
+            size = 0
+    yield b"".join(pending)
+
+
+def count_members(filename: str, start: int, end: int, fields: Collection[str] = FIELDS) -> Counts:
+    # [start, end) must be whole BGZF members.
+    with open_source(filename, decompress=False) as source:
+        data = source.map
+        assert data is not None
+        offsets = bgzf_offsets(data, start, end)
+        if offsets is None:
+            raise ValueError(f"not a range of BGZF members: {start}-{end}")
+        # As in count_range, a character cut at a boundary is counted by the range it starts in.
+        first = inflate_member(data, offsets[0], offsets[1])
+        skip = _continuation_length(first) if start else 0
+        carry = b""
+        if end < len(data) and (size := bgzf_member_size(data, end)) is not None:
+            following = inflate_member(data, end, end + size)
+            carry = following[: _continuation_length(following)]
+        return count_blocks(chain([first[skip:]], _inflate(data, offsets[1:]), [carry]), fields)
@@ -0,0 +1,71 @@
+import contextlib
+import sys
+from collections.abc import Iterable, Iterator
+from functools import reduce
+from itertools import pairwise
+from operator import attrgetter
+from typing import NamedTuple
+
+from src.errors import ToolError
+from src.wc.counter import Counts
+
+
+class Partial(NamedTuple):
+    # The counts of bytes [start, end) of a file; a whole file is the range from 0 to its size.
+    filename: str
+    start: int
+    end: int
+    counts: Counts
+
+
+def to_json(partial: Partial) -> str:
+    # One object per line. The edge state (in a word at either end, a final newline) is what lets ranges
+    # counted apart merge into the counts of the whole file.
+    import json  # noqa: PLC0415
+
+    record = {"file": partial.filename, "start": partial.start, "end": partial.end, **partial.counts._asdict()}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def from_json(line: str) -> Partial:
+    import json  # noqa: PLC0415
+
+    record = json.loads(line)
+    counts = Counts(*(record[field] for field in Counts._fields))
+    if not all(isinstance(value, int) for value in counts) or not isinstance(record["file"], str):
+        raise ValueError(line)
+    return Partial(record["file"], int(record["start"]), int(record["end"]), counts)
+
+
+def read_partials(filename: str) -> Iterator[Partial]:
+    # Only a file opened here is closed here; stdin stays open for whatever reads it next.
+    try:
+        file = contextlib.nullcontext(sys.stdin) if filename == "-" else open(filename, encoding="utf-8")  # noqa: SIM115
+    except OSError as e:
+        raise ToolError(filename, e) from e
+    with file as lines:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                yield from_json(line)
+            except (KeyError, TypeError, ValueError):
+                raise ToolError(f"{filename}:{number}", "invalid partial result") from None
+
+
+def merge_partials(partials: Iterable[Partial]) -> list[Partial]:
+    # Ranges of one file are merged in offset order and must meet exactly; files keep the order they first came in.
+    pieces: dict[str, list[Partial]] = {}
+    for partial in partials:
+        pieces.setdefault(partial.filename, []).append(partial)
+    merged = []
+    for filename, parts in pieces.items():
+        parts.sort(key=attrgetter("start", "end"))
+        for before, after in pairwise(parts):
+            if after.start != before.end:
+                raise ToolError(
+                    filename, f"partial ranges {before.start}-{before.end} and {after.start}-{after.end} do not meet"
+                )
+        counts = reduce(Counts.merge, (part.counts for part in parts), Counts())
+        merged.append(Partial(filename, parts[0].start, parts[-1].end, counts))
+    return merged
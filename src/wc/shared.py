@@ -0,0 +1,66 @@
+import contextlib
+import os
+import struct
+import tempfile
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.wc.wc import WCResult
+
+# Lines, words, characters and bytes, as unsigned 64-bit counters.
+_LAYOUT = struct.Struct("<4Q")
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"wc-{name}.lock")
+
+
+class SharedTotal:
+    # A running total in a named shared memory block that any number of wc processes add to, one at a time
+    # under an flock; the block outlives the processes until it is reset.
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[memoryview]:
+        import fcntl  # noqa: PLC0415
+        from multiprocessing import shared_memory  # noqa: PLC0415
+
+        with open(_lock_path(self.name), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Creation happens under the lock too, so only one process makes the block and it starts at zero.
+            try:
+                block = shared_memory.SharedMemory(self.name, create=True, size=_LAYOUT.size, track=False)
+            except FileExistsError:
+                block = shared_memory.SharedMemory(self.name, track=False)
+            assert block.buf is not None
+            try:
+                yield block.buf
+            finally:
+                block.close()
+
+    def add(self, result: "WCResult") -> None:
+        with self._locked() as buffer:
+            totals = _LAYOUT.unpack_from(buffer)
+            # A counter the run did not count is None and adds nothing.
+            added = (total + (value or 0) for total, value in zip(totals, result[:4], strict=True))
+            _LAYOUT.pack_into(buffer, 0, *added)
+
+    def read(self) -> tuple[int, int, int, int]:
+        with self._locked() as buffer:
+            lines, words, chars, bytes_count = _LAYOUT.unpack_from(buffer)
+        return lines, words, chars, bytes_count
+
+    def reset(self) -> None:
+        from multiprocessing import shared_memory  # noqa: PLC0415
+
+        try:
+            block = shared_memory.SharedMemory(self.name, track=False)
+        except FileNotFoundError:
+            pass
+        else:
+            block.close()
+            block.unlink()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(_lock_path(self.name))
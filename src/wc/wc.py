@@ -1,66 +1,476 @@
+import os
+import stat
 import sys
-from typing import NoReturn, TextIO
+from collections import deque
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from functools import partial, reduce
+from io import TextIOBase
+from itertools import batched, chain, islice, repeat
+from typing import TYPE_CHECKING, BinaryIO, NamedTuple, NoReturn, TextIO, cast
 
+from src.errors import ToolError
+from src.io.compressed import MAGIC_SIZE, bgzf_offsets, compression
+from src.io.paths import expand_paths, has_glob
+from src.io.prefetch import read_ordered
+from src.io.reader import BLOCK_SIZE, Source, open_source
+from src.stats import stats
+from src.wc.counter import (
+    DEFAULT_FIELDS,
+    FIELDS,
+    Counts,
+    count_blocks,
+    count_encoded_blocks,
+    count_members,
+    count_range,
+    split_ranges,
+)
+from src.wc.partial import Partial, merge_partials, read_partials, to_json
 
-class WC:
-    def __init__(self) -> None:
-        self.total_lines: int = 0
-        self.total_words: int = 0
-        self.total_bytes: int = 0
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+BATCHES_PER_JOB = 4
+# Files found by a walk are sent to counting processes this many at a time; how many there are is not known up front.
+STREAM_BATCH_SIZE = 16
+# Batches queued or running per counting process; a walk never runs further ahead of counting than that.
+BATCHES_IN_FLIGHT = 2
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class WCResult(NamedTuple):
+    # A counter that was not asked for is None, so an uncounted column is never mistaken for a zero count.
+    lines: int | None
+    words: int | None
+    chars: int | None
+    bytes_count: int | None
+    filename: str = ""
+
+
+def _values(counts: Counts) -> tuple[int, int, int, int]:
+    return counts.lines, counts.words, counts.chars, counts.bytes_count
+
+
+def _result(values: Sequence[int], fields: Collection[str], filename: str = "") -> WCResult:
+    lines, words, chars, bytes_count = (
+        value if field in fields else None for field, value in zip(FIELDS, values, strict=True)
+    )
+    return WCResult(lines, words, chars, bytes_count, filename)
+
+
+def _only_bytes(fields: Collection[str]) -> bool:
+    return "bytes_count" in fields and not {"lines", "words", "chars"} & set(fields)
+
+
+def _count_counts(
+    filename: str, cache_path: str | None, fields: Collection[str], encoding: str | None = None
+) -> Counts:
+    if _only_bytes(fields):
+        # A byte count alone is the size of a regular file, so the data is never read. A compressed
+        # file's bytes are the decompressed ones, so it is counted like any other input.
+        with open(filename, "rb") as file:
+            file_stat = os.fstat(file.fileno())
+            if stat.S_ISREG(file_stat.st_mode) and compression(os.pread(file.fileno(), MAGIC_SIZE, 0)) is None:
+                return Counts(bytes_count=file_stat.st_size)
+    if encoding is not None:
+        # The cache holds counts of UTF-8 text, so a file read in another encoding is counted afresh.
+        with open_source(filename) as source:
+            return count_encoded_blocks(source.blocks(), encoding, fields)
+    if cache_path is not None:
+        # sqlite3 is imported only by runs that use the cache.
+        from src.wc.cache import open_cache  # noqa: PLC0415
+
+        return open_cache(cache_path).count(filename)
+    with open_source(filename) as source:
+        return count_blocks(source.blocks(), fields)
+
+
+def count_file(
+    filename: str,
+    cache_path: str | None = None,
+    fields: Collection[str] = DEFAULT_FIELDS,
+    encoding: str | None = None,
+) -> tuple[int, int, int, int]:
+    return _values(_count_counts(filename, cache_path, fields, encoding))
+
+
+def _count_range_parallel(filename: str, start: int, end: int, jobs: int, fields: Collection[str] = FIELDS) -> Counts:
+    parts = min(jobs * BATCHES_PER_JOB, (end - start) // MIN_CHUNK_SIZE)
+    counter = partial(count_range, fields=tuple(fields))
+    if parts < 2:
+        return counter(filename, start, end)
+    starts, ends = zip(*((start + a, start + b) for a, b in split_ranges(end - start, parts)), strict=True)
+    from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        return reduce(Counts.merge, executor.map(counter, repeat(filename), starts, ends), Counts())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _count_members_parallel(filename: str, offsets: Sequence[int], jobs: int, fields: Collection[str]) -> Counts:
+    # Members are grouped into a few ranges per worker; each worker inflates and counts its own.
+    step = -(-(len(offsets) - 1) // (jobs * BATCHES_PER_JOB))
+    bounds = list(offsets[::step])
+    if bounds[-1] != offsets[-1]:
+        bounds.append(offsets[-1])
+    from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        counter = partial(count_members, fields=tuple(fields))
+        return reduce(Counts.merge, executor.map(counter, repeat(filename), bounds[:-1], bounds[1:]), Counts())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _compression(filename: str) -> tuple[str | None, Sequence[int] | None]:
+    with open_source(filename, decompress=False) as source:
+        kind = compression(source.read_at(0, MAGIC_SIZE))
+        if kind != "gzip" or source.map is None:
+            return kind, None
+        return kind, bgzf_offsets(source.map)
+
+
+def _count_chunked(filename: str, jobs: int, cache_path: str | None, fields: Collection[str]) -> Counts:
+    file_stat = os.stat(filename)
+    if file_stat.st_size // MIN_CHUNK_SIZE < 2 or not stat.S_ISREG(file_stat.st_mode):
+        return _count_counts(filename, cache_path, fields)
+    # bgzip output is a chain of independent gzip members, so it splits for workers without decompressing it.
+    kind, offsets = _compression(filename)
+    if offsets is not None:
+        return _count_members_parallel(filename, offsets, jobs, fields)
+    if kind is not None or _only_bytes(fields):
+        return _count_counts(filename, cache_path, fields)
+    if cache_path is not None:
+        from src.wc.cache import open_cache  # noqa: PLC0415
+
+        return open_cache(cache_path).count(filename, partial(_count_range_parallel, jobs=jobs))
+    return _count_range_parallel(filename, 0, file_stat.st_size, jobs, fields)
+
+
+def _count_any(
+    filename: str, jobs: int, cache_path: str | None, fields: Collection[str], encoding: str | None
+) -> Counts:
+    try:
+        # Text in another encoding is decoded in order, so it is not split between workers.
+        if jobs > 1 and encoding is None:
+            return _count_chunked(filename, jobs, cache_path, fields)
+        return _count_counts(filename, cache_path, fields, encoding)
+    except Exception as e:
+        raise ToolError(filename, e) from e
+
+
+def count(
+    filename: str,
+    jobs: int = 1,
+    cache_path: str | None = None,
+    fields: Collection[str] = DEFAULT_FIELDS,
+    encoding: str | None = None,
+) -> WCResult:
+    return _result(_values(_count_any(filename, jobs, cache_path, fields, encoding)), fields, filename)
+
+
+def _stream_counts(stream: BinaryIO | TextIO, fields: Collection[str], encoding: str | None) -> Counts:
+    buffer: BinaryIO | None = getattr(stream, "buffer", None)
+    if isinstance(stream, TextIOBase) and buffer is None:
+        text = cast(TextIO, stream)
+        return count_blocks((block.encode("utf-8") for block in iter(partial(text.read, BLOCK_SIZE), "")), fields)
+    with Source(buffer or cast(BinaryIO, stream)) as source:
+        if source.size is not None and _only_bytes(fields):
+            return Counts(bytes_count=source.size - source.origin)
+        if encoding is not None:
+            return count_encoded_blocks(source.blocks(), encoding, fields)
+        return count_blocks(source.blocks(), fields)
+
+
+def count_stream(
+    stream: BinaryIO | TextIO, fields: Collection[str] = DEFAULT_FIELDS, encoding: str | None = None
+) -> WCResult:
+    return _result(_values(_stream_counts(stream, fields, encoding)), fields)
 
-    def _process_file(self, filename: str) -> tuple[int, int, int]:
-        lines = words = bytes_count = 0
+
+def count_partial(
+    filename: str,
+    byte_range: tuple[int, int | None] | None = None,
+    jobs: int = 1,
+    cache_path: str | None = None,
+    encoding: str | None = None,
+) -> Partial:
+    # Every counter is kept, whichever columns are printed, so partials merge into any of them later.
+    if byte_range is None:
+        counts = _count_any(filename, jobs, cache_path, FIELDS, encoding)
+        return Partial(filename, 0, counts.bytes_count, counts)
+    try:
+        if _compression(filename)[0] is not None:
+            raise ValueError("a byte range of a compressed file cannot be counted")
+        size = os.path.getsize(filename)
+        end = size if byte_range[1] is None else min(byte_range[1], size)
+        start = min(byte_range[0], end)
+        return Partial(filename, start, end, _count_range_parallel(filename, start, end, jobs, FIELDS))
+    except Exception as e:
+        raise ToolError(filename, e) from e
+
+
+def count_many(
+    filenames: Iterable[str],
+    jobs: int = 1,
+    cache_path: str | None = None,
+    in_flight: int = 1,
+    fields: Collection[str] = DEFAULT_FIELDS,
+    *,
+    encoding: str | None = None,
+) -> Iterator[WCResult]:
+    # A list of one file is counted in place; names still to be found by a walk may be many.
+    many = not isinstance(filenames, Sequence) or len(filenames) > 1
+    if jobs > 1 and many:
+        yield from _count_many_parallel(filenames, jobs, cache_path, fields, encoding)
+    elif in_flight > 1 and many:
+        counter = partial(count_file, cache_path=cache_path, fields=fields, encoding=encoding)
+        for filename, counts, error in read_ordered(filenames, counter, in_flight):
+            if error is not None:
+                raise ToolError(filename, error) from error
+            assert counts is not None
+            yield _result(counts, fields, filename)
+    else:
+        for filename in filenames:
+            yield count(filename, jobs, cache_path, fields, encoding)
+
+
+def _count_batch(
+    filenames: Sequence[str], cache_path: str | None, fields: Collection[str], encoding: str | None
+) -> list[tuple[int, int, int, int] | Exception]:
+    # An error takes its file's place and ends the batch, so the files before it are still reported.
+    results: list[tuple[int, int, int, int] | Exception] = []
+    for filename in filenames:
         try:
-            with open(filename, encoding="utf-8") as file:
-                for line in file:
-                    lines += 1
-                    words += len(line.split())
-                    bytes_count += len(line.encode("utf-8"))
-        except FileNotFoundError:
-            print(f"wc: {filename}: No such file or directory", file=sys.stderr)
-            self._exit_with_error()
+            results.append(count_file(filename, cache_path, fields, encoding))
         except Exception as e:
-            print(f"wc: {filename}: {e}", file=sys.stderr)
-            self._exit_with_error()
+            results.append(e)
+            break
+    return results
+
+
+def _count_many_parallel(
+    filenames: Iterable[str], jobs: int, cache_path: str | None, fields: Collection[str], encoding: str | None
+) -> Iterator[WCResult]:
+    # A few batches per worker keeps IPC overhead low without leaving workers idle at the tail.
+    if isinstance(filenames, Sequence):
+        batch_size = max(1, len(filenames) // (jobs * BATCHES_PER_JOB))
+    else:
+        batch_size = STREAM_BATCH_SIZE
+    from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        counter = partial(_count_batch, cache_path=cache_path, fields=tuple(fields), encoding=encoding)
+        # Executor.map would take every name before counting the first, so batches are submitted as earlier
+        # ones finish: results print while a walk is still finding files, and it never gets far ahead.
+        pending: deque[tuple[tuple[str, ...], Future[list[tuple[int, int, int, int] | Exception]]]] = deque()
+        remaining = batched(filenames, batch_size, strict=False)
+
+        def submit(count: int) -> None:
+            for batch in islice(remaining, count):
+                pending.append((batch, executor.submit(counter, batch)))
+
+        submit(jobs * BATCHES_IN_FLIGHT)
+        while pending:
+            batch, future = pending.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                raise ToolError(batch[0], e) from e
+            submit(1)
+            for filename, counts in zip(batch, results, strict=False):
+                if isinstance(counts, Exception):
+                    raise ToolError(filename, counts) from counts
+                yield _result(counts, fields, filename)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _add(total: int | None, value: int | None) -> int | None:
+    if total is None or value is None:
+        return value if total is None else total
+    return total + value
+
+
+def _plus(total: WCResult, result: WCResult) -> WCResult:
+    return WCResult(
+        _add(total.lines, result.lines),
+        _add(total.words, result.words),
+        _add(total.chars, result.chars),
+        _add(total.bytes_count, result.bytes_count),
+        total.filename,
+    )
+
 
-        self.total_lines += lines
-        self.total_words += words
-        self.total_bytes += bytes_count
+def _directories(path: str, root: str) -> list[str]:
+    # The directories from root down to the one holding path.
+    chain = []
+    directory = os.path.dirname(path)
+    while directory != root and len(directory) > len(root):
+        chain.append(directory)
+        directory = os.path.dirname(directory)
+    chain.append(root)
+    return chain[::-1]
 
-        return lines, words, bytes_count
 
-    def _process_stdin(self, stream: TextIO) -> tuple[int, int, int]:
-        lines = words = bytes_count = 0
-        for line in stream:
-            lines += 1
-            words += len(line.split())
-            bytes_count += len(line.encode("utf-8"))
-        self.total_lines += lines
-        self.total_words += words
-        self.total_bytes += bytes_count
-        return lines, words, bytes_count
+class Subtotals:
+    # Rows for --subtotals: like du, each directory sums everything under it and is printed after its contents.
+    def __init__(self) -> None:
+        self.open: list[WCResult] = []
+
+    def add(self, result: WCResult, root: str | None) -> list[WCResult]:
+        chain = _directories(result.filename, root) if root is not None else []
+        kept = 0
+        while kept < min(len(self.open), len(chain)) and self.open[kept].filename == chain[kept]:
+            kept += 1
+        closed = self.close(kept)
+        self.open.extend(WCResult(None, None, None, None, directory) for directory in chain[kept:])
+        self.open = [_plus(total, result) for total in self.open]
+        return closed
+
+    def close(self, kept: int = 0) -> list[WCResult]:
+        closed = self.open[kept:][::-1]
+        del self.open[kept:]
+        return closed
+
+
+class WC:
+    def __init__(
+        self,
+        jobs: int = 1,
+        cache_path: str | None = None,
+        in_flight: int = 1,
+        fields: Collection[str] = DEFAULT_FIELDS,
+        encoding: str | None = None,
+        *,
+        recursive: bool = False,
+        subtotals: bool = False,
+        partial_output: bool = False,
+        merge: bool = False,
+        byte_range: tuple[int, int | None] | None = None,
+        shared: str | None = None,
+    ) -> None:
+        self.total: WCResult = WCResult(None, None, None, None, "total")
+        self.jobs: int = jobs
+        self.cache_path: str | None = cache_path
+        self.in_flight: int = in_flight
+        # Printed in GNU column order whatever order the options came in.
+        self.fields: tuple[str, ...] = tuple(field for field in FIELDS if field in fields)
+        # None reads UTF-8 with the byte-level counters; any other encoding is decoded to count.
+        self.encoding: str | None = encoding
+        # -r counts every file under a directory argument; --subtotals adds a row per directory.
+        self.recursive: bool = recursive
+        self.subtotals: bool = subtotals
+        # --partial prints JSON lines for --merge to combine later; --range counts only those bytes of each file.
+        self.partial_output: bool = partial_output
+        self.merge: bool = merge
+        self.byte_range: tuple[int, int | None] | None = byte_range
+        # --shared adds this run's total to a shared memory block that other wc processes add to as well.
+        self.shared: str | None = shared
+
+    def _add_to_total(self, result: WCResult) -> None:
+        self.total = _plus(self.total, result)
 
     def _exit_with_error(self) -> NoReturn:
         sys.exit(-1)
 
     def process_data(self, filenames: list[str]) -> None:
-        results = []
+        stats.phase("count")
+        partials: list[Partial] = []
+        try:
+            if self.partial_output or self.merge:
+                partials = self._partials(filenames)
+                files = [_result(_values(counts), FIELDS, filename) for filename, _, _, counts in partials]
+                rows = files.copy()
+            elif filenames and (self.recursive or any(map(has_glob, filenames))):
+                rows, files = self._count_expanded(filenames)
+            elif filenames:
+                files = list(
+                    count_many(
+                        filenames, self.jobs, self.cache_path, self.in_flight, self.fields, encoding=self.encoding
+                    )
+                )
+                rows = files.copy()
+            else:
+                files = [count_stream(sys.stdin, self.fields, self.encoding)]
+                rows = files.copy()
+        except ToolError as e:
+            print(f"wc: {e}", file=sys.stderr)
+            self._exit_with_error()
+        stats.phase("print")
+        for result in files:
+            self._add_to_total(result)
+        stats.add("files", len(files))
+        stats.add("lines", self.total.lines or 0)
+        stats.add("bytes", self.total.bytes_count or 0)
+        total = self.total
+        if self.shared is not None:
+            from src.wc.shared import SharedTotal  # noqa: PLC0415
 
+            SharedTotal(self.shared).add(total)
+        if self.partial_output:
+            for counted in partials:
+                print(to_json(counted))
+            return
+        if len(files) > 1:
+            rows.append(total)
+        self._print_rows(rows)
+
+    def print_shared(self, name: str) -> None:
+        from src.wc.shared import SharedTotal  # noqa: PLC0415
+
+        self._print_rows([WCResult(*SharedTotal(name).read(), name)])
+
+    def _partials(self, filenames: list[str]) -> list[Partial]:
+        if self.merge:
+            # Partials are read from the files named, or from stdin, as in `cat parts/*.jsonl | wc --merge`.
+            return merge_partials(chain.from_iterable(map(read_partials, filenames or ["-"])))
         if not filenames:
-            lines, words, bytes_count = self._process_stdin(sys.stdin)
-            results.append((lines, words, bytes_count, ""))
-        else:
-            for filename in filenames:
-                lines, words, bytes_count = self._process_file(filename)
-                results.append((lines, words, bytes_count, filename))
-        if len(filenames) > 1:
-            results.append((self.total_lines, self.total_words, self.total_bytes, "total"))
-        max_lines_width = max(len(str(lines)) for lines, _, _, _ in results)
-        max_words_width = max(len(str(words)) for _, words, _, _ in results)
-        max_bytes_width = max(len(str(bytes_count)) for _, _, bytes_count, _ in results)
-
-        for lines, words, bytes_count, filename in results:
-            print(
-                f"{lines:{max_lines_width}d} {words:{max_words_width}d} "
-                f"{bytes_count:{max_bytes_width}d} {filename}".rstrip()
+            counts = _stream_counts(sys.stdin, FIELDS, self.encoding)
+            return [Partial("", 0, counts.bytes_count, counts)]
+        counter = partial(
+            count_partial,
+            byte_range=self.byte_range,
+            jobs=self.jobs,
+            cache_path=self.cache_path,
+            encoding=self.encoding,
+        )
+        return list(map(counter, filenames))
+
+    def _count_expanded(self, filenames: list[str]) -> tuple[list[WCResult], list[WCResult]]:
+        # Directories are walked and patterns expanded while the files already found are being counted.
+        roots: deque[str | None] = deque()
+
+        def names() -> Iterator[str]:
+            for path, root in expand_paths(filenames, self.recursive):
+                roots.append(root)
+                yield path
+
+        rows: list[WCResult] = []
+        files: list[WCResult] = []
+        subtotals = Subtotals() if self.subtotals else None
+        for result in count_many(
+            names(), self.jobs, self.cache_path, self.in_flight, self.fields, encoding=self.encoding
+        ):
+            root = roots.popleft()
+            if subtotals is not None:
+                rows.extend(subtotals.add(result, root))
+            rows.append(result)
+            files.append(result)
+        if subtotals is not None:
+            rows.extend(subtotals.close())
+        return rows, files
+
+    def _print_rows(self, results: list[WCResult]) -> None:
+        if not results:
+            return
+        widths = [max(len(str(getattr(result, field))) for result in results) for field in self.fields]
+
+        for result in results:
+            columns = " ".join(
+                f"{getattr(result, field):{width}d}" for field, width in zip(self.fields, widths, strict=True)
             )
+            print(f"{columns} {result.filename}".rstrip())
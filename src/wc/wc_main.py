@@ -1,11 +1,192 @@
+import os
 import sys
+from collections.abc import Collection
 
+from src.errors import ToolError
+from src.io.prefetch import parse_in_flight
+from src.stats import stats
+from src.wc.counter import DEFAULT_FIELDS
 from src.wc.wc import WC
 
+# Letters of short field flags, only ever read inside a `-xyz` group: a bare `l` is a file name.
+FIELD_FLAGS = {"l": "lines", "w": "words", "m": "chars", "c": "bytes_count"}
+FIELD_OPTIONS = {
+    "--lines": "lines",
+    "--words": "words",
+    "--chars": "chars",
+    "--bytes": "bytes_count",
+}
+# Options that take a value, by every name they go by.
+VALUE_OPTIONS = {
+    "-j": "jobs",
+    "--jobs": "jobs",
+    "--in-flight": "in_flight",
+    "--encoding": "encoding",
+    "--files0-from": "files0_from",
+    "--range": "range",
+    "--shared": "shared",
+    "--show-shared": "show_shared",
+    "--reset-shared": "reset_shared",
+}
+FLAG_OPTIONS = {
+    "--recursive": "recursive",
+    "--subtotals": "subtotals",
+    "--partial": "partial",
+    "--merge": "merge",
+}
+# A range of bytes splits words its own way, and merged or shared totals are of whole files.
+CONFLICTS = [("range", "encoding"), ("range", "merge"), ("range", "shared"), ("merge", "recursive")]
+
+
+def _read_names0(filename: str) -> list[str]:
+    from src.io.paths import read_names0  # noqa: PLC0415
+
+    try:
+        return read_names0(filename)
+    except ToolError as e:
+        print(f"wc: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _default_cache_path() -> str:
+    from src.wc.cache import default_path  # noqa: PLC0415
+
+    return default_path()
+
+
+def _argument(args: list[str], index: int) -> str:
+    if index + 1 >= len(args):
+        print(f"wc: option requires an argument: {args[index]}", file=sys.stderr)
+        sys.exit(1)
+    return args[index + 1]
+
+
+def _parse_jobs(value: str) -> int:
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = -1
+    if jobs < 0:
+        print(f"wc: invalid number of jobs: {value}", file=sys.stderr)
+        sys.exit(1)
+    return jobs or os.cpu_count() or 1
+
+
+def _parse_encoding(value: str) -> str | None:
+    import codecs  # noqa: PLC0415
+
+    try:
+        name = codecs.lookup(value).name
+    except LookupError:
+        print(f"wc: unknown encoding: '{value}'", file=sys.stderr)
+        sys.exit(1)
+    # UTF-8 is what the byte-level counters already assume, so it needs no decoding.
+    return None if name == "utf-8" else name
+
+
+def _parse_range(value: str) -> tuple[int, int | None]:
+    # START-END or START- in bytes, END exclusive, as in `--range=0-1048576`.
+    start, dash, end = value.partition("-")
+    try:
+        byte_range = int(start), int(end) if end else None
+    except ValueError:
+        byte_range = None
+    if not dash or byte_range is None or byte_range[0] < 0 or (byte_range[1] or 0) < 0:
+        print(f"wc: invalid byte range: '{value}'", file=sys.stderr)
+        sys.exit(1)
+    return byte_range
+
+
+def _check_conflicts(options: Collection[str]) -> None:
+    for first, second in CONFLICTS:
+        if first in options and second in options:
+            print(f"wc: --{first} cannot be combined with --{second}", file=sys.stderr)
+            sys.exit(1)
+
+
+def _split_option(args: list[str], index: int) -> tuple[str, str] | None:
+    # The name and value of a value option at args[index], spelled `-j 4`, `-j4`, `--jobs=4` or `--jobs 4`.
+    arg = args[index]
+    if arg.startswith("--") and "=" in arg:
+        name, value = arg.split("=", 1)
+        return (name, value) if name in VALUE_OPTIONS else None
+    if arg in VALUE_OPTIONS:
+        return arg, _argument(args, index)
+    if arg.startswith("-j") and len(arg) > 2:
+        return "-j", arg[2:]
+    return None
+
 
 def main() -> None:
-    wc = WC()
-    wc.process_data(sys.argv[1:])
+    args = stats.configure("wc", sys.argv[1:])
+    values: dict[str, str] = {}
+    # WC_CACHE=1 turns the cache on for every run, e.g. in a nightly job.
+    cache_path: str | None = _default_cache_path() if os.environ.get("WC_CACHE") == "1" else None
+    fields: list[str] = []
+    flags: set[str] = set()
+    files: list[str] = []
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--":
+            files.extend(args[index + 1 :])
+            break
+        if (option := _split_option(args, index)) is not None:
+            name, value = option
+            values[VALUE_OPTIONS[name]] = value
+            if name == arg:
+                index += 1
+        elif arg == "--cache":
+            cache_path = _default_cache_path()
+        elif arg.startswith("--cache="):
+            cache_path = arg.removeprefix("--cache=")
+        elif arg == "--no-cache":
+            cache_path = None
+        elif arg in FLAG_OPTIONS:
+            flags.add(FLAG_OPTIONS[arg])
+        elif arg in FIELD_OPTIONS:
+            fields.append(FIELD_OPTIONS[arg])
+        elif len(arg) > 1 and arg.startswith("-") and all(flag in "lwmcr" for flag in arg[1:]):
+            # Short flags combine, as in `wc -lw` or `wc -rl`.
+            if "r" in arg:
+                flags.add("recursive")
+            fields.extend(FIELD_FLAGS[flag] for flag in arg[1:] if flag != "r")
+        else:
+            files.append(arg)
+        index += 1
+
+    _check_conflicts(values.keys() | flags)
+    if "reset_shared" in values:
+        from src.wc.shared import SharedTotal  # noqa: PLC0415
+
+        SharedTotal(values["reset_shared"]).reset()
+        return
+    if "files0_from" in values:
+        if files:
+            print(f"wc: extra operand '{files[0]}'", file=sys.stderr)
+            print("file operands cannot be combined with --files0-from", file=sys.stderr)
+            sys.exit(1)
+        files = _read_names0(values["files0_from"])
+        if not files:
+            return
+    wc = WC(
+        _parse_jobs(values.get("jobs", "1")),
+        cache_path,
+        parse_in_flight("wc", values.get("in_flight", "1")),
+        fields or DEFAULT_FIELDS,
+        _parse_encoding(values["encoding"]) if "encoding" in values else None,
+        recursive="recursive" in flags,
+        subtotals="subtotals" in flags,
+        partial_output="partial" in flags,
+        merge="merge" in flags,
+        byte_range=_parse_range(values["range"]) if "range" in values else None,
+        shared=values.get("shared"),
+    )
+    if "show_shared" in values:
+        wc.print_shared(values["show_shared"])
+    else:
+        wc.process_data(files)
 
 
 if __name__ == "__main__":
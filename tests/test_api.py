@@ -0,0 +1,89 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.api import (
+    NumberedLine,
+    ToolError,
+    WCResult,
+    count,
+    count_many,
+    count_stream,
+    format_lines,
+    number_file,
+    number_lines,
+    read_tail,
+    tail_lines,
+)
+
+WC_INPUT = os.path.join("artifacts", "wc", "input_1.txt")
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "sample.txt"
+    path.write_bytes(b"".join(f"line {number}\n".encode() for number in range(1, 21)))
+    return str(path)
+
+
+def test_count_returns_structured_result():
+    result = count(WC_INPUT)
+    # -m was not asked for, so chars is None rather than a count of 0.
+    assert result == WCResult(40, 37, None, 121, WC_INPUT)
+    assert (result.lines, result.words, result.bytes_count) == (40, 37, 121)
+
+
+def test_count_matches_cli():
+    output = subprocess.run(
+        [sys.executable, "-m", "src.wc.wc_main", WC_INPUT], capture_output=True, text=True, check=True
+    ).stdout.split()
+    result = count(WC_INPUT)
+    assert output == [str(value) for value in (result.lines, result.words, result.bytes_count, result.filename)]
+
+
+def test_count_many_and_stream(sample):
+    results = list(count_many([WC_INPUT, sample], in_flight=4))
+    assert [result.filename for result in results] == [WC_INPUT, sample]
+    assert count_stream(io.BytesIO(b"a b\nc\n"))[:4] == (2, 3, None, 6)
+    assert count_stream(io.BytesIO("б b\n".encode()), fields=("chars",))[:4] == (None, None, 4, None)
+    assert count_stream(io.BytesIO(b""), fields=("chars",)).chars == 0
+
+
+def test_tail_lines(sample):
+    assert list(tail_lines(sample, 3)) == [b"line 18\n", b"line 19\n", b"line 20\n"]
+    assert list(tail_lines(sample, 19, from_start=True)) == [b"line 19\n", b"line 20\n"]
+    data, end = read_tail(sample, 1)
+    assert data == b"line 20\n"
+    assert end == os.path.getsize(sample)
+
+
+def test_number_lines():
+    numbered = list(number_lines([b"first\n", "second\n"], start=5))
+    assert numbered == [NumberedLine(5, "first"), NumberedLine(6, "second")]
+    assert numbered[0].format(6) == "     5\tfirst\n"
+    assert list(format_lines([b"first\n"], 5, 6)) == [numbered[0].format(6).encode()]
+
+
+def test_number_file_from_line(sample):
+    numbered = list(number_file(sample, from_line=19))
+    assert numbered == [NumberedLine(19, "line 19"), NumberedLine(20, "line 20")]
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        count,
+        lambda path: read_tail(path, 3),
+        lambda path: list(tail_lines(path)),
+        lambda path: list(number_file(path)),
+    ],
+)
+def test_missing_file_raises(tmp_path, call):
+    missing = str(tmp_path / "missing.txt")
+    with pytest.raises(ToolError) as error:
+        call(missing)
+    assert error.value.filename == missing
+    assert str(error.value) == f"{missing}: No such file or directory"
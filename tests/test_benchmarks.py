@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.corpus import KINDS, ensure, generate, parse_size
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("size", [1, 3, 1024, 3 * 1024 * 1024 + 7])
+def test_corpus_exact_size_and_valid_utf8(kind: str, size: int) -> None:
+    data = b"".join(generate(kind, size))
+    assert len(data) == size
+    data.decode("utf-8")
+    assert data.endswith(b"\n") == (kind != "no-trailing-newline")
+
+
+def test_corpus_is_deterministic(tmp_path) -> None:
+    first = ensure("unicode", parse_size("64KB"), str(tmp_path / "a"))
+    second = ensure("unicode", parse_size("64KB"), str(tmp_path / "b"))
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_parse_size() -> None:
+    assert parse_size("1KB") == 1024
+    assert parse_size("10GB") == 10 * 1024**3
+    with pytest.raises(ValueError):
+        parse_size("ten")
+
+
+def _result(wall_time: float, peak_rss_kb: int = 1000) -> dict[str, float | int]:
+    return {"wall_time": wall_time, "peak_rss_kb": peak_rss_kb}
+
+
+def test_compare_flags_regressions_past_threshold() -> None:
+    baseline = {("wc_main", "a.txt"): _result(1.0), ("nl_main", "a.txt"): _result(1.0)}
+    current = {("wc_main", "a.txt"): _result(1.05), ("nl_main", "a.txt"): _result(1.5, 3000)}
+    _, regressions = compare(baseline, current, threshold=0.1)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("nl_main a.txt: wall time +50.0%")
+
+    _, regressions = compare(baseline, current, threshold=0.6, rss_threshold=0.5)
+    assert regressions == ["nl_main a.txt: peak RSS +200.0%"]
+
+
+def test_compare_ignores_unmatched_results() -> None:
+    lines, regressions = compare({("wc_main", "a.txt"): _result(1.0)}, {("wc_main", "b.txt"): _result(9.0)})
+    assert regressions == []
+    assert len(lines) == 2
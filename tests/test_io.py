@@ -0,0 +1,378 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import subprocess
+import sys
+import threading
+import time
+from itertools import pairwise
+
+import pytest
+
+from benchmarks.corpus import bgzf
+from src.io import line_index, sink as sink_module
+from src.io.compressed import bgzf_offsets, compression, inflate_member
+from src.io.line_index import LineIndex, index_for, seek_line, skip_lines
+from src.io.prefetch import parse_in_flight, read_ordered
+from src.io.reader import Source, open_source, spool
+from src.io.sink import OutputSink
+
+CONTENT = b"first line\nsecond\n\nno newline at the end"
+
+
+@pytest.fixture
+def sample(tmp_path):
+    path = tmp_path / "sample.txt"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_source_reads_regular_file(sample, use_mmap):
+    with open_source(sample, use_mmap=use_mmap) as source:
+        assert (source.map is not None) == use_mmap
+        assert source.size == len(CONTENT)
+        assert b"".join(source.blocks(block_size=4)) == CONTENT
+        assert b"".join(source.blocks(block_size=3, start=5, end=20)) == CONTENT[5:20]
+        assert list(source.lines()) == CONTENT.splitlines(keepends=True)
+        assert source.count_lines() == 4
+        assert source.read_at(6, 4) == b"line"
+
+
+def test_source_falls_back_for_empty_file(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.touch()
+    with open_source(str(empty)) as source:
+        assert source.map is None
+        assert source.size == 0
+        assert list(source.blocks()) == []
+        assert source.count_lines() == 0
+
+
+def test_source_falls_back_for_pipe():
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, CONTENT)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe, Source(pipe) as source:
+        assert source.map is None
+        assert source.size is None
+        assert list(source.lines()) == CONTENT.splitlines(keepends=True)
+
+
+def test_source_does_not_map_partly_consumed_descriptor(sample):
+    with open(sample, "rb") as file:
+        file.readline()
+        with Source(file) as source:
+            assert source.map is None
+            assert b"".join(source.blocks()) == CONTENT[len(b"first line\n") :]
+
+
+def test_source_close_tolerates_live_slices(sample):
+    with open_source(sample) as source:
+        block = next(source.blocks())
+    assert bytes(block) == CONTENT
+
+
+def test_spool_makes_chunks_mappable():
+    with spool([b"a\n", memoryview(b"b\nc")]) as file, Source(file) as source:
+        assert source.map is not None
+        assert source.count_lines() == 3
+        assert list(source.lines()) == [b"a\n", b"b\n", b"c"]
+
+
+COMPRESSORS = {"gzip": gzip.compress, "bzip2": bz2.compress, "xz": lzma.compress}
+
+
+@pytest.mark.parametrize("kind", COMPRESSORS)
+def test_compression_detected_by_magic_bytes(kind):
+    assert compression(COMPRESSORS[kind](CONTENT)[:10]) == kind
+
+
+@pytest.mark.parametrize("header", [b"", b"BZh9 is text", b"\x1f", CONTENT[:10], "\u0413\u0417".encode()])
+def test_compression_leaves_plain_text_alone(header):
+    assert compression(header) is None
+
+
+@pytest.mark.parametrize("kind", COMPRESSORS)
+def test_open_source_streams_compressed_file(tmp_path, kind):
+    path = tmp_path / "sample.z"
+    path.write_bytes(COMPRESSORS[kind](CONTENT))
+    with open_source(str(path)) as source:
+        assert source.map is None
+        assert source.size is None
+        assert b"".join(source.blocks(block_size=4)) == CONTENT
+    with open_source(str(path)) as source:
+        assert list(source.lines()) == CONTENT.splitlines(keepends=True)
+    with open_source(str(path), decompress=False) as source:
+        assert source.size == path.stat().st_size
+
+
+def test_bgzf_offsets_split_members():
+    data = CONTENT * 20_000
+    packed = b"".join(bgzf([data]))
+    offsets = bgzf_offsets(packed)
+    assert offsets is not None
+    assert offsets[0] == 0
+    assert offsets[-1] == len(packed)
+    assert b"".join(inflate_member(packed, start, end) for start, end in pairwise(offsets)) == data
+    assert bgzf_offsets(packed, offsets[2], offsets[5]) == offsets[2:6]
+    assert bgzf_offsets(gzip.compress(data)) is None
+    assert bgzf_offsets(packed[:-1]) is None
+
+
+INDEX_CONTENT = b"".join(f"line {i} {'x' * (i % 13)}\n".encode() for i in range(1000)) + b"tail without newline"
+
+
+def line_starts(data):
+    starts = [0]
+    starts.extend(i + 1 for i, byte in enumerate(data) if byte == 0x0A)
+    return starts
+
+
+@pytest.fixture
+def indexed(monkeypatch, tmp_path):
+    monkeypatch.setattr(line_index, "INDEX_MIN_SIZE", 0)
+    monkeypatch.setattr(line_index, "STRIDE", 7)
+    monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "indexed.txt"
+    path.write_bytes(INDEX_CONTENT)
+    return path
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 5, 999, 1000, 1001, 5000])
+@pytest.mark.parametrize("block_size", [3, 1024])
+def test_skip_lines_matches_line_starts(count, block_size):
+    blocks = [INDEX_CONTENT[i : i + block_size] for i in range(0, len(INDEX_CONTENT), block_size)]
+    starts = line_starts(INDEX_CONTENT)
+    assert skip_lines(blocks, count) == (starts[count] if count < len(starts) else len(INDEX_CONTENT))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_line_index_offsets_match_scan(indexed, use_mmap):
+    starts = line_starts(INDEX_CONTENT)
+    with open_source(str(indexed), use_mmap=use_mmap) as source:
+        index = index_for(source)
+        assert index is not None
+        assert index.lines == 1001
+        assert list(index.offsets) == starts[::7]
+        for line in (0, 1, 6, 7, 8, 500, 1000):
+            assert seek_line(source, line) == starts[line]
+        assert seek_line(source, 1001) == len(INDEX_CONTENT)
+
+
+def test_line_index_is_reused_and_extended(indexed, monkeypatch):
+    with open_source(str(indexed)) as source:
+        index_for(source)
+
+    def fail(self, source, file_stat):
+        raise AssertionError("the index was rebuilt")
+
+    with open_source(str(indexed)) as source, monkeypatch.context() as patch:
+        patch.setattr(LineIndex, "extend", fail)
+        assert index_for(source, build=False) is not None
+
+    with open(indexed, "ab") as file:
+        file.write(b" continued\n" + b"appended\n" * 50)
+    data = indexed.read_bytes()
+    with open_source(str(indexed)) as source:
+        index = index_for(source, build=False)
+        assert index is not None
+        assert list(index.offsets) == line_starts(data)[::7]
+        assert index.lines == 1051
+
+
+def test_line_index_is_rebuilt_after_rewrite(indexed):
+    with open_source(str(indexed)) as source:
+        index_for(source)
+    data = b"short\n" * 3000
+    with open(indexed, "r+b") as file:
+        file.write(data)
+    assert indexed.read_bytes()[: len(data)] == data
+
+    with open_source(str(indexed)) as source:
+        assert index_for(source, build=False) is None
+        index = index_for(source)
+        assert index is not None
+        assert list(index.offsets) == line_starts(indexed.read_bytes())[::7]
+
+
+def test_line_index_skips_unlinked_and_small_files(monkeypatch, tmp_path):
+    monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+    with spool([INDEX_CONTENT]) as file, Source(file) as source:
+        assert index_for(source) is None
+    path = tmp_path / "small.txt"
+    path.write_bytes(INDEX_CONTENT)
+    with open_source(str(path)) as source:
+        assert index_for(source) is None
+        assert seek_line(source, 3) == line_starts(INDEX_CONTENT)[3]
+    assert not (tmp_path / "cache").exists()
+
+
+def test_line_index_prunes_least_recently_used(indexed, monkeypatch, tmp_path):
+    monkeypatch.setattr(line_index, "MAX_INDEXES", 2)
+    paths = [indexed]
+    for name in ("second.txt", "third.txt"):
+        paths.append(tmp_path / name)
+        paths[-1].write_bytes(INDEX_CONTENT)
+    directory = tmp_path / "cache" / "line-index"
+
+    def sidecar(path):
+        return directory / os.path.basename(line_index.index_path(os.stat(path)))
+
+    for age, path in enumerate(paths[:2]):
+        with open_source(str(path)) as source:
+            index_for(source)
+        os.utime(sidecar(path), ns=(age, age))
+    # Reading the first index again makes the second one the least recently used.
+    with open_source(str(indexed)) as source:
+        assert index_for(source, build=False) is not None
+    with open_source(str(paths[2])) as source:
+        index_for(source)
+
+    assert sorted(os.listdir(directory)) == sorted(sidecar(path).name for path in (paths[0], paths[2]))
+
+
+@pytest.mark.parametrize("value", ["0", "-2", "many"])
+def test_parse_in_flight_rejects_bad_values(capsys, value):
+    assert parse_in_flight("tail", "8") == 8
+    with pytest.raises(SystemExit) as excinfo:
+        parse_in_flight("tail", value)
+    assert excinfo.value.code == 1
+    assert capsys.readouterr().err == f"tail: invalid number of reads in flight: {value}\n"
+
+
+def test_read_ordered_keeps_argument_order_and_bounds_in_flight():
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def read(name):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        # Later names finish first, so results arrive out of order.
+        time.sleep(0.001 * (50 - int(name)))
+        with lock:
+            active -= 1
+        if name == "13":
+            raise FileNotFoundError(name)
+        return int(name) * 2
+
+    names = [str(i) for i in range(50)]
+    results = list(read_ordered(names, read, limit=4))
+
+    assert [name for name, _, _ in results] == names
+    assert [value for _, value, _ in results if value is not None] == [i * 2 for i in range(50) if i != 13]
+    assert isinstance(results[13][2], FileNotFoundError)
+    assert 1 < peak <= 4
+
+
+def test_read_ordered_stops_reading_when_abandoned():
+    started = []
+
+    def read(name):
+        started.append(name)
+        return name
+
+    results = read_ordered([str(i) for i in range(1000)], read, limit=3)
+    assert next(results) == ("0", "0", None)
+    results.close()
+    assert len(started) <= 4
+
+
+class RecordingBuffer(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+def make_stdout(isatty=False):
+    stream = io.TextIOWrapper(RecordingBuffer(), encoding="utf-8")
+    stream.isatty = lambda: isatty
+    return stream
+
+
+def test_sink_batches_writes_by_size():
+    stdout = make_stdout()
+    sink = OutputSink(stdout, flush_size=100)
+    for _ in range(30):
+        sink.write(b"0123456789\n")
+    sink.flush()
+
+    assert stdout.buffer.getvalue() == b"0123456789\n" * 30
+    assert stdout.buffer.writes == 3
+
+
+@pytest.mark.parametrize("isatty, line_buffered", [(True, None), (False, True)])
+def test_sink_flushes_every_write_when_line_buffered(isatty, line_buffered):
+    stdout = make_stdout(isatty)
+    sink = OutputSink(stdout, line_buffered=line_buffered)
+    sink.write(b"a\n")
+    sink.write_text("б\n")
+
+    assert stdout.buffer.getvalue() == "a\nб\n".encode()
+    assert stdout.buffer.writes == 2
+
+
+def test_sink_writes_text_streams_without_buffer(monkeypatch):
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    sink = OutputSink()
+    sink.write_text("привет\n")
+    sink.flush()
+
+    assert stdout.getvalue() == "привет\n"
+
+
+@pytest.mark.parametrize("kernel", [True, False])
+def test_sink_copies_file_ranges_in_order(monkeypatch, tmp_path, sample, kernel):
+    if not kernel:
+        monkeypatch.setattr(sink_module, "KERNEL_COPIES", [])
+    with open(tmp_path / "out.txt", "w", encoding="utf-8") as stdout, open(sample, "rb") as source:
+        sink = OutputSink(stdout)
+        sink.write(b"head\n")
+        sink.copy_from(source.fileno(), 11, 6)
+        sink.write_text("|")
+        sink.copy_from(source.fileno(), 30, 100)
+        sink.flush()
+
+    assert (tmp_path / "out.txt").read_bytes() == b"head\nsecond|" + CONTENT[30:]
+
+
+@pytest.mark.parametrize("splice", [True, False])
+def test_sink_copies_rest_of_pipe(monkeypatch, tmp_path, splice):
+    if not splice:
+        monkeypatch.delattr(os, "splice", raising=False)
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, CONTENT)
+    os.close(write_fd)
+    with open(tmp_path / "out.txt", "w", encoding="utf-8") as stdout, os.fdopen(read_fd, "rb") as source:
+        sink = OutputSink(stdout)
+        sink.write(b"head\n")
+        copied = sink.copy_stream(source.fileno())
+        sink.flush()
+
+    assert copied == len(CONTENT)
+    assert (tmp_path / "out.txt").read_bytes() == b"head\n" + CONTENT
+
+
+def test_sink_exits_quietly_on_broken_pipe(tmp_path):
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"some line of text\n" * 200_000)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.nl.nl_main", str(big)], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    assert process.stdout.readline() == b"     1\tsome line of text\n"
+    process.stdout.close()
+    stderr = process.stderr.read()
+    process.wait()
+
+    assert stderr == b""
+    assert process.returncode == 141
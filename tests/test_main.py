@@ -0,0 +1,131 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src import main as multicall
+from src.server import client
+
+INPUT_FILE = os.path.join("artifacts", "wc", "input_1.txt")
+MAIN = os.path.join("src", "main.py")
+
+
+def run_main(monkeypatch, capsys, argv):
+    monkeypatch.delenv("LAB_SERVER", raising=False)
+    monkeypatch.setattr(sys, "argv", argv)
+    code = 0
+    try:
+        multicall.main()
+    except SystemExit as e:
+        code = e.code
+    captured = capsys.readouterr()
+    return code, captured.out, captured.err
+
+
+def test_dispatch_on_subcommand(monkeypatch, capsys):
+    code, out, _ = run_main(monkeypatch, capsys, ["main.py", "wc", "-l", INPUT_FILE])
+    assert code == 0
+    assert out == f"40 {INPUT_FILE}\n"
+
+
+def test_dispatch_on_program_name(monkeypatch, capsys):
+    code, out, _ = run_main(monkeypatch, capsys, ["/usr/local/bin/tail", "-n", "2", INPUT_FILE])
+    assert code == 0
+    assert out == "316\n\n"
+
+
+def test_unknown_tool(monkeypatch, capsys):
+    code, _, err = run_main(monkeypatch, capsys, ["main.py", "cat", INPUT_FILE])
+    assert code == 1
+    assert "main: unknown tool: 'cat'" in err
+
+
+def test_no_arguments_prints_usage(monkeypatch, capsys):
+    code, _, err = run_main(monkeypatch, capsys, ["main.py"])
+    assert code == 1
+    assert err.startswith("usage: main")
+
+
+def test_request_round_trip():
+    request = client.encode_request(["wc", "-l", "a b"], "/tmp", {"LANG": "C", "X": "a=b"})
+    (size,) = client.HEADER.unpack_from(request)
+    assert size == len(request) - client.HEADER.size
+    assert client.decode_request(request[client.HEADER.size :]) == (
+        ["wc", "-l", "a b"],
+        "/tmp",
+        {"LANG": "C", "X": "a=b"},
+    )
+
+
+def test_client_without_server_runs_locally(tmp_path):
+    assert client.run("wc", [INPUT_FILE], str(tmp_path / "missing.sock")) is None
+
+
+def test_client_refuses_server_of_another_user(monkeypatch, tmp_path):
+    path = str(tmp_path / "other.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen(1)
+        monkeypatch.setattr(client.os, "getuid", lambda: os.geteuid() + 1)
+        assert client.run("wc", [INPUT_FILE], path) is None
+        conn, _ = listener.accept()
+        with conn:
+            # Neither the environment nor any descriptor was sent.
+            assert conn.recv(1) == b""
+
+
+def test_client_refuses_shared_fallback_directory(monkeypatch, tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir(mode=0o777)
+    directory.chmod(0o777)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(client, "fallback_directory", lambda: str(directory))
+    path = client.socket_path("1")
+    assert path == str(directory / "server.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen(1)
+        assert client.run("wc", [INPUT_FILE], path) is None
+        directory.chmod(0o700)
+        assert client.private_directory(str(directory))
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "lab.sock")
+    process = subprocess.Popen([sys.executable, MAIN, "serve", "--socket", path], stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.02)
+    yield path
+    process.terminate()
+    process.wait(timeout=10)
+    assert not os.path.exists(path)
+
+
+def test_server_runs_tools_on_client_descriptors(server):
+    env = {**os.environ, "LAB_SERVER": server}
+    result = subprocess.run(
+        [sys.executable, MAIN, "nl", INPUT_FILE], capture_output=True, env=env, check=False, timeout=30
+    )
+    local = subprocess.run([sys.executable, MAIN, "nl", INPUT_FILE], capture_output=True, check=False, timeout=30)
+    assert result.returncode == 0
+    assert result.stdout == local.stdout
+
+    piped = subprocess.run(
+        [sys.executable, MAIN, "wc", "-l"], input=b"a\nb\n", capture_output=True, env=env, check=False, timeout=30
+    )
+    assert piped.stdout == b"2\n"
+
+
+def test_server_reports_tool_errors(server):
+    env = {**os.environ, "LAB_SERVER": server}
+    result = subprocess.run(
+        [sys.executable, MAIN, "wc", "missing.txt"], capture_output=True, env=env, check=False, timeout=30
+    )
+    assert result.returncode == 255
+    assert result.stderr == b"wc: missing.txt: No such file or directory\n"
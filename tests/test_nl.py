@@ -1,11 +1,14 @@
 import os
 import re
+import subprocess
 import sys
 from contextlib import redirect_stdout
 from io import StringIO
 
 import pytest
 
+from src.io import line_index
+from src.nl import nl as nl_module, numbering
 from src.nl.nl import NL
 from src.nl.nl_main import main as nl_main
 
@@ -113,3 +116,226 @@ def test_nl_file_permission_error(tmp_path, monkeypatch):
     assert excinfo.value.code != 0, "The program should exit with an error on PermissionError."
     stderr_output = stderr.getvalue()
     assert "Permission" in stderr_output, f"Expected permission error in stderr, but got:\n{stderr_output}"
+
+
+@pytest.mark.parametrize("width_args", [["-w", "5"], ["-w5"], ["--number-width=5"]])
+def test_nl_fixed_width_matches_reference_output(monkeypatch, width_args):
+    input_file = os.path.join(RESOURCE_FOLDER_PATH, "input_2.txt")
+    monkeypatch.setattr(sys, "argv", ["nl_main", *width_args, input_file])
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    with open(os.path.join(RESOURCE_FOLDER_PATH, "output_2.txt"), encoding="utf-8") as expected_output_file:
+        assert stdout.getvalue() == expected_output_file.read()
+
+
+def test_nl_auto_width_from_stdin_pipe():
+    input_data = "".join(f"line {i}\n" for i in range(1, 1001))
+    result = subprocess.run(
+        [sys.executable, "-m", "src.nl.nl_main"], input=input_data.encode(), capture_output=True, check=True
+    )
+
+    output_lines = result.stdout.decode().splitlines()
+    assert output_lines[0] == "   1\tline 1"
+    assert output_lines[-1] == "1000\tline 1000"
+
+
+def test_nl_fixed_width_streams_stdin(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "3"])
+    monkeypatch.setattr(sys, "stdin", StringIO("a\nb\n"))
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    assert stdout.getvalue() == "  1\ta\n  2\tb\n"
+
+
+def test_nl_invalid_width(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "0"])
+    stderr = StringIO()
+    monkeypatch.setattr(sys, "stderr", stderr)
+    with pytest.raises(SystemExit) as excinfo:
+        nl_main()
+
+    assert excinfo.value.code == 1
+    assert "invalid line number field width" in stderr.getvalue()
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_nl_from_line_keeps_file_numbering(monkeypatch, tmp_path, indexed):
+    if indexed:
+        monkeypatch.setattr(line_index, "INDEX_MIN_SIZE", 0)
+        monkeypatch.setattr(line_index, "STRIDE", 16)
+    monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "numbered.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, 1001)))
+    monkeypatch.setattr(sys, "argv", ["nl_main", "--from-line", "998", str(path)])
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    assert stdout.getvalue() == " 998\tline 998\n 999\tline 999\n1000\tline 1000\n"
+    assert (tmp_path / "cache").exists() == indexed
+
+
+def test_nl_from_line_continues_numbering_across_files(monkeypatch, tmp_path):
+    first = tmp_path / "first.txt"
+    first.write_text("a\nb\n")
+    second = tmp_path / "second.txt"
+    second.write_text("c\nd\ne\n")
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "2", "--from-line=3", str(first), str(second)])
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    assert stdout.getvalue() == " 5\te\n"
+
+
+def test_nl_from_line_streams_stdin(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "3", "--from-line", "2"])
+    monkeypatch.setattr(sys, "stdin", StringIO("a\nb\nc\n"))
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    assert stdout.getvalue() == "  2\tb\n  3\tc\n"
+
+
+def test_nl_invalid_from_line(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["nl_main", "--from-line", "x"])
+    stderr = StringIO()
+    monkeypatch.setattr(sys, "stderr", stderr)
+    with pytest.raises(SystemExit) as excinfo:
+        nl_main()
+
+    assert excinfo.value.code == 1
+    assert "invalid starting line" in stderr.getvalue()
+
+
+def test_nl_in_flight_matches_sequential(monkeypatch, tmp_path):
+    monkeypatch.setattr(nl_module, "PREFETCH_MAX_SIZE", 200)
+    files = []
+    for index in range(20):
+        sample = tmp_path / f"{index}.txt"
+        sample.write_text("".join(f"file {index} line {i}\n" for i in range(index)) + "x" * (index % 2))
+        files.append(str(sample))
+
+    outputs = []
+    for extra in ([], ["--in-flight", "5"], ["--in-flight", "5", "-w", "3", "--from-line", "4"]):
+        monkeypatch.setattr(sys, "argv", ["nl_main", *extra, *files])
+        stdout = StringIO()
+        monkeypatch.setattr(sys, "stdout", stdout)
+        nl_main()
+        outputs.append(stdout.getvalue())
+    assert outputs[0] == outputs[1]
+
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "3", "--from-line", "4", *files])
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+    assert outputs[2] == stdout.getvalue()
+
+
+def test_nl_passes_invalid_utf8_through(tmp_path):
+    lines = [b"caf\xe9 \t\n", "второй　 \n".encode("cp1251", errors="ignore"), "третий　\n".encode()]
+    sample = tmp_path / "mixed.txt"
+    sample.write_bytes(b"".join(lines))
+    expected = b"1\tcaf\xe9\n2\t" + "второй".encode("cp1251") + "\n3\tтретий\n".encode()
+    for args in ([str(sample)], [], ["-w", "1"], ["--stats=/dev/null", str(sample)]):
+        result = subprocess.run(
+            [sys.executable, "-m", "src.nl.nl_main", *args], input=sample.read_bytes(), capture_output=True, check=True
+        )
+        assert result.stdout == expected
+
+
+SECTIONED = "a\n\nb\n\\:\\:\\:\nhead\n\\:\\:\nbody1\n\n\n\nbody2\n\\:\nfoot\n"
+
+
+# Expected outputs are those of GNU nl 9.1 with the same options.
+@pytest.mark.parametrize(
+    ("options", "expected"),
+    [
+        (
+            ["-bt", "-hn"],
+            "     1\ta\n       \n     2\tb\n\n       head\n\n     1\tbody1\n       \n       \n       \n"
+            "     2\tbody2\n\n       foot\n",
+        ),
+        (
+            ["-ba", "-l", "2", "-ha"],
+            "     1\ta\n       \n     2\tb\n\n     1\thead\n\n     1\tbody1\n       \n     2\t\n       \n"
+            "     3\tbody2\n\n       foot\n",
+        ),
+        (
+            ["-bpbody", "--footer-numbering=t", "-p"],
+            "       a\n       \n       b\n\n       head\n\n     1\tbody1\n       \n       \n       \n"
+            "     2\tbody2\n\n     3\tfoot\n",
+        ),
+        (
+            ["-bt", "-nln", "-s:", "-i", "2", "--starting-line-number=0"],
+            "0     :a\n       \n2     :b\n\n       head\n\n0     :body1\n       \n       \n       \n"
+            "2     :body2\n\n       foot\n",
+        ),
+        (
+            ["--number-format", "rz", "-w3", "-bt"],
+            "001\ta\n    \n002\tb\n\n    head\n\n001\tbody1\n    \n    \n    \n002\tbody2\n\n    foot\n",
+        ),
+        (
+            ["-d", "", "-bt"],
+            "     1\ta\n       \n     2\tb\n     3\t\\:\\:\\:\n     4\thead\n     5\t\\:\\:\n     6\tbody1\n"
+            "       \n       \n       \n     7\tbody2\n     8\t\\:\n     9\tfoot\n",
+        ),
+    ],
+)
+def test_nl_gnu_numbering_options(monkeypatch, tmp_path, options, expected):
+    sample = tmp_path / "sections.txt"
+    sample.write_text(SECTIONED)
+    monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "6", *options, str(sample)])
+    stdout = StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    nl_main()
+
+    assert stdout.getvalue() == expected
+
+
+@pytest.mark.parametrize("options", [[], ["-bt"], ["-ba", "-l3"], ["-bp^x[0-9]*5$"], ["-i", "3", "-v", "-7"]])
+def test_nl_batches_and_from_line_match_whole_output(monkeypatch, tmp_path, options):
+    monkeypatch.setattr(nl_module, "BATCH_LINES", 7)
+    sample = tmp_path / "lines.txt"
+    sample.write_text("".join(f"x{i}\n" if i % 4 else "\n" for i in range(100)) + "\\:\\:\n" + "tail\n" * 20)
+
+    outputs = []
+    for extra in ([], ["--from-line", "40"], ["--from-line", "110"]):
+        monkeypatch.setattr(sys, "argv", ["nl_main", "-w", "4", *options, *extra, str(sample)])
+        stdout = StringIO()
+        monkeypatch.setattr(sys, "stdout", stdout)
+        nl_main()
+        outputs.append(stdout.getvalue().splitlines())
+    assert outputs[1] == outputs[0][39:]
+    assert outputs[2] == outputs[0][109:]
+
+
+def test_bre_pattern_swaps_escaped_operators():
+    assert numbering.bre_pattern(rb"^\(ab\)\{2\}x\+|y?") == rb"^(ab){2}x+\|y\?"
+    assert numbering.bre_pattern(rb"\<word\>\.") == rb"\bword\b\."
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [
+        (["-bx"], "nl: invalid body numbering style: 'x'\n"),
+        (["-h", "q"], "nl: invalid header numbering style: 'q'\n"),
+        (["-nzz"], "nl: invalid line numbering format: 'zz'\n"),
+        (["-i", "one"], "nl: invalid line number increment: 'one'\n"),
+        (["-l0"], "nl: invalid line number of blank lines: '0'\n"),
+    ],
+)
+def test_nl_invalid_numbering_options(monkeypatch, options, message):
+    monkeypatch.setattr(sys, "argv", ["nl_main", *options])
+    stderr = StringIO()
+    monkeypatch.setattr(sys, "stderr", stderr)
+    with pytest.raises(SystemExit) as excinfo:
+        nl_main()
+
+    assert excinfo.value.code == 1
+    assert stderr.getvalue() == message
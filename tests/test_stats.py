@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+
+import pytest
+
+from src.nl.nl_main import main as nl_main
+from src.stats import stats
+from src.tail.tail_main import main as tail_main
+from src.wc.wc_main import main as wc_main
+
+INPUT_FILE = os.path.join("artifacts", "wc", "inputBig.txt")
+
+
+@pytest.fixture(autouse=True)
+def stats_off(monkeypatch):
+    monkeypatch.delenv("LAB_STATS", raising=False)
+    monkeypatch.delenv("LAB_PROFILE", raising=False)
+    yield
+    stats.disable()
+
+
+def run_with_stats(monkeypatch, main, argv):
+    monkeypatch.setattr(sys, "argv", argv)
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        main()
+    active = stats.active()
+    assert active is not None
+    stderr = StringIO()
+    with redirect_stderr(stderr):
+        active.finish()
+    return stdout.getvalue(), stderr.getvalue()
+
+
+def test_configure_strips_stats_options():
+    assert stats.configure("wc", ["-l", "--stats", "a", "--", "--stats"]) == ["-l", "a", "--", "--stats"]
+    active = stats.active()
+    assert active is not None
+    assert active.output is None
+
+
+def test_configure_reads_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("LAB_STATS", str(tmp_path / "stats.json"))
+    assert stats.configure("nl", ["a"]) == ["a"]
+    active = stats.active()
+    assert active is not None
+    assert active.output == str(tmp_path / "stats.json")
+
+
+def test_configure_leaves_stats_off_by_default():
+    assert stats.configure("tail", ["-n", "3"]) == ["-n", "3"]
+    assert stats.active() is None
+    stats.phase("read")
+    stats.add("lines", 3)
+
+
+def test_configure_rejects_unknown_profiler(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        stats.configure("wc", ["--profile=perf"])
+    assert excinfo.value.code == 1
+    assert capsys.readouterr().err == "wc: invalid profiler: 'perf' (expected cprofile or tracemalloc)\n"
+
+
+def test_wc_stats_on_stderr(monkeypatch):
+    stdout, stderr = run_with_stats(monkeypatch, wc_main, ["wc_main", "--stats", INPUT_FILE])
+
+    assert stdout == f"10702 78451 439742 {INPUT_FILE}\n"
+    assert "wc: stats:   count" in stderr
+    assert "wc: stats: counters: files 1, lines 10702, bytes 439742" in stderr
+
+
+def test_nl_stats_json_splits_phases(monkeypatch, tmp_path):
+    path = tmp_path / "stats.json"
+    run_with_stats(monkeypatch, nl_main, ["nl_main", f"--stats={path}", INPUT_FILE])
+    report = json.loads(path.read_text())
+
+    assert report["tool"] == "nl"
+    assert {"open", "read", "format", "print"} <= report["phases"].keys()
+    assert report["counters"] == {"files": 1, "lines": 10702}
+    assert report["peak_rss"] > 0
+    assert sum(report["phases"].values()) == pytest.approx(report["elapsed"])
+
+
+def test_nl_measured_output_matches(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["nl_main", INPUT_FILE])
+    plain = StringIO()
+    with redirect_stdout(plain):
+        nl_main()
+    measured, _ = run_with_stats(monkeypatch, nl_main, ["nl_main", "--stats", INPUT_FILE])
+    assert measured == plain.getvalue()
+
+
+@pytest.mark.parametrize("profiler, marker", [("cprofile", "function calls"), ("tracemalloc", "traced peak")])
+def test_tail_profile_capture(monkeypatch, profiler, marker):
+    _, stderr = run_with_stats(monkeypatch, tail_main, ["tail_main", f"--profile={profiler}", INPUT_FILE])
+    assert "tail: stats:   read" in stderr
+    assert marker in stderr
@@ -1,10 +1,23 @@
+import asyncio
+import bz2
+import gzip
+import io
+import lzma
 import os
+import selectors
+import subprocess
 import sys
+import time
 from contextlib import redirect_stderr, redirect_stdout
 from io import StringIO
+from pathlib import Path
 
 import pytest
 
+from benchmarks.corpus import bgzf
+from src.io import line_index
+from src.tail import follow, tail as tail_module
+from src.tail.tail import blocks_after_bytes, blocks_after_lines, find_tail_offset, tail_bytes_stream, tail_stream
 from src.tail.tail_main import main as tail_main
 
 SOLUTION_FOLDER_PATH = os.path.join("src", "tail")
@@ -165,3 +178,432 @@ def test_tail_invalid_n_argument(monkeypatch):
         tail_main()
 
     assert excinfo.value.code == 1, "Expected exit code 1 when `-n` is given an invalid number."
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("num_lines", [0, 1, 3, 17, 40, 100])
+@pytest.mark.parametrize("block_size", [1, 7, 64, 4096])
+def test_find_tail_offset_matches_readlines(tmp_path, trailing_newline, num_lines, block_size):
+    content = "\n".join(f"line {i} " + "x" * (i % 11) for i in range(40)) + ("\n" if trailing_newline else "")
+    test_file = tmp_path / "blocks.txt"
+    test_file.write_bytes(content.encode("utf-8"))
+
+    with open(test_file, "rb") as file:
+        offset = find_tail_offset(file, num_lines, block_size)
+
+    lines = content.splitlines(keepends=True)
+    expected = "".join(lines[-num_lines:]) if num_lines else ""
+    assert content.encode("utf-8")[offset:].decode("utf-8") == expected
+
+
+def test_tail_keeps_multibyte_characters(monkeypatch, tmp_path):
+    test_file = tmp_path / "unicode.txt"
+    test_file.write_text("".join(f"строка {i} — ✓\n" for i in range(30)), encoding="utf-8")
+
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-n", "2", str(test_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == "строка 28 — ✓\nстрока 29 — ✓\n"
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"\n", b"a", b"a\nb", b"a\nb\n", b"\n\n\nx\n", b"long line without newline" * 9]
+)
+@pytest.mark.parametrize("num_lines", [0, 1, 2, 5])
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_tail_stream_matches_readlines(content, num_lines, chunk_size):
+    expected = b"".join(content.splitlines(keepends=True)[-num_lines:]) if num_lines else b""
+    assert tail_stream(io.BytesIO(content), num_lines, chunk_size) == expected
+
+
+def test_tail_stdin_with_line_count(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", StringIO("a\nb\nc\n"))
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-n", "2"])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == "b\nc\n"
+
+
+NUMBERED = "".join(f"line {i}\n" for i in range(1, 2001))
+
+
+@pytest.fixture
+def indexed_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(line_index, "INDEX_MIN_SIZE", 0)
+    monkeypatch.setattr(line_index, "STRIDE", 16)
+    monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "numbered.txt"
+    path.write_text(NUMBERED)
+    return path
+
+
+@pytest.mark.parametrize("value, first", [("+1", 1), ("+0", 1), ("+2", 2), ("+1000", 1000), ("+2000", 2000)])
+def test_tail_from_line(monkeypatch, indexed_file, value, first):
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-n", value, str(indexed_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == "".join(f"line {i}\n" for i in range(first, 2001))
+    assert (indexed_file.parent / "cache").exists() == (first > 1)
+
+
+def test_tail_from_line_past_end(monkeypatch, indexed_file):
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-n+5000", str(indexed_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == ""
+
+
+def test_tail_from_line_reads_stdin_pipe():
+    result = subprocess.run(
+        [sys.executable, "-m", "src.tail.tail_main", "-n", "+1999"],
+        input=NUMBERED.encode(),
+        capture_output=True,
+        check=True,
+    )
+    assert result.stdout == b"line 1999\nline 2000\n"
+
+
+BYTE_COUNTS = [
+    ("3", slice(-3, None)),
+    ("0", slice(0, 0)),
+    ("+5", slice(4, None)),
+    ("+0", slice(None)),
+    ("1K", slice(-1024, None)),
+    ("+1b", slice(511, None)),
+    ("100000", slice(None)),
+]
+
+
+@pytest.mark.parametrize("value, expected", BYTE_COUNTS)
+@pytest.mark.parametrize("spelling", ["-c {}", "-c{}", "--bytes={}", "--bytes {}"])
+def test_tail_bytes(monkeypatch, indexed_file, value, expected, spelling):
+    monkeypatch.setattr(sys, "argv", ["tail_main", *spelling.format(value).split(), str(indexed_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == NUMBERED[expected]
+
+
+@pytest.mark.parametrize("value, expected", BYTE_COUNTS)
+def test_tail_bytes_reads_stdin_pipe(value, expected):
+    result = subprocess.run(
+        [sys.executable, "-m", "src.tail.tail_main", "-c", value],
+        input=NUMBERED.encode(),
+        capture_output=True,
+        check=True,
+    )
+    assert result.stdout == NUMBERED.encode()[expected]
+
+
+@pytest.mark.parametrize(("options", "expected"), [(["-n", "-2"], "line 1999\nline 2000\n"), (["-c", "-2"], "0\n")])
+def test_tail_minus_sign_counts_from_end(monkeypatch, indexed_file, options, expected):
+    monkeypatch.setattr(sys, "argv", ["tail_main", *options, str(indexed_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == expected
+
+
+@pytest.mark.parametrize("options", [["-n", "0"], ["-c", "0"], ["-c0", "--in-flight", "4"]])
+def test_tail_zero_count_prints_no_headers(monkeypatch, indexed_file, options):
+    monkeypatch.setattr(sys, "argv", ["tail_main", *options, str(indexed_file), str(indexed_file)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        tail_main()
+
+    assert stdout.getvalue() == ""
+
+
+@pytest.mark.parametrize("count", [0, 1, 6, 7, 8, 20000])
+def test_blocks_after_bytes(count):
+    data = NUMBERED.encode()
+    blocks = [data[i : i + 7] for i in range(0, len(data), 7)]
+    assert b"".join(blocks_after_bytes(blocks, count)) == data[count:]
+
+
+@pytest.mark.parametrize("num_bytes", [0, 1, 5, 1024, 100_000])
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_tail_bytes_stream(num_bytes, chunk_size):
+    data = NUMBERED.encode()
+    assert tail_bytes_stream(io.BytesIO(data), num_bytes, chunk_size) == (data[-num_bytes:] if num_bytes else b"")
+
+
+@pytest.mark.parametrize("value", ["1x", "K", "+-3", "1.5"])
+def test_tail_invalid_bytes(monkeypatch, value):
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-c", value])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as error:
+        tail_main()
+
+    assert error.value.code == 1
+    assert stderr.getvalue() == f"tail: invalid number of bytes: {value}\n"
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 2000, 2001])
+def test_blocks_after_lines(count):
+    data = NUMBERED.encode()
+    blocks = [data[i : i + 7] for i in range(0, len(data), 7)]
+    expected = b"".join(line + b"\n" for line in data.split(b"\n")[count:-1])
+    assert b"".join(blocks_after_lines(blocks, count)) == expected
+
+
+def test_tail_large_n_uses_existing_index(monkeypatch, indexed_file):
+    monkeypatch.setattr(tail_module, "INDEXED_TAIL_LINES", 100)
+    monkeypatch.setattr(sys, "argv", ["tail_main", "-n", "+2", str(indexed_file)])
+    with redirect_stdout(StringIO()):
+        tail_main()
+
+    monkeypatch.setattr(tail_module, "buffer_tail_offset", None)
+    for num_lines, first in ((150, 1851), (5000, 1)):
+        monkeypatch.setattr(sys, "argv", ["tail_main", "-n", str(num_lines), str(indexed_file)])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            tail_main()
+        assert stdout.getvalue() == "".join(f"line {i}\n" for i in range(first, 2001))
+
+
+def test_tail_in_flight_matches_sequential(monkeypatch, tmp_path):
+    files = []
+    for index in range(25):
+        sample = tmp_path / f"{index}.txt"
+        sample.write_text("".join(f"file {index} line {i}\n" for i in range(index)))
+        files.append(str(sample))
+
+    outputs = []
+    for extra in (["--in-flight", "1"], [], ["--in-flight", "6"]):
+        monkeypatch.setattr(sys, "argv", ["tail_main", "-n", "3", *extra, *files])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            tail_main()
+        outputs.append(stdout.getvalue())
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert outputs[1].count("==> ") == 25
+
+
+def test_tail_batched_copies_bytes_to_stdout(tmp_path):
+    files = []
+    for index in range(5):
+        sample = tmp_path / f"{index}.bin"
+        sample.write_bytes(b"\xff\xfe binary\n" * index + "строка без перевода".encode())
+        files.append(str(sample))
+    output = tmp_path / "out.txt"
+
+    with open(output, "wb") as stdout:
+        subprocess.run(
+            [sys.executable, "-m", "src.tail.tail_main", "-n", "2", "--in-flight", "4", *files],
+            stdout=stdout,
+            check=True,
+        )
+
+    tails = [b"".join(Path(name).read_bytes().splitlines(keepends=True)[-2:]) for name in files]
+    expected = b"\n".join(f"==> {name} <==\n".encode() + tail for name, tail in zip(files, tails, strict=True))
+    assert output.read_bytes() == expected
+
+
+def test_tail_passes_invalid_utf8_through(tmp_path):
+    data = b"first\n" + "второй\n".encode("cp1251") + b"caf\xe9 \xff\n"
+    sample = tmp_path / "mixed.txt"
+    sample.write_bytes(data)
+    for args in (["-n", "2", str(sample)], ["-n", "+2", str(sample)], ["-n", "2"]):
+        result = subprocess.run(
+            [sys.executable, "-m", "src.tail.tail_main", *args], input=data, capture_output=True, check=True
+        )
+        assert result.stdout == data[6:]
+
+
+def test_tail_in_flight_stops_at_missing_file(monkeypatch, tmp_path):
+    sample = tmp_path / "a.txt"
+    sample.write_text("a\n")
+    monkeypatch.setattr(sys, "argv", ["tail_main", "--in-flight=3", str(sample), "missing.txt", str(sample)])
+    stdout = StringIO()
+    stderr = StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr), pytest.raises(SystemExit):
+        tail_main()
+
+    assert stdout.getvalue() == f"==> {sample} <==\na\n"
+    assert stderr.getvalue() == "tail: missing.txt: No such file or directory\n"
+
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bzip2": bz2.compress,
+    "xz": lzma.compress,
+    "bgzf": lambda data: b"".join(bgzf([data])),
+}
+
+
+@pytest.mark.parametrize("kind", COMPRESSORS)
+@pytest.mark.parametrize(
+    "options",
+    [["-n", "3"], ["-n", "+29990"], ["-n", "2", "--in-flight", "4"], ["-c", "100"], ["-c", "+300000"], ["-c", "5"]],
+)
+def test_tail_reads_compressed_files(monkeypatch, tmp_path, kind, options):
+    data = "".join(f"строка {i}\n" for i in range(30_000)).encode("utf-8")
+    plain = tmp_path / "plain.txt"
+    plain.write_bytes(data)
+    packed = tmp_path / "packed.z"
+    packed.write_bytes(COMPRESSORS[kind](data))
+
+    outputs = []
+    for path in (plain, packed):
+        monkeypatch.setattr(sys, "argv", ["tail_main", *options, str(path), str(path)])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            tail_main()
+        outputs.append(stdout.getvalue().replace(str(path), "FILE"))
+    assert outputs[0] == outputs[1]
+
+
+def test_tail_inflates_only_last_bgzf_members(monkeypatch):
+    data = b"".join(f"line {i}\n".encode() for i in range(100_000))
+    packed = b"".join(bgzf([data]))
+    inflated = []
+    original = tail_module.inflate_member
+    monkeypatch.setattr(tail_module, "inflate_member", lambda *args: inflated.append(args[1]) or original(*args))
+    offsets = tail_module.bgzf_offsets(packed)
+    assert offsets is not None
+
+    assert tail_module.tail_members(packed, offsets, 10) == b"".join(data.splitlines(keepends=True)[-10:])
+    assert len(inflated) <= 2 < len(offsets)
+    assert tail_module.tail_members(packed, offsets, 20_000) == b"".join(data.splitlines(keepends=True)[-20_000:])
+    assert tail_module.tail_members(packed, offsets, 0) == b""
+
+
+def _peak_rss_kib(pid):
+    # VmHWM belongs to the exec'd image alone; ru_maxrss from wait4 also carries the peak of the
+    # forking parent on Linux, which for a long pytest session is already over the bound.
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def test_tail_stream_memory_is_bounded():
+    # Set TAIL_STREAM_TEST_BYTES to push several GB through the pipe.
+    total = int(os.environ.get("TAIL_STREAM_TEST_BYTES", str(256 * 1024 * 1024)))
+    line = b"x" * 99 + b"\n"
+    block = line * (1024 * 1024 // len(line))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.tail.tail_main", "-n", "100"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    written = 0
+    while written < total:
+        process.stdin.write(block)
+        written += len(block)
+    process.stdin.flush()
+    peak = _peak_rss_kib(process.pid)
+    process.stdin.close()
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    assert process.returncode == 0
+    assert output == line * 100
+    peak = usage.ru_maxrss if peak is None else peak
+    assert peak < 64 * 1024, f"tail used {peak} KiB for {written} bytes of input"
+
+
+def _start_follow(*args):
+    return subprocess.Popen(
+        [sys.executable, "-m", "src.tail.tail_main", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+
+def _read_output(process, expected: bytes, timeout: float = 5.0) -> bytes:
+    output = b""
+    deadline = time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        selector.register(process.stdout, selectors.EVENT_READ)
+        while not output.endswith(expected) and selector.select(deadline - time.monotonic()):
+            output += os.read(process.stdout.fileno(), 65536)
+    return output
+
+
+def test_tail_follow_prints_appended_lines(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_bytes(b"one\ntwo\nthree\n")
+    process = _start_follow("-f", "-n", "2", str(log))
+    try:
+        assert _read_output(process, b"three\n") == b"two\nthree\n"
+        with open(log, "ab") as file:
+            file.write(b"four\n")
+        assert _read_output(process, b"four\n") == b"four\n"
+
+        log.write_bytes(b"fresh\n")
+        assert _read_output(process, b"fresh\n") == b"fresh\n"
+    finally:
+        process.terminate()
+        _, stderr = process.communicate()
+    assert b"file truncated" in stderr
+
+
+def test_tail_follow_name_reopens_rotated_file(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_bytes(b"old\n")
+    process = _start_follow("-F", str(log))
+    try:
+        assert _read_output(process, b"old\n") == b"old\n"
+        log.rename(tmp_path / "app.log.1")
+        log.write_bytes(b"new\n")
+        assert _read_output(process, b"new\n") == b"new\n"
+    finally:
+        process.terminate()
+        process.communicate()
+
+
+def test_tail_follow_multiple_files_prints_headers(tmp_path):
+    first, second = tmp_path / "a.log", tmp_path / "b.log"
+    first.write_bytes(b"a\n")
+    second.write_bytes(b"b\n")
+    process = _start_follow("-f", str(first), str(second))
+    try:
+        _read_output(process, b"b\n")
+        with open(first, "ab") as file:
+            file.write(b"more\n")
+        assert _read_output(process, b"more\n") == f"\n==> {first} <==\nmore\n".encode()
+    finally:
+        process.terminate()
+        process.communicate()
+
+
+def test_follower_falls_back_to_polling(monkeypatch, tmp_path):
+    def no_inotify():
+        raise OSError("inotify is not available")
+
+    monkeypatch.setattr(follow, "Inotify", no_inotify)
+    log = tmp_path / "poll.log"
+    log.write_bytes(b"seen\n")
+    follower = follow.Follower()
+    follower.add(str(log), offset=len(b"seen\n"))
+
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(follower.run(stop))
+        await asyncio.sleep(0.05)
+        with open(log, "ab") as file:
+            file.write(b"polled\n")
+        await asyncio.sleep(0.2)
+        stop.set()
+        await task
+
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        asyncio.run(scenario())
+
+    assert stdout.getvalue() == "polled\n"
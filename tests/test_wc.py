@@ -1,10 +1,19 @@
+import bz2
+import gzip
+import lzma
 import os
+import sqlite3
 import sys
-from contextlib import redirect_stderr, redirect_stdout
-from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, redirect_stderr, redirect_stdout
+from io import BytesIO, StringIO, TextIOWrapper
 
 import pytest
 
+from benchmarks.corpus import bgzf
+from src.wc import cache as cache_module, counter, wc as wc_module
+from src.wc.cache import CountCache
+from src.wc.counter import Counts, count_range, split_ranges
 from src.wc.wc_main import main as wc_main
 
 SOLUTION_FOLDER_PATH = os.path.join("src", "wc")
@@ -115,3 +124,685 @@ def test_wc_stdin(monkeypatch):
 
     output = stdout.getvalue().strip().split()
     assert output == expected_output, f"Expected:\n{expected_output}\nGot:\n{stdout.getvalue()}"
+
+
+@pytest.mark.parametrize("jobs_args", [["-j", "2"], ["--jobs=3"], ["-j0"]])
+def test_wc_parallel_matches_serial(monkeypatch, tmp_path, jobs_args):
+    input_files = [
+        os.path.join(RESOURCE_FOLDER_PATH, "input_1.txt"),
+        os.path.join(RESOURCE_FOLDER_PATH, "inputBig.txt"),
+    ]
+    for i in range(10):
+        shard = tmp_path / f"shard_{i}.txt"
+        shard.write_text("word " * i + "\n" * (i % 3), encoding="utf-8")
+        input_files.append(str(shard))
+
+    outputs = []
+    for args in ([], jobs_args):
+        monkeypatch.setattr(sys, "argv", ["wc_main", *args, *input_files])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            wc_main()
+        outputs.append(stdout.getvalue())
+
+    assert outputs[0] == outputs[1]
+    assert outputs[1].splitlines()[-1].endswith(" total")
+
+
+def test_wc_parallel_missing_file(monkeypatch):
+    input_files = [os.path.join(RESOURCE_FOLDER_PATH, "input_1.txt"), "non_existent_file.txt"]
+    monkeypatch.setattr(sys, "argv", ["wc_main", "-j", "2", *input_files])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as excinfo:
+        wc_main()
+
+    assert excinfo.value.code != 0
+    assert "wc: non_existent_file.txt: No such file or directory" in stderr.getvalue()
+
+
+def test_wc_parallel_reads_names_as_it_counts():
+    input_file = os.path.join(RESOURCE_FOLDER_PATH, "input_1.txt")
+    taken = 0
+
+    def names():
+        nonlocal taken
+        for _ in range(500):
+            taken += 1
+            yield input_file
+
+    results = wc_module._count_many_parallel(names(), 2, None, counter.DEFAULT_FIELDS, None)
+    first = next(results)
+    # Only the batches in flight have been taken from the walk when the first result comes back.
+    assert taken <= 2 * wc_module.BATCHES_IN_FLIGHT * wc_module.STREAM_BATCH_SIZE + wc_module.STREAM_BATCH_SIZE
+    assert [first, *results] == [first] * 500
+    assert taken == 500
+
+
+@pytest.mark.parametrize("name", ["l", "w", "m", "c"])
+def test_wc_counts_file_named_like_a_flag(monkeypatch, tmp_path, name):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / name).write_text("one two\n")
+    monkeypatch.setattr(sys, "argv", ["wc_main", name])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+
+    assert stdout.getvalue().split() == ["1", "2", "8", name]
+
+
+def test_wc_invalid_jobs(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["wc_main", "-j", "many"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as excinfo:
+        wc_main()
+
+    assert excinfo.value.code == 1
+
+
+def reference_counts(filename: str) -> tuple[int, int, int]:
+    lines = words = bytes_count = 0
+    with open(filename, encoding="utf-8", newline="\n") as file:
+        for line in file:
+            lines += 1
+            words += len(line.split())
+            bytes_count += len(line.encode("utf-8"))
+    return lines, words, bytes_count
+
+
+UNICODE_SAMPLE = "Привет,\u00a0мир!\u3000日本語 テキスト\u2003x\n\tслово\u2028ещё  ✓✓ \u0085end" * 50
+
+
+@pytest.mark.parametrize("parts", [1, 2, 7, 64, 997])
+@pytest.mark.parametrize("block_size", [5, 4096])
+def test_chunked_count_matches_serial(tmp_path, parts, block_size):
+    sample = tmp_path / "unicode.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+
+    for filename in (str(sample), os.path.join(RESOURCE_FOLDER_PATH, "inputBig.txt")):
+        total = Counts()
+        for start, end in split_ranges(os.path.getsize(filename), parts):
+            total = total.merge(count_range(filename, start, end, block_size))
+        assert (total.lines, total.words, total.bytes_count) == reference_counts(filename)
+
+
+def test_wc_jobs_splits_single_file(monkeypatch):
+    monkeypatch.setattr(wc_module, "MIN_CHUNK_SIZE", 1024)
+    input_file = os.path.join(RESOURCE_FOLDER_PATH, "inputBig.txt")
+    monkeypatch.setattr(sys, "argv", ["wc_main", "-j", "4", input_file])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+
+    assert stdout.getvalue().split() == ["10702", "78451", "439742", input_file]
+
+
+@pytest.mark.parametrize(
+    "content", ["", "\n", "a", " a ", "a\nb", "\u3000x\u00a0y\u2028", UNICODE_SAMPLE, "x\r\ny\r\n"]
+)
+def test_wc_byte_engine_matches_text_split(monkeypatch, tmp_path, content):
+    sample = tmp_path / "sample.txt"
+    sample.write_bytes(content.encode("utf-8"))
+
+    monkeypatch.setattr(sys, "argv", ["wc_main", str(sample)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+
+    assert [int(value) for value in stdout.getvalue().split()[:3]] == list(reference_counts(str(sample)))
+
+
+def test_numpy_word_kernel_matches_translate():
+    np = pytest.importorskip("numpy")
+    data = bytes(range(256)) * 300 + b"  word\tword\x1cword " * 5000
+    for start, end in [(0, len(data)), (1, 100), (255, 70000), (32, 33)]:
+        chunk = data[start:end]
+        assert counter._count_words_numpy(np, chunk) == counter._count_words_translate(chunk)
+
+
+@pytest.mark.parametrize(
+    "options, fields",
+    [
+        (["-l"], ["lines"]),
+        (["-w"], ["words"]),
+        (["-m"], ["chars"]),
+        (["-c"], ["bytes"]),
+        (["-c", "-l"], ["lines", "bytes"]),
+        (["-cmwl"], ["lines", "words", "chars", "bytes"]),
+        (["--bytes", "--chars"], ["chars", "bytes"]),
+    ],
+)
+def test_wc_selected_counters_in_gnu_order(monkeypatch, tmp_path, options, fields):
+    sample = tmp_path / "unicode.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+    short = tmp_path / "short.txt"
+    short.write_text("ab\n", encoding="utf-8")
+    lines, words, bytes_count = reference_counts(str(sample))
+    values = {"lines": lines, "words": words, "chars": len(UNICODE_SAMPLE), "bytes": bytes_count}
+
+    monkeypatch.setattr(sys, "argv", ["wc_main", *options, str(sample), str(short)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+
+    first, second, total = stdout.getvalue().splitlines()
+    assert first.split() == [*(str(values[field]) for field in fields), str(sample)]
+    # Every column is as wide as its widest value, so the short file's numbers are right-aligned.
+    assert len(second) - len(str(short)) == len(first) - len(str(sample))
+    assert total.endswith(" total")
+
+
+def test_wc_byte_count_does_not_read_regular_files(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("-c read the file")
+
+    monkeypatch.setattr(wc_module, "open_source", fail)
+    input_file = os.path.join(RESOURCE_FOLDER_PATH, "inputBig.txt")
+    monkeypatch.setattr(sys, "argv", ["wc_main", "-c", input_file])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+
+    assert stdout.getvalue() == f"439742 {input_file}\n"
+
+
+@pytest.mark.parametrize("block_size", [1, 5, 4096])
+def test_char_count_matches_decoded_length(tmp_path, block_size):
+    sample = tmp_path / "unicode.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+    counts = count_range(str(sample), 0, sample.stat().st_size, block_size, fields=("chars",))
+    assert counts.chars == len(UNICODE_SAMPLE)
+    assert counts.words == 0
+
+
+def test_numpy_unicode_word_kernel_matches_regex():
+    np = pytest.importorskip("numpy")
+    spaces = "".join(counter._UNICODE_SPACES)
+    for text in (UNICODE_SAMPLE, spaces + "x" + spaces, "日本\u3000語\u2003\u00a0a", "\u3001\u3000\u30a2"):
+        data = text.encode("utf-8")
+        assert counter._count_words_unicode_numpy(np, data) == counter._count_words_translate(
+            counter._UNICODE_SPACE_RE.sub(b" ", data)
+        )
+        assert counter._count_words_unicode_numpy(np, data)[0] == len(text.split())
+
+
+@pytest.mark.parametrize(
+    ("data", "chars"),
+    [(b"caf\xe9 ok\n", 7), (b"\xff\xfe\n", 1), ("día\n".encode()[:2] + b"\n", 2), (UNICODE_SAMPLE.encode(), None)],
+)
+def test_char_count_skips_invalid_sequences(data, chars):
+    # As GNU wc -m: only valid characters are counted, however the invalid bytes are cut.
+    expected = len(UNICODE_SAMPLE) if chars is None else chars
+    assert counter.count_chars(data) == expected
+    assert count_range_bytes(data, 3).chars == expected
+
+
+def count_range_bytes(data: bytes, block_size: int) -> Counts:
+    return counter.count_blocks((data[i : i + block_size] for i in range(0, len(data), block_size)), counter.FIELDS)
+
+
+def test_wc_counts_invalid_utf8_without_error(monkeypatch, tmp_path):
+    sample = tmp_path / "mixed.txt"
+    sample.write_bytes(b"caf\xe9 \xff\xfe ok\n" + "привет мир\n".encode("cp1251") + "привет\n".encode())
+    monkeypatch.setattr(sys, "argv", ["wc_main", "-lwmc", str(sample)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+    # As in GNU wc, invalid bytes are neither words nor characters: "\xff\xfe" and the cp1251 line add nothing.
+    assert stdout.getvalue().split()[:-1] == ["3", "3", "17", str(sample.stat().st_size)]
+
+
+# Word counts of GNU wc -w (coreutils 9.1, C.UTF-8) for input with invalid sequences.
+GNU_INVALID_WORDS = [
+    (b"\xff\n", 0),
+    (b"a\xffb", 1),
+    (b"\xff \xfe", 0),
+    (b"a\xff b", 2),
+    (b"\xffa", 1),
+    (b"a\xc3", 1),
+    (b"\xe2\x80\n", 0),
+    (b"\xed\xa0\x80", 0),
+    (b"x \xff\xff\xff\xff\xff\xffy \xf4\x90\x80\x80z", 3),
+]
+
+
+@pytest.mark.parametrize(("data", "words"), GNU_INVALID_WORDS)
+@pytest.mark.parametrize("block_size", [1, 2, 3, 1024])
+def test_invalid_bytes_are_neutral_in_words(data, words, block_size):
+    assert count_range_bytes(data, block_size).words == words
+
+
+@pytest.mark.parametrize(("data", "words"), GNU_INVALID_WORDS)
+def test_invalid_bytes_are_neutral_in_numpy_words(monkeypatch, data, words):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(counter, "NUMPY_MIN_SIZE", 0)
+    assert counter.count_chunk((data + b" ") * 3).words == words * 3
+
+
+@pytest.mark.parametrize("numpy_min_size", [0, 1 << 62])
+@pytest.mark.parametrize("block_size", [1, 2, 3, 5, 4096])
+def test_memoryview_blocks_count_like_bytes(monkeypatch, numpy_min_size, block_size):
+    # mmap blocks arrive as memoryviews and are counted in place; the result must not depend on it.
+    monkeypatch.setattr(counter, "NUMPY_MIN_SIZE", numpy_min_size)
+    data = UNICODE_SAMPLE.encode() + b"".join(sample for sample, _ in GNU_INVALID_WORDS) + b"\xe2\x80"
+    view = memoryview(data)
+    blocks = [view[i : i + block_size] for i in range(0, len(data), block_size)]
+    assert counter.count_blocks(blocks) == counter.count_blocks([data])
+    assert counter.count_chunk(view) == counter.count_chunk(data)
+
+
+@pytest.mark.parametrize(("data", "words"), GNU_INVALID_WORDS)
+def test_invalid_bytes_are_neutral_in_decoded_words(data, words):
+    assert counter.count_encoded_blocks([data], "utf-8").words == words
+
+
+@pytest.mark.parametrize("encoding", ["cp1251", "koi8-r", "utf-16"])
+def test_wc_encoding_decodes_before_counting(monkeypatch, tmp_path, encoding):
+    text = "привет, мир\nвторая строка\tслово\n"
+    sample = tmp_path / "legacy.txt"
+    sample.write_bytes(text.encode(encoding))
+    monkeypatch.setattr(sys, "argv", ["wc_main", f"--encoding={encoding}", "-lwmc", str(sample)])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+    assert stdout.getvalue().split()[:-1] == ["2", "5", str(len(text)), str(sample.stat().st_size)]
+
+
+def test_wc_unknown_encoding(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["wc_main", "--encoding", "no-such-codec"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as excinfo:
+        wc_main()
+    assert excinfo.value.code == 1
+    assert stderr.getvalue() == "wc: unknown encoding: 'no-such-codec'\n"
+
+
+def _cached_counts(cache: CountCache, filename: str) -> tuple[int, int, int]:
+    counts = cache.count(filename)
+    return counts.lines, counts.words, counts.bytes_count
+
+
+def test_count_cache_hit_skips_counting(monkeypatch, tmp_path):
+    sample = tmp_path / "log.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+    cache = CountCache(str(tmp_path / "cache" / "wc.sqlite3"))
+    assert _cached_counts(cache, str(sample)) == reference_counts(str(sample))
+
+    def fail(*args):
+        raise AssertionError("a cached file was recounted")
+
+    assert _cached_counts(CountCache(cache.path), str(sample)) == reference_counts(str(sample))
+    assert cache.count(str(sample), fail).bytes_count == sample.stat().st_size
+
+
+@pytest.mark.parametrize("prefix, appended", [("one two\nthr", "ee four\n"), ("word ", " next"), ("", "x y\n")])
+def test_count_cache_counts_only_appended_tail(tmp_path, prefix, appended):
+    sample = tmp_path / "log.txt"
+    sample.write_text(UNICODE_SAMPLE + prefix, encoding="utf-8")
+    cache = CountCache(str(tmp_path / "wc.sqlite3"))
+    cache.count(str(sample))
+    old_size = sample.stat().st_size
+
+    with open(sample, "a", encoding="utf-8") as file:
+        file.write(appended)
+    ranges = []
+
+    def record(filename, start, end):
+        ranges.append((start, end))
+        return count_range(filename, start, end)
+
+    assert cache.count(str(sample), record).words == reference_counts(str(sample))[1]
+    assert ranges == [(old_size, sample.stat().st_size)]
+    assert _cached_counts(cache, str(sample)) == reference_counts(str(sample))
+
+
+def test_count_cache_appends_across_a_split_character(tmp_path):
+    sample = tmp_path / "log.txt"
+    sample.write_bytes(b"ab \xd0")
+    cache = CountCache(str(tmp_path / "wc.sqlite3"))
+    assert cache.count(str(sample)).words == 1
+
+    with open(sample, "ab") as file:
+        file.write(b"\xb6 c\n")
+    fresh = counter.count_blocks([sample.read_bytes()])
+    assert fresh.words == 3
+    assert cache.count(str(sample)) == fresh
+    assert cache.count(str(sample)) == fresh
+
+
+def test_count_cache_recounts_rewritten_prefix(tmp_path):
+    sample = tmp_path / "log.txt"
+    sample.write_text("a b c\n" * 1000)
+    cache = CountCache(str(tmp_path / "wc.sqlite3"))
+    cache.count(str(sample))
+
+    with open(sample, "r+") as file:
+        file.seek(6 * 999)
+        file.write("abcde\nmore words\n")
+    assert _cached_counts(cache, str(sample)) == reference_counts(str(sample))
+
+
+def test_count_cache_replaces_old_schema(tmp_path):
+    path = tmp_path / "wc.sqlite3"
+    with closing(sqlite3.connect(path)) as db:
+        db.execute("CREATE TABLE counts (dev INTEGER, ino INTEGER, size INTEGER)")
+        db.commit()
+    sample = tmp_path / "unicode.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+
+    assert CountCache(str(path)).count(str(sample)).chars == len(UNICODE_SAMPLE)
+    assert CountCache(str(path)).count(str(sample), count_range).chars == len(UNICODE_SAMPLE)
+
+
+def test_count_cache_evicts_least_recently_used(tmp_path):
+    cache = CountCache(str(tmp_path / "wc.sqlite3"), max_entries=2)
+    files = []
+    for index in range(3):
+        sample = tmp_path / f"{index}.txt"
+        sample.write_text("word\n" * (index + 1))
+        files.append(str(sample))
+    cache.count(files[0])
+    cache.count(files[1])
+    cache.count(files[0])
+    cache.count(files[2])
+
+    def recounted(filename):
+        seen = []
+        cache.count(filename, lambda *args: seen.append(args) or count_range(*args))
+        return bool(seen)
+
+    assert not recounted(files[0])
+    assert recounted(files[1])
+
+
+def test_wc_cache_option(monkeypatch, tmp_path):
+    monkeypatch.setenv("LAB_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache_module, "_caches", {})
+    input_file = os.path.join(RESOURCE_FOLDER_PATH, "inputBig.txt")
+    for args in (["--cache", input_file], ["--cache", "-j", "2", input_file]):
+        monkeypatch.setattr(sys, "argv", ["wc_main", *args])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            wc_main()
+        assert stdout.getvalue().split() == ["10702", "78451", "439742", input_file]
+    assert (tmp_path / "cache" / "wc.sqlite3").exists()
+
+
+def _count_with_shared_cache(path: str, filenames: list[str]) -> list[tuple[int, int, int]]:
+    return [_cached_counts(CountCache(path), filename) for filename in filenames]
+
+
+def test_count_cache_shared_between_processes(tmp_path):
+    filenames = []
+    for index in range(20):
+        sample = tmp_path / f"{index}.txt"
+        sample.write_text("word " * index + "\n" * index)
+        filenames.append(str(sample))
+    path = str(tmp_path / "wc.sqlite3")
+    expected = [reference_counts(filename) for filename in filenames]
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_count_with_shared_cache, [path] * 8, [filenames] * 8))
+    assert results == [expected] * 8
+
+
+def test_wc_in_flight_matches_sequential(monkeypatch, tmp_path):
+    files = []
+    for index in range(30):
+        sample = tmp_path / f"{index}.txt"
+        sample.write_text(UNICODE_SAMPLE[: index * 17] + "word " * index)
+        files.append(str(sample))
+
+    outputs = []
+    for extra in ([], ["--in-flight", "8"], ["--in-flight=2"]):
+        monkeypatch.setattr(sys, "argv", ["wc_main", *extra, *files])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            wc_main()
+        outputs.append(stdout.getvalue())
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+def test_wc_in_flight_reports_missing_file(monkeypatch, tmp_path):
+    sample = tmp_path / "a.txt"
+    sample.write_text("a b\n")
+    monkeypatch.setattr(sys, "argv", ["wc_main", "--in-flight", "4", str(sample), "missing.txt"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), redirect_stdout(StringIO()), pytest.raises(SystemExit):
+        wc_main()
+
+    assert stderr.getvalue() == "wc: missing.txt: No such file or directory\n"
+
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bzip2": bz2.compress,
+    "xz": lzma.compress,
+    "bgzf": lambda data: b"".join(bgzf([data])),
+}
+
+
+@pytest.mark.parametrize("kind", COMPRESSORS)
+@pytest.mark.parametrize("options", [[], ["-c"], ["-lwmc"], ["--cache={cache}"]])
+def test_wc_counts_decompressed_bytes(monkeypatch, tmp_path, kind, options):
+    data = (UNICODE_SAMPLE * 50).encode("utf-8")
+    plain = tmp_path / "plain.txt"
+    plain.write_bytes(data)
+    packed = tmp_path / "packed.z"
+    packed.write_bytes(COMPRESSORS[kind](data))
+    options = [option.format(cache=tmp_path / "wc.sqlite3") for option in options]
+
+    outputs = []
+    for path in (plain, packed):
+        monkeypatch.setattr(sys, "argv", ["wc_main", *options, str(path)])
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            wc_main()
+        outputs.append(stdout.getvalue().split()[:-1])
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize("jobs", [2, 5])
+def test_wc_jobs_splits_bgzf_members(monkeypatch, tmp_path, jobs):
+    # Members of 0xFF00 bytes cut through multibyte characters, words and lines alike.
+    data = (UNICODE_SAMPLE * 3000).encode("utf-8")
+    packed = tmp_path / "packed.bgz"
+    packed.write_bytes(b"".join(bgzf([data])))
+    monkeypatch.setattr(wc_module, "MIN_CHUNK_SIZE", 1024)
+    calls = []
+    original = wc_module._count_members_parallel
+    monkeypatch.setattr(wc_module, "_count_members_parallel", lambda *args: calls.append(args[1]) or original(*args))
+
+    result = wc_module.count(str(packed), jobs=jobs, fields=counter.FIELDS)
+    assert len(calls[0]) > jobs
+    text = data.decode("utf-8")
+    # The sample's last line has no newline and still counts.
+    assert result[:4] == (text.count("\n") + 1, len(text.split()), len(text), len(data))
+
+
+def test_wc_reports_corrupt_compressed_file(monkeypatch, tmp_path):
+    packed = tmp_path / "broken.gz"
+    packed.write_bytes(gzip.compress(b"one two\n" * 1000)[:-20])
+    monkeypatch.setattr(sys, "argv", ["wc_main", str(packed)])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit):
+        wc_main()
+    assert stderr.getvalue().startswith(f"wc: {packed}: ")
+
+
+def _tree(tmp_path):
+    files = {"a/1.txt": "x y\n", "a/b/2.txt": "hello\nworld\n", "c/3.log": "z\n", "top.txt": "q\n"}
+    for name, text in files.items():
+        path = tmp_path / "tree" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return tmp_path / "tree", [str(tmp_path / "tree" / name) for name in sorted(files)]
+
+
+def _wc_output(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["wc_main", *args])
+    stdout = StringIO()
+    with redirect_stdout(stdout):
+        wc_main()
+    return stdout.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("options", "fields"),
+    [(["-r"], []), (["--recursive", "-j", "2"], []), (["-rl", "--in-flight", "4"], ["-l"])],
+)
+def test_wc_recursive_matches_file_list(monkeypatch, tmp_path, options, fields):
+    root, files = _tree(tmp_path)
+    assert _wc_output(monkeypatch, *options, str(root)) == _wc_output(monkeypatch, *fields, *files)
+
+
+def test_wc_expands_glob_patterns(monkeypatch, tmp_path):
+    root, files = _tree(tmp_path)
+    output = _wc_output(monkeypatch, str(root / "**" / "*.txt"))
+    assert output == _wc_output(monkeypatch, *(name for name in files if name.endswith(".txt")))
+
+
+def test_wc_glob_skips_matched_directories(monkeypatch, tmp_path):
+    root, files = _tree(tmp_path)
+    assert _wc_output(monkeypatch, str(root / "**" / "*")) == _wc_output(monkeypatch, *files)
+
+
+def test_wc_glob_without_matches(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", ["wc_main", str(tmp_path / "*.none")])
+    stderr = StringIO()
+    with redirect_stderr(stderr), redirect_stdout(StringIO()), pytest.raises(SystemExit):
+        wc_main()
+    assert stderr.getvalue() == f"wc: {tmp_path / '*.none'}: No such file or directory\n"
+
+
+def test_wc_subtotals_follow_each_directory(monkeypatch, tmp_path):
+    root, _ = _tree(tmp_path)
+    rows = [line.split() for line in _wc_output(monkeypatch, "-l", "--subtotals", "-r", str(root)).splitlines()]
+    assert [(int(lines), os.path.relpath(name, root)) for lines, name in rows[:-1]] == [
+        (1, "a/1.txt"),
+        (2, "a/b/2.txt"),
+        (2, "a/b"),
+        (3, "a"),
+        (1, "c/3.log"),
+        (1, "c"),
+        (1, "top.txt"),
+        (5, "."),
+    ]
+    assert rows[-1] == ["5", "total"]
+
+
+@pytest.mark.parametrize("source", ["file", "stdin"])
+def test_wc_files0_from(monkeypatch, tmp_path, source):
+    _, files = _tree(tmp_path)
+    names = tmp_path / "names"
+    names.write_bytes(b"".join(os.fsencode(name) + b"\0" for name in files))
+    if source == "stdin":
+        monkeypatch.setattr(sys, "stdin", TextIOWrapper(BytesIO(names.read_bytes())))
+    option = str(names) if source == "file" else "-"
+    assert _wc_output(monkeypatch, "--files0-from", option) == _wc_output(monkeypatch, *files)
+
+
+def test_wc_files0_from_rejects_empty_name(monkeypatch, tmp_path):
+    names = tmp_path / "names"
+    names.write_bytes(b"a\0\0")
+    monkeypatch.setattr(sys, "argv", ["wc_main", f"--files0-from={names}"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as error:
+        wc_main()
+    assert error.value.code == 1
+    assert stderr.getvalue() == f"wc: {names}:2: invalid zero-length file name\n"
+
+
+def test_wc_files0_from_with_operands(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", ["wc_main", "--files0-from", "names", "extra.txt"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as error:
+        wc_main()
+    assert error.value.code == 1
+    assert "file operands cannot be combined with --files0-from" in stderr.getvalue()
+
+
+@pytest.mark.parametrize("cuts", [[], [1], [5, 6, 7], [100, 1001, 2500], list(range(0, 4000, 333))])
+def test_wc_merge_of_range_partials_matches_whole_file(monkeypatch, tmp_path, cuts):
+    # Cuts land inside multibyte characters and words alike.
+    sample = tmp_path / "sample.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+    bounds = ["", *map(str, cuts), ""]
+    parts = []
+    for index, (start, end) in enumerate(zip(bounds, bounds[1:], strict=False)):
+        parts.append(tmp_path / f"part{index}.jsonl")
+        parts[-1].write_text(_wc_output(monkeypatch, "--partial", f"--range={start or 0}-{end}", str(sample)))
+
+    # The order partials arrive in does not matter.
+    merged = _wc_output(monkeypatch, "--merge", "-lwmc", *map(str, reversed(parts)))
+    assert merged == _wc_output(monkeypatch, "-lwmc", str(sample))
+
+
+def test_wc_merge_reads_stdin_and_totals_files(monkeypatch, tmp_path):
+    _, files = _tree(tmp_path)
+    partials = _wc_output(monkeypatch, "--partial", *files)
+    assert len(partials.splitlines()) == len(files)
+    monkeypatch.setattr(sys, "stdin", StringIO(partials))
+    assert _wc_output(monkeypatch, "--merge") == _wc_output(monkeypatch, *files)
+    assert not sys.stdin.closed
+
+
+@pytest.mark.parametrize(
+    ("partials", "message"),
+    [
+        ('{"file": "a"}\n', "wc: -:1: invalid partial result\n"),
+        ("not json\n", "wc: -:1: invalid partial result\n"),
+        (
+            '{"file":"a","start":0,"end":4,"newlines":0,"words":1,"bytes_count":4,"starts_in_word":true,'
+            '"ends_in_word":true,"ends_with_newline":false,"chars":4,"only_invalid":false}\n'
+            '{"file":"a","start":5,"end":6,"newlines":0,"words":1,"bytes_count":1,"starts_in_word":true,'
+            '"ends_in_word":true,"ends_with_newline":false,"chars":1,"only_invalid":false}\n',
+            "wc: a: partial ranges 0-4 and 5-6 do not meet\n",
+        ),
+    ],
+)
+def test_wc_merge_rejects_bad_partials(monkeypatch, partials, message):
+    monkeypatch.setattr(sys, "stdin", StringIO(partials))
+    monkeypatch.setattr(sys, "argv", ["wc_main", "--merge"])
+    stderr = StringIO()
+    with redirect_stderr(stderr), redirect_stdout(StringIO()), pytest.raises(SystemExit):
+        wc_main()
+    assert stderr.getvalue() == message
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [
+        (["--range=5"], "wc: invalid byte range: '5'\n"),
+        (["--range=-5"], "wc: invalid byte range: '-5'\n"),
+        (["--range=0-5", "--merge"], "wc: --range cannot be combined with --merge\n"),
+        (["--range=0-5", "--shared=x"], "wc: --range cannot be combined with --shared\n"),
+    ],
+)
+def test_wc_partial_option_errors(monkeypatch, options, message):
+    monkeypatch.setattr(sys, "argv", ["wc_main", *options])
+    stderr = StringIO()
+    with redirect_stderr(stderr), pytest.raises(SystemExit) as error:
+        wc_main()
+    assert error.value.code == 1
+    assert stderr.getvalue() == message
+
+
+def _add_to_shared(name: str, filename: str) -> None:
+    with redirect_stdout(StringIO()):
+        wc_module.WC(fields=counter.FIELDS, shared=name).process_data([filename])
+
+
+def test_wc_shared_total_adds_concurrent_runs(monkeypatch, tmp_path):
+    sample = tmp_path / "sample.txt"
+    sample.write_text(UNICODE_SAMPLE, encoding="utf-8")
+    name = f"wc-test-{os.getpid()}"
+    try:
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(_add_to_shared, [name] * 16, [str(sample)] * 16))
+        row = _wc_output(monkeypatch, "-lwmc", f"--show-shared={name}").split()
+        single = _wc_output(monkeypatch, "-lwmc", str(sample)).split()
+        assert row == [str(int(value) * 16) for value in single[:4]] + [name]
+    finally:
+        _wc_output(monkeypatch, f"--reset-shared={name}")
+    assert _wc_output(monkeypatch, f"--show-shared={name}").split() == ["0", "0", "0", name]
+    _wc_output(monkeypatch, f"--reset-shared={name}")